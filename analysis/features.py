@@ -0,0 +1,261 @@
+"""
+Per-market price and volume features over market_snapshot_history, computed for every market at once.
+
+History is loaded as aligned (markets x time buckets) float32 matrices: one row per market, one column
+per bucket, prices forward-filled. Features are whole-matrix NumPy operations, processed in blocks of
+markets so temporaries stay bounded:
+- return: simple return over the last bucket, and over return_window buckets
+- volatility: standard deviation of the per-bucket returns over volatility_window buckets
+- volume_velocity: volume traded per hour over velocity_window buckets (Gamma volume is cumulative)
+- momentum: last price minus its momentum_window simple moving average
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import NamedTuple
+
+import numpy as np
+
+from app.core.db import stream_query
+
+logger = logging.getLogger(__name__)
+
+FEATURE_NAMES = ("return_1", "return_window", "volatility", "volume_velocity", "momentum")
+BLOCK_ROWS = 1024  # markets per block in the batch computations
+MIN_VOLATILITY_RETURNS = 2  # fewer returns in the window give NaN volatility
+
+
+@dataclass(frozen=True)
+class FeatureConfig:
+    interval_minutes: int = 60
+    return_window: int = 24
+    volatility_window: int = 24
+    velocity_window: int = 6
+    momentum_window: int = 24
+
+    @property
+    def lookback(self) -> int:
+        """Buckets of history needed for the latest features."""
+        return max(self.return_window, self.volatility_window, self.velocity_window, self.momentum_window) + 1
+
+
+class HistoryMatrix(NamedTuple):
+    market_ids: list[str]
+    timestamps: np.ndarray  # (T,) bucket start, epoch seconds
+    price: np.ndarray  # (N, T) float32, forward-filled, NaN before a market's first snapshot
+    volume: np.ndarray  # (N, T) float32, forward-filled
+
+
+def forward_fill(values: np.ndarray) -> np.ndarray:
+    """Fills NaNs along axis 1 with the last non-NaN value to their left, in place."""
+    valid = ~np.isnan(values)
+    last_valid = np.where(valid, np.arange(values.shape[1]), 0)
+    np.maximum.accumulate(last_valid, axis=1, out=last_valid)
+    # Leading NaNs point at column 0, which is NaN itself, so they stay NaN.
+    values[...] = np.take_along_axis(values, last_valid, axis=1)
+    return values
+
+
+def load_history(start: datetime, end: datetime, market_ids: list[str] | None = None,
+                 interval_minutes: int = 60, chunk_size: int = 50_000) -> HistoryMatrix:
+    """
+    Buckets market_snapshot_history into interval_minutes columns (last price and volume per bucket)
+    on the database side and streams the result into aligned matrices.
+    """
+    step = interval_minutes * 60
+    query = """
+    SELECT market_id, (floor(extract(epoch FROM ts) / %(step)s) * %(step)s)::bigint AS bucket,
+           (array_agg(price ORDER BY ts DESC))[1], (array_agg(volume ORDER BY ts DESC))[1]
+    FROM market_snapshot_history
+    WHERE ts >= %(start)s AND ts < %(end)s {market_filter}
+    GROUP BY 1, 2;
+    """.format(market_filter="AND market_id = ANY(%(market_ids)s)" if market_ids else "")
+    params = {"step": step, "start": start, "end": end, "market_ids": list(market_ids or [])}
+
+    first_bucket = int(start.timestamp()) // step * step
+    timestamps = np.arange(first_bucket, int(end.timestamp()), step, dtype=np.int64)
+    index = {market_id: row for row, market_id in enumerate(market_ids or [])}
+    ids = list(market_ids or [])
+    rows, columns, prices, volumes = [], [], [], []
+    for chunk in stream_query(query, params, chunk_size=chunk_size):
+        for market_id, bucket, price, volume in chunk:
+            row = index.get(market_id)
+            if row is None:
+                row = index[market_id] = len(ids)
+                ids.append(market_id)
+            rows.append(row)
+            columns.append((bucket - first_bucket) // step)
+            prices.append(np.nan if price is None else float(price))
+            volumes.append(np.nan if volume is None else float(volume))
+
+    price = np.full((len(ids), len(timestamps)), np.nan, dtype=np.float32)
+    volume = np.full((len(ids), len(timestamps)), np.nan, dtype=np.float32)
+    if rows:
+        rows_array, columns_array = np.asarray(rows), np.asarray(columns)
+        price[rows_array, columns_array] = prices
+        volume[rows_array, columns_array] = volumes
+    logger.info(f"Loaded {len(rows)} buckets of history for {len(ids)} markets x {len(timestamps)} "
+                f"intervals.")
+    return HistoryMatrix(ids, timestamps, forward_fill(price), forward_fill(volume))
+
+
+def _returns(price: np.ndarray) -> np.ndarray:
+    previous = price[:, :-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(previous > 0, price[:, 1:] / previous - 1, np.nan)
+
+
+def _latest_block(price: np.ndarray, volume: np.ndarray, config: FeatureConfig) -> dict[str, np.ndarray]:
+    interval_hours = config.interval_minutes / 60
+    last = price[:, -1]
+    returns = _returns(price[:, -(config.volatility_window + 1):])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        window_base = price[:, -1 - config.return_window]
+        return_window = np.where(window_base > 0, last / window_base - 1, np.nan)
+        counts = np.sum(~np.isnan(returns), axis=1)
+        filled = np.where(np.isnan(returns), 0, returns)
+        mean = filled.sum(axis=1) / counts
+        variance = np.where(counts >= MIN_VOLATILITY_RETURNS,
+                            np.square(filled).sum(axis=1) - counts * np.square(mean), np.nan)
+        variance /= counts - 1
+    return {
+        "return_1": returns[:, -1],
+        "return_window": return_window,
+        "volatility": np.sqrt(np.maximum(variance, 0)).astype(np.float32),
+        "volume_velocity": (volume[:, -1] - volume[:, -1 - config.velocity_window])
+        / (config.velocity_window * interval_hours),
+        "momentum": last - price[:, -config.momentum_window:].mean(axis=1, dtype=np.float64),
+    }
+
+
+def compute_features(price: np.ndarray, volume: np.ndarray,
+                     config: FeatureConfig = FeatureConfig()) -> dict[str, np.ndarray]:
+    """
+    Latest value of every feature for every market: {name: (N,) float32}. Needs at least config.lookback
+    columns; markets without enough history get NaN.
+    """
+    if price.shape[1] < config.lookback:
+        raise ValueError(f"Need at least {config.lookback} intervals of history, got {price.shape[1]}")
+    price, volume = price[:, -config.lookback:], volume[:, -config.lookback:]
+    features = {name: np.empty(price.shape[0], dtype=np.float32) for name in FEATURE_NAMES}
+    for block in range(0, price.shape[0], BLOCK_ROWS):
+        rows = slice(block, block + BLOCK_ROWS)
+        for name, values in _latest_block(price[rows], volume[rows], config).items():
+            features[name][rows] = values
+    return features
+
+
+def _rolling_sum(values: np.ndarray, window: int, min_count: int | None = None) -> np.ndarray:
+    """
+    Sum over the trailing `window` columns via float64 cumulative sums, skipping NaNs; NaN where fewer
+    than min_count (default: all) of the window's values are present.
+    """
+    min_count = window if min_count is None else min_count
+    valid = ~np.isnan(values)
+    cumulative = np.cumsum(np.where(valid, values, 0), axis=1, dtype=np.float64)
+    counts = np.cumsum(valid, axis=1, dtype=np.int32)
+    sums = np.full(values.shape, np.nan)
+    present = np.zeros(values.shape, dtype=np.int32)
+    sums[:, window - 1:] = cumulative[:, window - 1:]
+    sums[:, window:] -= cumulative[:, :-window]
+    present[:, window - 1:] = counts[:, window - 1:]
+    present[:, window:] -= counts[:, :-window]
+    sums[present < min_count] = np.nan
+    return sums
+
+
+def compute_feature_series(price: np.ndarray, volume: np.ndarray, config: FeatureConfig = FeatureConfig(),
+                           block_rows: int = BLOCK_ROWS) -> dict[str, np.ndarray]:
+    """
+    Every feature at every interval: {name: (N, T) float32}, NaN where the window does not fit yet.
+    Rolling windows come from cumulative sums, so the cost is O(N x T) regardless of window length.
+    """
+    n_markets, n_intervals = price.shape
+    interval_hours = config.interval_minutes / 60
+    series = {name: np.full((n_markets, n_intervals), np.nan, dtype=np.float32) for name in FEATURE_NAMES}
+    for block in range(0, n_markets, block_rows):
+        rows = slice(block, block + block_rows)
+        p, v = price[rows], volume[rows]
+        returns = _returns(p)  # (B, T-1), aligned to columns 1..T-1
+        series["return_1"][rows, 1:] = returns
+
+        w = config.return_window
+        with np.errstate(divide="ignore", invalid="ignore"):
+            series["return_window"][rows, w:] = np.where(p[:, :-w] > 0, p[:, w:] / p[:, :-w] - 1, np.nan)
+
+        w = config.volatility_window
+        counts = _rolling_sum(~np.isnan(returns) * np.float32(1), w, min_count=0)
+        sums = _rolling_sum(returns, w, min_count=MIN_VOLATILITY_RETURNS)
+        squares = _rolling_sum(np.square(returns), w, min_count=MIN_VOLATILITY_RETURNS)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance = (squares - np.square(sums) / counts) / (counts - 1)
+        series["volatility"][rows, 1:] = np.sqrt(np.maximum(variance, 0))
+
+        w = config.velocity_window
+        series["volume_velocity"][rows, w:] = (v[:, w:] - v[:, :-w]) / (w * interval_hours)
+
+        w = config.momentum_window
+        series["momentum"][rows] = p - _rolling_sum(p, w) / w
+    return series
+
+
+class IncrementalFeatures:
+    """
+    Latest features kept up to date as snapshots arrive, without reloading history: a ring buffer holds the
+    last config.lookback intervals of price and volume per market, and each append recomputes the features
+    from that window only (O(markets x lookback)).
+    """
+
+    def __init__(self, market_ids: list[str], config: FeatureConfig = FeatureConfig()):
+        self.config = config
+        self.market_ids = list(market_ids)
+        self.index = {market_id: row for row, market_id in enumerate(self.market_ids)}
+        self._price = np.full((len(self.market_ids), config.lookback), np.nan, dtype=np.float32)
+        self._volume = np.full((len(self.market_ids), config.lookback), np.nan, dtype=np.float32)
+        self._head = 0  # column the next interval is written to
+        self.intervals = 0
+
+    @classmethod
+    def from_history(cls, history: HistoryMatrix,
+                     config: FeatureConfig = FeatureConfig()) -> "IncrementalFeatures":
+        features = cls(history.market_ids, config)
+        for column in range(max(0, history.price.shape[1] - config.lookback), history.price.shape[1]):
+            features.append(history.price[:, column], history.volume[:, column])
+        return features
+
+    def add_markets(self, market_ids: list[str]):
+        new_ids = [market_id for market_id in market_ids if market_id not in self.index]
+        if not new_ids:
+            return
+        for market_id in new_ids:
+            self.index[market_id] = len(self.market_ids)
+            self.market_ids.append(market_id)
+        padding = np.full((len(new_ids), self.config.lookback), np.nan, dtype=np.float32)
+        self._price = np.vstack([self._price, padding])
+        self._volume = np.vstack([self._volume, padding])
+
+    def append(self, price: np.ndarray, volume: np.ndarray):
+        """Adds one interval; price and volume are (N,) aligned to market_ids. NaN carries the last value."""
+        previous = (self._head - 1) % self.config.lookback
+        price = np.where(np.isnan(price), self._price[:, previous], price)
+        volume = np.where(np.isnan(volume), self._volume[:, previous], volume)
+        self._price[:, self._head] = price
+        self._volume[:, self._head] = volume
+        self._head = (self._head + 1) % self.config.lookback
+        self.intervals += 1
+
+    def append_snapshot(self, snapshot: dict[str, tuple[float | None, float | None]]):
+        """Adds one interval from {market_id: (price, volume)}; new markets are added, absent ones carried."""
+        self.add_markets(list(snapshot))
+        price = np.full(len(self.market_ids), np.nan, dtype=np.float32)
+        volume = np.full(len(self.market_ids), np.nan, dtype=np.float32)
+        for market_id, (market_price, market_volume) in snapshot.items():
+            row = self.index[market_id]
+            price[row] = np.nan if market_price is None else market_price
+            volume[row] = np.nan if market_volume is None else market_volume
+        self.append(price, volume)
+
+    def features(self) -> dict[str, np.ndarray]:
+        # Roll the ring buffer so the oldest interval comes first.
+        order = (np.arange(self.config.lookback) + self._head) % self.config.lookback
+        return compute_features(self._price[:, order], self._volume[:, order], self.config)
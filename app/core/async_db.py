@@ -0,0 +1,120 @@
+"""
+Asynchronous counterpart of app.core.db for the FastAPI app and async collectors.
+Backed by an asyncpg pool, so many concurrent queries share a few connections without
+blocking the event loop. Queries use asyncpg's $1, $2 ... placeholders.
+json/jsonb parameters are encoded with json.dumps, the same adaptation psycopg2's Json applies,
+and Json-wrapped values are accepted as-is so payload builders can be shared with the sync path.
+"""
+import asyncio
+import json
+import logging
+
+import asyncpg
+from psycopg2.extras import Json
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# The pool and its lock belong to the event loop that created them; a process that runs several loops in
+# turn (asyncio.run per job, test runners) gets a fresh pool for each one.
+_pool: asyncpg.Pool | None = None
+_pool_loop: asyncio.AbstractEventLoop | None = None
+_pool_lock: asyncio.Lock | None = None
+_pool_lock_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _encode_json(value) -> str:
+    if isinstance(value, Json):
+        value = value.adapted
+    return json.dumps(value)
+
+
+async def _init_connection(conn: asyncpg.Connection):
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(type_name, encoder=_encode_json, decoder=json.loads, schema="pg_catalog")
+
+
+def _get_pool_lock() -> asyncio.Lock:
+    """The pool lock of the running loop, created there on first use (a lock is bound to one loop)."""
+    global _pool_lock, _pool_lock_loop
+    loop = asyncio.get_running_loop()
+    if _pool_lock is None or _pool_lock_loop is not loop:
+        _pool_lock, _pool_lock_loop = asyncio.Lock(), loop
+    return _pool_lock
+
+
+async def get_async_pool() -> asyncpg.Pool:
+    """Returns the asyncpg pool of the running event loop, creating it on first use."""
+    global _pool, _pool_loop
+    loop = asyncio.get_running_loop()
+    if _pool is not None and _pool_loop is loop:
+        return _pool
+    async with _get_pool_lock():
+        if _pool is not None and _pool_loop is not loop:
+            # Left behind by a loop that has finished; its connections cannot be used (or closed) from here.
+            logger.warning("Discarding an asyncpg pool created by a different event loop.")
+            _pool = None
+        if _pool is None:
+            _pool = await asyncpg.create_pool(
+                settings.DATABASE_URL,
+                min_size=settings.ASYNC_DB_POOL_MIN_SIZE,
+                max_size=settings.ASYNC_DB_POOL_MAX_SIZE,
+                max_inactive_connection_lifetime=settings.DB_POOL_MAX_IDLE,
+                # Set to 0 behind a transaction-mode pooler (e.g. Supabase pgbouncer on port 6543).
+                statement_cache_size=settings.ASYNC_DB_STATEMENT_CACHE_SIZE,
+                init=_init_connection,
+            )
+            _pool_loop = loop
+    return _pool
+
+
+async def close_async_pool():
+    global _pool, _pool_loop
+    async with _get_pool_lock():
+        if _pool is not None and _pool_loop is asyncio.get_running_loop():
+            await _pool.close()
+        _pool, _pool_loop = None, None
+
+
+async def execute(query: str, *args, timeout: float | None = None) -> str:
+    """Runs a statement in its own transaction and returns the command status (e.g. 'INSERT 0 1')."""
+    pool = await get_async_pool()
+    async with pool.acquire() as conn:
+        return await conn.execute(query, *args, timeout=timeout)
+
+
+async def execute_many(query: str, args_list, timeout: float | None = None):
+    """Runs one statement for every argument tuple in a single transaction."""
+    pool = await get_async_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.executemany(query, args_list, timeout=timeout)
+
+
+async def fetch(query: str, *args, timeout: float | None = None) -> list[asyncpg.Record]:
+    pool = await get_async_pool()
+    async with pool.acquire() as conn:
+        return await conn.fetch(query, *args, timeout=timeout)
+
+
+async def fetch_one(query: str, *args, timeout: float | None = None) -> asyncpg.Record | None:
+    pool = await get_async_pool()
+    async with pool.acquire() as conn:
+        return await conn.fetchrow(query, *args, timeout=timeout)
+
+
+async def fetch_stream(query: str, *args, chunk_size: int = 1000):
+    """
+    Async generator yielding lists of up to chunk_size records from a server-side cursor,
+    so memory stays flat for large result sets. Holds one pooled connection while iterating.
+    """
+    pool = await get_async_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            cursor = await conn.cursor(query, *args)
+            while True:
+                rows = await cursor.fetch(chunk_size)
+                if not rows:
+                    break
+                yield rows
@@ -4,6 +4,81 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     NEWS_API_KEY: str
 
+    # Connection pool behind app.core.db.get_db_connection
+    DB_POOL_MIN_SIZE: int = 1
+    DB_POOL_MAX_SIZE: int = 10
+    DB_POOL_ACQUIRE_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_MAX_CONN_AGE: float = 1800.0  # recycle connections older than this (seconds)
+    DB_POOL_MAX_IDLE: float = 300.0  # close surplus connections idle longer than this (seconds)
+    DB_POOL_HEALTH_CHECK_AFTER: float = 30.0  # ping connections idle longer than this on checkout (seconds)
+
+    # Per-statement instrumentation (app.core.query_stats), exposed at GET /metrics/db
+    DB_QUERY_STATS_ENABLED: bool = True
+    DB_SLOW_QUERY_MS: float = 500.0  # statements slower than this end to end are logged; 0 disables
+
+    # asyncpg pool behind app.core.async_db
+    ASYNC_DB_POOL_MIN_SIZE: int = 1
+    ASYNC_DB_POOL_MAX_SIZE: int = 20
+    ASYNC_DB_STATEMENT_CACHE_SIZE: int = 100  # 0 when connecting through a transaction-mode pooler
+
+    # Write-behind buffer for raw_data_events (workers/ingestion_buffer.py)
+    INGESTION_WRITE_BEHIND: bool = False
+    INGESTION_BUFFER_BATCH_SIZE: int = 500
+    INGESTION_BUFFER_MAX_LATENCY: float = 2.0  # seconds an item may wait before a partial batch is flushed
+    INGESTION_BUFFER_MAX_PENDING: int = 10000  # producers block beyond this
+
+    # Consumers of unprocessed raw_data_events (workers/raw_event_queue.py)
+    RAW_EVENT_QUEUE_BATCH_SIZE: int = 100
+    RAW_EVENT_QUEUE_VISIBILITY_TIMEOUT: float = 300.0  # seconds a claimed batch may stay unacknowledged
+
+    # Gamma /markets pagination in MarketCollector
+    MARKET_PAGE_SIZE: int = 500
+    MARKET_MAX_PAGES: int = 40
+    MARKET_FETCH_CONCURRENCY: int = 4  # pages requested in parallel
+    MARKET_STREAM_PARSING: bool = True  # parse pages incrementally (ijson), keeping only the fields used
+
+    # Change detection in MarketCollector (collectors/change_detector.py)
+    MARKET_CHANGE_DETECTION: bool = True
+    MARKET_HEARTBEAT_SECONDS: float = 900.0  # re-emit unchanged markets at least this often; 0 disables
+
+    # Adaptive per-market polling in MarketCollector (collectors/polling_scheduler.py)
+    MARKET_ADAPTIVE_POLLING: bool = True  # False walks the whole universe every cycle
+    MARKET_UNIVERSE_REFRESH_SECONDS: float = 900.0  # full /markets walk (new markets) at least this often
+    MARKET_POLL_IDS_PER_REQUEST: int = 100  # markets fetched per /markets?id=... request
+
+    # Incremental sync of the market universe by updatedAt (collectors/market_universe.py)
+    MARKET_DELTA_SYNC: bool = True
+    MARKET_FULL_RESYNC_SECONDS: float = 3600.0  # full walk correcting drift, in place of the refresh above
+    MARKET_DELTA_OVERLAP_SECONDS: float = 60.0  # each delta reaches this far behind the watermark
+    MARKET_DELTA_PAGE_SIZE: int = 100  # smaller than MARKET_PAGE_SIZE: a delta is usually one short page
+
+    # CLOB market websocket (collectors/clob_stream_collector.py)
+    CLOB_WS_URL: str = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
+    CLOB_WS_PING_INTERVAL: float = 10.0  # seconds between application-level PINGs
+    CLOB_WS_MAX_MARKETS: int = 200  # highest-volume live markets subscribed to by default
+
+    # Historical price backfill (collectors/market_backfill.py)
+    CLOB_API_URL: str = "https://clob.polymarket.com"
+    BACKFILL_CHUNK_DAYS: int = 7  # time range fetched per request
+    BACKFILL_FIDELITY_MINUTES: int = 60  # resolution of the fetched price history
+    BACKFILL_CONCURRENCY: int = 8  # chunks downloaded in parallel
+    BACKFILL_CALLS: int = 100  # request budget per BACKFILL_PERIOD seconds, shared by all workers
+    BACKFILL_PERIOD: int = 10
+
+    # Conditional GET / response cache for collector fetches (collectors/http_cache.py)
+    HTTP_CACHE_ENABLED: bool = True
+    HTTP_CACHE_MAX_ENTRIES: int = 256
+    HTTP_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    HTTP_CACHE_DIR: str | None = None  # set to persist cached validators and bodies across restarts
+
+    # Time-partitioned tables (see app.core.partitions)
+    PARTITION_PREMAKE_DAYS: int = 7  # create partitions this many days ahead
+    MARKET_HISTORY_PARTITION_INTERVAL: str = "daily"  # daily | weekly
+    MARKET_HISTORY_RETENTION_DAYS: int = 365  # 0 keeps history forever
+    RAW_EVENTS_PARTITION_INTERVAL: str = "daily"  # daily | weekly
+    RAW_EVENTS_RETENTION_DAYS: int = 0  # 0 keeps raw events forever
+    PARTITION_MAINTENANCE_INTERVAL: float = 3600.0  # seconds between runs in --loop mode
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 settings = Settings()
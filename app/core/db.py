@@ -1,39 +1,351 @@
+import atexit
+import logging
+import os
+import threading
+import time
+import uuid
 import psycopg2
-from psycopg2.extras import Json
+import psycopg2.extensions
+from psycopg2.extras import Json, RealDictCursor, execute_values
 from .config import settings
+from .query_stats import StatementTimer
 from contextlib import contextmanager
 
+logger = logging.getLogger(__name__)
+
+
+class PoolError(psycopg2.Error):
+    """Raised when a connection cannot be checked out of the pool."""
+
+
+class _PoolEntry:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool.
+    Connections are pinged on checkout when they have been idle for a while, and recycled
+    once they exceed the configured maximum age. Callers block (up to acquire_timeout)
+    when all max_size connections are checked out.
+    """
+
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 10, acquire_timeout: float = 30.0,
+                 max_conn_age: float = 1800.0, max_idle: float = 300.0, health_check_after: float = 30.0):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f"Invalid pool bounds: min_size={min_size}, max_size={max_size}")
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.max_conn_age = max_conn_age
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+        self.pid = os.getpid()
+
+        self._cond = threading.Condition()
+        self._idle: list[_PoolEntry] = []  # LIFO, so hot connections are reused first
+        self._in_use: dict[int, _PoolEntry] = {}
+        self._size = 0  # open connections, idle + in use
+        self._closed = False
+
+        for _ in range(min_size):
+            self._idle.append(self._connect())
+            self._size += 1
+
+    def _connect(self) -> _PoolEntry:
+        return _PoolEntry(psycopg2.connect(self.dsn))
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _close_entry(self, entry: _PoolEntry):
+        self._close_quietly(entry.conn)
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _is_expired(self, entry: _PoolEntry, now: float) -> bool:
+        if entry.conn.closed:
+            return True
+        if self.max_conn_age and now - entry.created_at > self.max_conn_age:
+            return True
+        # Only shrink idle connections beyond the configured minimum.
+        return bool(self.max_idle) and now - entry.last_used > self.max_idle and self._size > self.min_size
+
+    def _is_healthy(self, entry: _PoolEntry) -> bool:
+        if time.monotonic() - entry.last_used < self.health_check_after:
+            return True
+        try:
+            with entry.conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            entry.conn.rollback()
+            return True
+        except psycopg2.Error as e:
+            logger.warning(f"Discarding pooled connection that failed health check: {e}")
+            return False
+
+    def acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            entry, expired, reserved = None, [], False
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolError("Connection pool is closed")
+                    now = time.monotonic()
+                    while self._idle:
+                        candidate = self._idle.pop()
+                        if self._is_expired(candidate, now):
+                            expired.append(candidate)
+                            self._size -= 1
+                            continue
+                        entry = candidate
+                        break
+                    if entry:
+                        break
+                    if self._size < self.max_size:
+                        # Reserve the slot before connecting so concurrent callers cannot overshoot max_size.
+                        self._size += 1
+                        reserved = True
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise PoolError(
+                            f"Timed out after {self.acquire_timeout}s waiting for a database connection")
+                    self._cond.wait(remaining)
+
+            for stale in expired:
+                self._close_quietly(stale.conn)
+            if reserved:
+                try:
+                    entry = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_healthy(entry):
+                self._close_entry(entry)
+                continue
+
+            with self._cond:
+                self._in_use[id(entry.conn)] = entry
+            return entry.conn
+
+    def release(self, conn, discard: bool = False):
+        with self._cond:
+            entry = self._in_use.pop(id(conn), None)
+        if entry is None:
+            logger.warning("Attempted to release a connection that does not belong to this pool")
+            return
+
+        if not discard and not conn.closed:
+            try:
+                # Never hand out a connection with an open or aborted transaction.
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        now = time.monotonic()
+        too_old = self.max_conn_age and now - entry.created_at > self.max_conn_age
+        if discard or self._closed or conn.closed or too_old:
+            self._close_entry(entry)
+            return
+
+        entry.last_used = now
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            self._close_entry(entry)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"size": self._size, "idle": len(self._idle), "in_use": len(self._in_use),
+                    "min_size": self.min_size, "max_size": self.max_size}
+
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+# Pools inherited from the parent process. They are kept referenced, and never closed, for the life of the
+# child: freeing their connections would run PQfinish, which sends Terminate on sockets the parent still uses.
+_abandoned_pools: list[ConnectionPool] = []
+
+
+def _abandon_inherited_pool():
+    global _pool
+    if _pool is not None and _pool.pid != os.getpid():
+        _abandoned_pools.append(_pool)
+        _pool = None
+
+
+def _after_fork_in_child():
+    global _pool_lock
+    _pool_lock = threading.Lock()  # another parent thread may have held it at fork time
+    _abandon_inherited_pool()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def get_pool() -> ConnectionPool:
+    """Returns the process-wide pool, creating it lazily (and again after a fork)."""
+    global _pool
+    pool = _pool
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _pool_lock:
+        _abandon_inherited_pool()
+        if _pool is None:
+            _pool = ConnectionPool(
+                settings.DATABASE_URL,
+                min_size=settings.DB_POOL_MIN_SIZE,
+                max_size=settings.DB_POOL_MAX_SIZE,
+                acquire_timeout=settings.DB_POOL_ACQUIRE_TIMEOUT,
+                max_conn_age=settings.DB_POOL_MAX_CONN_AGE,
+                max_idle=settings.DB_POOL_MAX_IDLE,
+                health_check_after=settings.DB_POOL_HEALTH_CHECK_AFTER,
+            )
+        return _pool
+
+
+@atexit.register
+def close_db_pool():
+    global _pool
+    with _pool_lock:
+        _abandon_inherited_pool()
+        if _pool is not None:
+            _pool.close()
+        _pool = None
+
+
 @contextmanager
 def get_db_connection():
+    pool = get_pool()
     conn = None
+    discard = False
     try:
-        conn = psycopg2.connect(settings.DATABASE_URL)
+        conn = pool.acquire()
         yield conn
     except Exception as e:
-        print(f"Database connection error: {e}")
+        logger.error(f"Database connection error: {e}")
+        # Broken connections are dropped; anything else is rolled back on release.
+        discard = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
         raise
     finally:
-        if conn:
-            conn.close()
+        if conn is not None:
+            pool.release(conn, discard=discard)
+
+def pool_stats() -> dict | None:
+    """Size/idle/in-use counts of the current process's pool, or None if it hasn't been created yet."""
+    pool = _pool
+    return pool.stats() if pool is not None and pool.pid == os.getpid() else None
 
 def execute_query(query, params=None, fetch_one=False, fetch_all=False, commit=False):
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(query, params)
-
-            result = None
-            if fetch_one:
-                result = cur.fetchone()
-            elif fetch_all:
-                result = cur.fetchall()
-
-            if commit:
-                conn.commit()
-                # If a fetch operation was performed, return its result.
-                # Otherwise (commit only), return rowcount as an indicator of affected rows.
-                if fetch_one or fetch_all:
-                    return result
-                return cur.rowcount
-
-            # If not committing, but a fetch operation was performed, return its result.
-            return result
+    timer = StatementTimer(query)
+    try:
+        with get_db_connection() as conn:
+            timer.acquired(conn)
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+
+                result = None
+                if fetch_one:
+                    result = cur.fetchone()
+                elif fetch_all:
+                    result = cur.fetchall()
+                timer.executed(cur.rowcount)
+
+                if commit:
+                    conn.commit()
+                    timer.committed()
+                    # If a fetch operation was performed, return its result.
+                    # Otherwise (commit only), return rowcount as an indicator of affected rows.
+                    if fetch_one or fetch_all:
+                        return result
+                    return cur.rowcount
+
+                # If not committing, but a fetch operation was performed, return its result.
+                return result
+    except Exception:
+        timer.error = True
+        raise
+    finally:
+        timer.finish()
+
+def stream_query(query, params=None, chunk_size=1000, as_dict=False):
+    """
+    Generator that runs query on a named (server-side) cursor and yields lists of up to chunk_size rows,
+    so client memory stays flat however many rows come back. Rows are tuples, or dicts with as_dict=True.
+    The pooled connection is held until the generator is exhausted or closed.
+    """
+    cursor_factory = RealDictCursor if as_dict else None
+    timer = StatementTimer(query)
+    rows_streamed = 0
+    try:
+        with get_db_connection() as conn:
+            timer.acquired(conn)
+            # Named cursors live inside the implicit transaction, which release() rolls back.
+            with conn.cursor(name=f"stream_{uuid.uuid4().hex}", cursor_factory=cursor_factory) as cur:
+                cur.itersize = chunk_size
+                cur.execute(query, params)
+                while True:
+                    rows = cur.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    rows_streamed += len(rows)
+                    yield rows
+            # Execution time here includes the time the consumer spent between chunks.
+            timer.executed(rows_streamed)
+    except Exception:
+        timer.error = True
+        raise
+    finally:
+        timer.finish()
+
+@contextmanager
+def transaction(name=None):
+    """
+    Yields a cursor whose statements run in one transaction; commits on success, rolls back on error.
+    Stats are recorded under `name` (e.g. the main statement), since the block may run several.
+    """
+    timer = StatementTimer(name or "<transaction>")
+    try:
+        with get_db_connection() as conn:
+            timer.acquired(conn)
+            with conn.cursor() as cur:
+                yield cur
+                timer.executed(cur.rowcount)
+            conn.commit()
+            timer.committed()
+    except Exception:
+        timer.error = True
+        raise
+    finally:
+        timer.finish()
+
+def execute_batch_query(query, argslist, template=None, page_size=1000, fetch=False):
+    """
+    Runs a multi-row statement (e.g. INSERT ... VALUES %s) over argslist in a single transaction,
+    sending page_size rows per round trip. Returns the fetched rows, in input order, if fetch=True.
+    """
+    with transaction(name=query) as cur:
+        result = execute_values(cur, query, argslist, template=template, page_size=page_size, fetch=fetch)
+    return result if fetch else None
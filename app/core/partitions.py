@@ -0,0 +1,149 @@
+import logging
+import re
+from datetime import date, datetime, timedelta, timezone
+
+from psycopg2 import sql
+
+from .config import settings
+from .db import execute_query
+
+logger = logging.getLogger(__name__)
+
+INTERVAL_DAYS = {"daily": 1, "weekly": 7}
+
+# Range-partitioned tables managed by workers/partition_maintenance_worker.py.
+# retention_days <= 0 keeps every partition.
+PARTITIONED_TABLES = {
+    "market_snapshot_history": {
+        "interval": settings.MARKET_HISTORY_PARTITION_INTERVAL,
+        "retention_days": settings.MARKET_HISTORY_RETENTION_DAYS,
+    },
+    "raw_data_events": {
+        "interval": settings.RAW_EVENTS_PARTITION_INTERVAL,
+        "retention_days": settings.RAW_EVENTS_RETENTION_DAYS,
+    },
+}
+
+
+def partition_name(table: str, lower_bound: date) -> str:
+    return f"{table}_p{lower_bound:%Y%m%d}"
+
+
+def partition_start(day: date, interval: str) -> date:
+    """Lower bound of the partition holding `day` (weekly partitions start on Monday)."""
+    if interval not in INTERVAL_DAYS:
+        raise ValueError(f"Unsupported partition interval '{interval}'. Use one of {list(INTERVAL_DAYS)}.")
+    return day - timedelta(days=day.weekday()) if interval == "weekly" else day
+
+
+_RANGE_BOUND = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def _parse_bound(value: str) -> datetime:
+    """A range bound as rendered by pg_get_expr: timestamptz with a '+HH' offset, or naive (UTC) timestamp."""
+    parsed = datetime.fromisoformat(re.sub(r"([+-]\d{2})$", r"\1:00", value))
+    return parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed.astimezone(timezone.utc)
+
+
+def list_partitions(table: str) -> list[tuple[str, datetime, datetime]]:
+    """
+    Returns (partition_name, lower_bound, upper_bound) for every range partition of `table`, oldest first,
+    read from the partition bounds themselves, so partitions of any interval (or made by hand) are covered.
+    """
+    query = """
+    SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) FROM pg_inherits
+    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE parent.relname = %s;
+    """
+    partitions = []
+    for name, bound in execute_query(query, (table,), fetch_all=True) or []:
+        match = _RANGE_BOUND.search(bound or "")
+        if match is None:
+            continue  # the default partition
+        try:
+            partitions.append((name, _parse_bound(match.group(1)), _parse_bound(match.group(2))))
+        except ValueError:
+            logger.warning(f"Unparseable bounds for partition {name} of {table}: {bound}")
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def _uncovered_ranges(lower: date, upper: date,
+                      covered: list[tuple[datetime, datetime]]) -> list[tuple[date, date]]:
+    """The parts of [lower, upper), in whole days, that no existing partition covers."""
+    gaps, gap_start = [], None
+    day = lower
+    while day < upper:
+        day_start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+        day_end = day_start + timedelta(days=1)
+        overlapped = any(start < day_end and end > day_start for start, end in covered)
+        if not overlapped and gap_start is None:
+            gap_start = day
+        elif overlapped and gap_start is not None:
+            gaps.append((gap_start, day))
+            gap_start = None
+        day += timedelta(days=1)
+    if gap_start is not None:
+        gaps.append((gap_start, upper))
+    return gaps
+
+
+def ensure_partitions(table: str, interval: str = "daily", days_ahead: int | None = None,
+                      start: date | None = None) -> list[str]:
+    """
+    Creates the partitions covering [start, today + days_ahead]. Existing partitions are left alone, whatever
+    their interval: where they already cover part of a period (e.g. the daily partitions premade by the
+    migrations when `interval` is weekly), only the uncovered days get a partition.
+    Returns the names of the partitions that were created.
+    """
+    days_ahead = settings.PARTITION_PREMAKE_DAYS if days_ahead is None else days_ahead
+    today = datetime.now(timezone.utc).date()
+    lower = partition_start(start or today, interval)
+    step = timedelta(days=INTERVAL_DAYS[interval])
+    covered = [(start, end) for _, start, end in list_partitions(table)]
+
+    created = []
+    while lower <= today + timedelta(days=days_ahead):
+        for gap_lower, gap_upper in _uncovered_ranges(lower, lower + step, covered):
+            name = partition_name(table, gap_lower)
+            query = sql.SQL(
+                "CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES FROM ({}) TO ({});"
+            ).format(
+                sql.Identifier(name), sql.Identifier(table),
+                sql.Literal(f"{gap_lower.isoformat()} 00:00:00+00"),
+                sql.Literal(f"{gap_upper.isoformat()} 00:00:00+00"),
+            )
+            try:
+                execute_query(query, commit=True)
+                created.append(name)
+                logger.info(f"Created partition {name} for [{gap_lower}, {gap_upper}).")
+            except Exception as e:
+                # Typically rows already in the default partition for this range.
+                logger.error(f"Could not create partition {name} of {table}: {e}")
+        lower += step
+    return created
+
+
+def drop_partitions_older_than(table: str, retention_days: int, interval: str = "daily") -> list[str]:
+    """
+    Drops partitions whose whole range lies before now - retention_days (judged by each partition's own
+    upper bound, so a mix of intervals is fine). Returns the dropped names.
+    """
+    if retention_days <= 0:
+        return []
+    today = datetime.now(timezone.utc).date()
+    midnight = datetime(today.year, today.month, today.day, tzinfo=timezone.utc)
+    cutoff = midnight - timedelta(days=retention_days)
+    dropped = []
+    for name, _, upper in list_partitions(table):
+        if upper > cutoff:
+            continue
+        if not name.startswith(f"{table}_p"):
+            continue  # created by hand
+        try:
+            execute_query(sql.SQL("DROP TABLE IF EXISTS {};").format(sql.Identifier(name)), commit=True)
+            dropped.append(name)
+            logger.info(f"Dropped partition {name} (older than {retention_days} days).")
+        except Exception as e:
+            logger.error(f"Could not drop partition {name} of {table}: {e}")
+    return dropped
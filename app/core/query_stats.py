@@ -0,0 +1,189 @@
+import logging
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+from .config import settings
+
+logger = logging.getLogger("app.core.db.slow_queries")
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended.
+BUCKET_BOUNDS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+MAX_FINGERPRINTS = 500  # further distinct statements are folded into OVERFLOW_FINGERPRINT
+OVERFLOW_FINGERPRINT = "<other>"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_VALUES_LIST = re.compile(r"VALUES\s*\(.*?\)(?:\s*,\s*\(.*?\))+", re.IGNORECASE | re.DOTALL)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(query: str) -> str:
+    """Normalizes a statement so every execution of the same shape shares one set of stats."""
+    text = _STRING_LITERAL.sub("?", query)
+    text = _PLACEHOLDER.sub("?", text)
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _VALUES_LIST.sub("VALUES (...)", text)
+    text = _WHITESPACE.sub(" ", text).strip().rstrip(";")
+    return text[:300]
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms: float):
+        index = 0
+        while index < len(BUCKET_BOUNDS_MS) and value_ms > BUCKET_BOUNDS_MS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (max for the open-ended bucket)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return BUCKET_BOUNDS_MS[index] if index < len(BUCKET_BOUNDS_MS) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5), "p95_ms": self.percentile(0.95), "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max, 3),
+            "buckets": {f"le_{bound}": n for bound, n in zip(BUCKET_BOUNDS_MS, self.counts)}
+            | {"inf": self.counts[-1]},
+        }
+
+
+class StatementStats:
+    __slots__ = ("acquire", "execute", "commit", "total", "rows", "errors")
+
+    def __init__(self):
+        self.acquire = Histogram()
+        self.execute = Histogram()
+        self.commit = Histogram()
+        self.total = Histogram()
+        self.rows = 0
+        self.errors = 0
+
+    def to_dict(self) -> dict:
+        return {"calls": self.total.count, "errors": self.errors, "rows": self.rows,
+                "acquire": self.acquire.to_dict(), "execute": self.execute.to_dict(),
+                "commit": self.commit.to_dict(), "total": self.total.to_dict()}
+
+
+class QueryStatsRegistry:
+    def __init__(self, slow_query_ms: float, max_slow_queries: int = 100):
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._stats: dict[str, StatementStats] = {}
+        self._slow_queries: deque = deque(maxlen=max_slow_queries)
+
+    def record(self, statement: str, acquire_ms: float | None, execute_ms: float | None,
+               commit_ms: float | None, total_ms: float, rows: int | None, error: bool = False):
+        with self._lock:
+            stats = self._stats.get(statement)
+            if stats is None:
+                if len(self._stats) >= MAX_FINGERPRINTS:
+                    statement = OVERFLOW_FINGERPRINT
+                stats = self._stats.setdefault(statement, StatementStats())
+            if acquire_ms is not None:
+                stats.acquire.observe(acquire_ms)
+            if execute_ms is not None:
+                stats.execute.observe(execute_ms)
+            if commit_ms is not None:
+                stats.commit.observe(commit_ms)
+            stats.total.observe(total_ms)
+            if rows is not None and rows > 0:
+                stats.rows += rows
+            if error:
+                stats.errors += 1
+
+        if self.slow_query_ms and total_ms >= self.slow_query_ms:
+            phases = {"acquire_ms": acquire_ms, "execute_ms": execute_ms, "commit_ms": commit_ms}
+            phases = {phase: round(ms, 3) for phase, ms in phases.items() if ms is not None}
+            self._slow_queries.append({
+                "statement": statement, "at": time.time(), "total_ms": round(total_ms, 3), **phases,
+                "rows": rows, "error": error,
+            })
+            logger.warning(
+                f"Slow query ({total_ms:.1f} ms, {phases}, rows={rows}, error={error}): {statement}")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            statements = {statement: stats.to_dict() for statement, stats in self._stats.items()}
+            slow_queries = list(self._slow_queries)
+        return {"slow_query_ms": self.slow_query_ms, "statements": statements, "slow_queries": slow_queries}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slow_queries.clear()
+
+
+query_stats = QueryStatsRegistry(slow_query_ms=settings.DB_SLOW_QUERY_MS)
+
+
+class StatementTimer:
+    """
+    Times one statement through its phases: connection checkout, execution (including fetch),
+    and commit. Phases that never happen (e.g. commit on a read) are left out of their histogram.
+    """
+    __slots__ = ("query", "start", "mark", "acquire_ms", "execute_ms", "commit_ms", "rows", "error")
+
+    def __init__(self, query):
+        self.query = query
+        self.start = self.mark = time.perf_counter()
+        self.acquire_ms = self.execute_ms = self.commit_ms = None
+        self.rows = None
+        self.error = False
+
+    def _lap(self) -> float:
+        now = time.perf_counter()
+        elapsed, self.mark = (now - self.mark) * 1000, now
+        return elapsed
+
+    def acquired(self, conn):
+        self.acquire_ms = self._lap()
+        if not isinstance(self.query, str) and settings.DB_QUERY_STATS_ENABLED:
+            # psycopg2.sql.Composable needs a connection to render; do it now, while this one is checked out.
+            try:
+                self.query = self.query.as_string(conn)
+            except Exception:
+                self.query = repr(self.query)
+
+    def executed(self, rows: int | None):
+        self.execute_ms = self._lap()
+        self.rows = rows
+
+    def committed(self):
+        self.commit_ms = self._lap()
+
+    def finish(self):
+        if not settings.DB_QUERY_STATS_ENABLED:
+            return
+        total_ms = (time.perf_counter() - self.start) * 1000
+        query_stats.record(self.statement(), self.acquire_ms, self.execute_ms, self.commit_ms,
+                           total_ms, self.rows, self.error)
+
+    def statement(self) -> str:
+        # A Composable is rendered in acquired(); one still unrendered never got a connection.
+        return fingerprint(self.query if isinstance(self.query, str) else repr(self.query))
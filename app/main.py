@@ -1,7 +1,16 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.core.config import settings
+from app.core.async_db import close_async_pool
+from app.core.db import pool_stats
+from app.core.query_stats import query_stats
 
-app = FastAPI(title="Polymarket AI Trader", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await close_async_pool()
+
+app = FastAPI(title="Polymarket AI Trader", version="0.1.0", lifespan=lifespan)
 
 @app.get("/")
 async def root():
@@ -14,6 +23,11 @@ async def health_check():
         "database_url": settings.DATABASE_URL[:20] + "..." if settings.DATABASE_URL else "not configured"
     }
 
+@app.get("/metrics/db")
+async def db_metrics():
+    """Per-statement latency histograms, recent slow queries and pool usage for this process."""
+    return {"pool": pool_stats(), **query_stats.snapshot()}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
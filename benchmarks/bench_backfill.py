@@ -0,0 +1,59 @@
+"""
+MarketBackfill download throughput against the local price-history stand-in at a few pool sizes, with
+simulated API latency. Writes are counted, not sent to the database, so this measures the fetch side.
+
+Usage: python benchmarks/bench_backfill.py [--markets 200] [--days 90] [--latency-ms 80]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from collectors.http_client import CallBudget
+from collectors.market_backfill import MarketBackfill
+from collectors.price_history_server import PriceHistoryServer
+
+
+class DryRunBackfill(MarketBackfill):
+    def prepare_history(self, start):
+        return start
+
+    def completed_chunks(self, market_ids, start, end):
+        return {}
+
+    def write_chunk(self, chunk, points):
+        return len(points)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--markets", type=int, default=200)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    markets = {f"market-{i}": (f"token-{i}", "political") for i in range(args.markets)}
+    end = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    start = end - timedelta(days=args.days)
+    with PriceHistoryServer(latency=args.latency_ms / 1000) as server:
+        for concurrency in args.concurrency:
+            backfill = DryRunBackfill(base_url=server.url, concurrency=concurrency)
+            backfill.call_budget = CallBudget(10**9, 1)  # measure the pool, not the API budget
+            started = time.perf_counter()
+            stats = backfill.run(markets, start, end, resume=False)
+            elapsed = time.perf_counter() - started
+            per_market = elapsed / args.markets
+            print(f"concurrency {concurrency:>3}: {stats['chunks']:,} chunks, {stats['points']:,} points "
+                  f"in {elapsed:.2f}s ({stats['chunks'] / elapsed:,.0f} chunks/s, "
+                  f"~{5000 * per_market / 3600:.1f}h for 5,000 markets)")
+
+
+if __name__ == "__main__":
+    main()
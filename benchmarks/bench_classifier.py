@@ -0,0 +1,90 @@
+"""
+Market categorization over synthetic questions: the per-keyword `any(kw in text ...)` scans the
+collectors used to run, versus collectors.classifier (single pass, then memoized). The legacy and
+uncached timings are the best of three passes.
+
+Usage: python benchmarks/bench_classifier.py [--questions 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from collectors.classifier import MARKET_CATEGORY_KEYWORDS, KeywordClassifier
+
+FILLER_WORDS = (
+    "will the price of bitcoin reach by end of year who win next weather temperature in new york above "
+    "degrees album release movie box office announce before june launch record highest ceo resign"
+).split()
+
+
+def legacy_classify(text: str) -> str:
+    text_lower = text.lower()
+    for category, keywords in MARKET_CATEGORY_KEYWORDS.items():
+        if any(kw in text_lower for kw in keywords):
+            return category
+    return "miscellaneous"
+
+
+def synthetic_questions(count: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    all_keywords = [kw for keywords in MARKET_CATEGORY_KEYWORDS.values() for kw in keywords]
+    questions = []
+    for _ in range(count):
+        words = rng.choices(FILLER_WORDS, k=rng.randint(8, 16))
+        for _ in range(rng.choice((0, 0, 1, 1, 2))):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(all_keywords))
+        questions.append(" ".join(words).capitalize() + "?")
+    return questions
+
+
+def timed(fn, questions) -> tuple[float, list]:
+    start = time.perf_counter()
+    results = [fn(question) for question in questions]
+    return time.perf_counter() - start, results
+
+
+def best_of(fn, questions, repeat: int = 3) -> tuple[float, list]:
+    runs = [timed(fn, questions) for _ in range(repeat)]
+    return min(elapsed for elapsed, _ in runs), runs[0][1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=100_000)
+    args = parser.parse_args()
+
+    questions = synthetic_questions(args.questions)
+    classifier = KeywordClassifier(MARKET_CATEGORY_KEYWORDS, default="miscellaneous",
+                                   cache_size=args.questions)
+    uncached = KeywordClassifier(MARKET_CATEGORY_KEYWORDS, default="miscellaneous", cache_size=0)
+
+    legacy_time, legacy = best_of(legacy_classify, questions)
+    uncached_time, _ = best_of(lambda q: uncached.classify(q).category, questions)
+    # The old MarketCollector classified every market twice per cycle (_fetch_data and _standardize_data).
+    legacy_cycle_time = legacy_time * 2
+    cold_time, cold = timed(lambda q: classifier.classify(q).category, questions)
+    warm_time, _ = timed(lambda q: classifier.classify(q).category, questions)
+
+    mismatches = sum(1 for a, b in zip(legacy, cold) if a != b)
+    n = len(questions)
+    print(f"questions:                      {n:,}")
+    print(f"legacy any() scans:             {legacy_time:.3f}s ({n / legacy_time:,.0f}/s)")
+    print(f"compiled matcher, uncached:     {uncached_time:.3f}s ({n / uncached_time:,.0f}/s)")
+    print(f"compiled matcher, cold:         {cold_time:.3f}s ({n / cold_time:,.0f}/s)")
+    print(f"compiled matcher, memoized:     {warm_time:.3f}s ({n / warm_time:,.0f}/s)")
+    # Market questions rarely change, so after the first cycle every lookup is a cache hit.
+    print(f"per cycle, legacy (2 passes):   {legacy_cycle_time:.3f}s")
+    print(f"first cycle, classifier:        {cold_time + warm_time:.3f}s")
+    print(f"later cycles, classifier:       {2 * warm_time:.3f}s")
+    print(f"category mismatches vs legacy:  {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
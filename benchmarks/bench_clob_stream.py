@@ -0,0 +1,66 @@
+"""
+ClobStreamCollector against the local replay server over loopback: end-to-end message throughput and
+the time from receiving a message to the book-top callbacks having run.
+
+Usage: python benchmarks/bench_clob_stream.py [--messages 50000] [--assets 200]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from collectors.clob_replay_server import ClobReplayServer, synthetic_messages
+from collectors.clob_stream_collector import ClobStreamCollector
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+async def run(message_count: int, asset_count: int):
+    asset_ids = [f"{i:077d}" for i in range(asset_count)]
+    messages = synthetic_messages(asset_ids, message_count)
+    collector = ClobStreamCollector(asset_ids, on_top=[lambda top: None])
+    latencies = []
+    handle_message = collector.handle_message
+
+    def timed_handle(raw):
+        received = time.perf_counter()
+        applied = handle_message(raw)
+        latencies.append(time.perf_counter() - received)
+        return applied
+
+    collector.handle_message = timed_handle
+    async with ClobReplayServer(messages, speed=0.0) as server:
+        collector.url = server.url
+        start = time.perf_counter()
+        await collector.run(max_messages=len(messages))
+        elapsed = time.perf_counter() - start
+    return collector, latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument("--assets", type=int, default=200)
+    args = parser.parse_args()
+
+    collector, latencies, elapsed = asyncio.run(run(args.messages, args.assets))
+    stats = collector.stats
+    print(f"messages:                    {stats['messages']:,} over {args.assets} assets")
+    print(f"end to end (loopback):       {elapsed:.3f}s ({stats['messages'] / elapsed:,.0f} msg/s)")
+    print(f"book-top changes published:  {stats['top_changes']:,}")
+    print(f"receive -> callbacks, p50:   {percentile(latencies, 50) * 1e6:.1f}µs")
+    print(f"receive -> callbacks, p99:   {percentile(latencies, 99) * 1e6:.1f}µs")
+    print(f"receive -> callbacks, max:   {max(latencies) * 1e3:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
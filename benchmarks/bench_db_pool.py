@@ -0,0 +1,69 @@
+"""
+Inserts per second with a fresh connection per statement (the old get_db_connection behaviour)
+versus the pooled get_db_connection.
+
+Usage: python benchmarks/bench_db_pool.py [--rows 500]
+Needs DATABASE_URL; writes to a scratch table that is dropped afterwards.
+"""
+import argparse
+import os
+import sys
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import psycopg2
+
+from app.core.config import settings
+from app.core.db import Json, execute_query
+
+TABLE = "bench_pool_inserts"
+INSERT = f"INSERT INTO {TABLE} (payload) VALUES (%s) RETURNING id;"
+
+
+def insert_unpooled(rows: int) -> float:
+    start = time.perf_counter()
+    for i in range(rows):
+        conn = psycopg2.connect(settings.DATABASE_URL)
+        try:
+            with conn.cursor() as cur:
+                cur.execute(INSERT, (Json({"i": i, "mode": "unpooled"}),))
+                cur.fetchone()
+            conn.commit()
+        finally:
+            conn.close()
+    return rows / (time.perf_counter() - start)
+
+
+def insert_pooled(rows: int) -> float:
+    start = time.perf_counter()
+    for i in range(rows):
+        execute_query(INSERT, (Json({"i": i, "mode": "pooled"}),), fetch_one=True, commit=True)
+    return rows / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500)
+    args = parser.parse_args()
+
+    execute_query(f"CREATE TABLE IF NOT EXISTS {TABLE} (id BIGSERIAL PRIMARY KEY, payload JSONB);",
+                  commit=True)
+    try:
+        insert_pooled(10)  # warm the pool so the first checkout isn't counted
+        before = insert_unpooled(args.rows)
+        after = insert_pooled(args.rows)
+    finally:
+        execute_query(f"DROP TABLE IF EXISTS {TABLE};", commit=True)
+
+    print(f"rows per run:        {args.rows}")
+    print(f"unpooled inserts/s:  {before:,.1f}")
+    print(f"pooled inserts/s:    {after:,.1f}")
+    print(f"speedup:             {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Requests and markets parsed per MarketCollector cycle with the universe walked every cycle versus delta
+sync by updatedAt, at a few universe sizes and a fixed churn, against an in-memory stand-in for Gamma's
+/markets pages (a page whose content did not change since it was last served counts as a 304).
+Also checks that the delta-synced universe matches the stand-in's live markets.
+
+Usage: python benchmarks/bench_delta_sync.py [--sizes 5000,20000,80000] [--churn 50] [--cycles 20]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from app.core.config import settings
+from collectors.market_collector import ALL_CATEGORIES, MarketCollector
+
+
+class FakeGamma:
+    """Live markets sorted per request like Gamma; touch() updates, creates and closes markets."""
+
+    def __init__(self, size: int, seed: int):
+        self.rng = random.Random(seed)
+        self.now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        self.markets = {}
+        for _ in range(size):
+            self._create(timedelta(minutes=1))  # the existing universe was created over time
+        self.calls = self.parsed = 0
+        self._served: dict[tuple, str] = {}
+        self._sorted: dict[tuple, list[dict]] = {}
+
+    def _stamp(self, step: timedelta = timedelta(milliseconds=10)) -> str:
+        self.now += step
+        return self.now.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+    def _create(self, step: timedelta = timedelta(milliseconds=10)):
+        market_id = str(len(self.markets) + 1)
+        stamp = self._stamp(step)
+        self.markets[market_id] = {
+            "id": market_id, "question": f"Will event {market_id} happen?", "endDate": "2030-01-01T00:00:00Z",
+            "active": True, "closed": False, "lastTradePrice": round(self.rng.random(), 3),
+            "volume": self.rng.lognormvariate(8, 2), "createdAt": stamp, "updatedAt": stamp,
+        }
+
+    def touch(self, churn: int):
+        """One collector cycle (a minute) worth of changes."""
+        self._sorted.clear()
+        self.now += timedelta(minutes=1)
+        live = [market for market in self.markets.values() if not market["closed"]]
+        for market in self.rng.sample(live, churn):
+            roll = self.rng.random()
+            if roll < 0.05:
+                market["closed"] = True
+            else:
+                market["lastTradePrice"] = round(self.rng.random(), 3)
+            market["updatedAt"] = self._stamp()
+        for _ in range(max(1, churn // 20)):
+            self._create()
+
+    def page(self, params: dict, offset: int, limit: int) -> tuple[list[dict], bool]:
+        self.calls += 1
+        order = (params.get("order"), params.get("closed"))
+        markets = self._sorted.get(order)
+        if markets is None:
+            markets = [market for market in self.markets.values()
+                       if params.get("closed") is not False or not market["closed"]]
+            key = "updatedAt" if params.get("order") == "updatedAt" else "volume"
+            markets = self._sorted[order] = sorted(markets, key=lambda market: market[key], reverse=True)
+        page = [dict(market) for market in markets[offset:offset + limit]]
+        digest = hashlib.sha1(json.dumps(page, sort_keys=True).encode()).hexdigest()
+        cache_key = (params.get("order"), offset)
+        changed = self._served.get(cache_key) != digest
+        self._served[cache_key] = digest
+        if changed:
+            self.parsed += len(page)
+        return page, changed
+
+
+def run(size: int, churn: int, cycles: int, delta: bool, seed: int) -> tuple[float, float, float, bool]:
+    settings.MARKET_DELTA_SYNC = delta
+    gamma = FakeGamma(size, seed)
+    collector = MarketCollector(ALL_CATEGORIES)
+    collector.poll_scheduler = None
+    collector.change_detector = None
+    collector.max_pages = size // collector.page_size + 2
+    def fetch_page(params, offset, limit=None):
+        return gamma.page(params, offset, limit or collector.page_size)
+
+    collector._fetch_market_page = fetch_page
+    collector._fetch_data()  # initial full walk
+    collector._commit_cycle()  # stands in for a successful store
+    gamma.calls = gamma.parsed = 0
+    elapsed = 0.0
+    for _ in range(cycles):
+        gamma.touch(churn)
+        started = time.perf_counter()
+        collector._fetch_data()
+        elapsed += time.perf_counter() - started
+        collector._commit_cycle()
+    live = {market_id for market_id, market in gamma.markets.items() if not market["closed"]}
+    universe = collector.market_universe.markets
+    in_sync = set(universe) == live and all(
+        universe[market_id]["updatedAt"] == gamma.markets[market_id]["updatedAt"] for market_id in live
+    )
+    return gamma.calls / cycles, gamma.parsed / cycles, elapsed / cycles, in_sync
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="5000,20000,80000")
+    parser.add_argument("--churn", type=int, default=50, help="markets updated per cycle")
+    parser.add_argument("--cycles", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    print(f"churn {args.churn} markets per cycle, {args.cycles} cycles; per-cycle averages")
+    print(f"{'universe':>9} {'mode':<14}{'requests':>9}{'parsed':>10}{'fetch ms':>10}  universe in sync")
+    for size in (int(value) for value in args.sizes.split(",")):
+        for delta in (False, True):
+            calls, parsed, seconds, in_sync = run(size, args.churn, args.cycles, delta, args.seed)
+            mode = "delta sync" if delta else "full walk"
+            print(f"{size:>9,} {mode:<14}{calls:>9.1f}{parsed:>10.0f}{seconds * 1e3:>10.1f}  {in_sync}")
+
+
+if __name__ == "__main__":
+    main()
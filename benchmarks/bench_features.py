@@ -0,0 +1,129 @@
+"""
+analysis/features.py on a synthetic history of 10k markets x 10k intervals (float32): latest features for
+every market, the full feature series, and incremental updates, compared with a per-market Python loop.
+
+Usage: python benchmarks/bench_features.py [--markets 10000] [--points 10000] [--loop-markets 200]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from analysis.features import (
+    FeatureConfig,
+    HistoryMatrix,
+    IncrementalFeatures,
+    compute_feature_series,
+    compute_features,
+)
+
+
+def synthetic_history(markets: int, points: int, seed: int = 5) -> tuple[np.ndarray, np.ndarray]:
+    """Clipped random-walk prices and cumulative volumes, generated a block of markets at a time."""
+    rng = np.random.default_rng(seed)
+    price = np.empty((markets, points), dtype=np.float32)
+    volume = np.empty((markets, points), dtype=np.float32)
+    for block in range(0, markets, 1000):
+        rows = slice(block, block + 1000)
+        count = len(range(markets)[rows])
+        steps = rng.normal(0, 0.005, (count, points)).astype(np.float32)
+        start = rng.uniform(0.1, 0.9, (count, 1)).astype(np.float32)
+        price[rows] = np.clip(start + np.cumsum(steps, axis=1), 0.01, 0.99)
+        volume[rows] = np.cumsum(rng.uniform(0, 100, (count, points)).astype(np.float32), axis=1)
+    return price, volume
+
+
+def python_features(prices: list[float], volumes: list[float], config: FeatureConfig) -> dict[str, float]:
+    """The same latest features for one market with plain Python lists."""
+    last = prices[-1]
+    returns = [prices[i] / prices[i - 1] - 1
+               for i in range(len(prices) - config.volatility_window, len(prices))]
+    window = prices[-config.momentum_window:]
+    return {
+        "return_1": returns[-1],
+        "return_window": last / prices[-1 - config.return_window] - 1,
+        "volatility": statistics.stdev(returns),
+        "volume_velocity": (volumes[-1] - volumes[-1 - config.velocity_window])
+        / (config.velocity_window * config.interval_minutes / 60),
+        "momentum": last - sum(window) / len(window),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--markets", type=int, default=10_000)
+    parser.add_argument("--points", type=int, default=10_000)
+    parser.add_argument("--loop-markets", type=int, default=200,
+                        help="markets timed with the Python loop (extrapolated)")
+    parser.add_argument("--appends", type=int, default=100)
+    args = parser.parse_args()
+    config = FeatureConfig()
+
+    started = time.perf_counter()
+    price, volume = synthetic_history(args.markets, args.points)
+    print(f"history:                          {args.markets:,} markets x {args.points:,} points "
+          f"({(price.nbytes + volume.nbytes) / 1e6:.0f} MB, "
+          f"generated in {time.perf_counter() - started:.1f}s)")
+
+    started = time.perf_counter()
+    latest = compute_features(price, volume, config)
+    print(f"compute_features (latest):        {(time.perf_counter() - started) * 1e3:.1f} ms")
+
+    # The series is timed a slice of markets at a time so its (markets x points) outputs need not all fit
+    # in memory at once; the work is identical to a single call.
+    started = time.perf_counter()
+    for block in range(0, args.markets, 2048):
+        series = compute_feature_series(price[block:block + 2048], volume[block:block + 2048], config)
+        del series
+    series_time = time.perf_counter() - started
+    print(f"compute_feature_series (all):     {series_time:.2f} s "
+          f"({series_time / (args.markets * args.points) * 1e9:.1f} ns per market-interval)")
+
+    loop_markets = min(args.loop_markets, args.markets)
+    tail = config.lookback
+    started = time.perf_counter()
+    for row in range(loop_markets):
+        python_features(price[row, -tail:].tolist(), volume[row, -tail:].tolist(), config)
+    loop_time = (time.perf_counter() - started) / loop_markets * args.markets
+    print(f"Python loop (latest, estimated):  {loop_time * 1e3:.1f} ms ({loop_markets} markets timed)")
+
+    # Per-market series in pure Python scale with markets x points x window; extrapolate from one market.
+    started = time.perf_counter()
+    prices, volumes = price[0].tolist(), volume[0].tolist()
+    for end in range(tail, args.points + 1, max(1, args.points // 100)):
+        python_features(prices[end - tail:end], volumes[end - tail:end], config)
+    samples = len(range(tail, args.points + 1, max(1, args.points // 100)))
+    series_loop = (time.perf_counter() - started) / samples * args.points * args.markets
+    print(f"Python loop (series, estimated):  {series_loop:.0f} s")
+
+    market_ids = [f"m{i}" for i in range(args.markets)]
+    history = HistoryMatrix(market_ids, np.arange(args.points) * 3600, price, volume)
+    incremental = IncrementalFeatures.from_history(history, config)
+    check = incremental.features()
+    assert all(np.allclose(check[name], latest[name], rtol=1e-4, equal_nan=True) for name in latest)
+    rng = np.random.default_rng(7)
+    last_price, last_volume = price[:, -1].copy(), volume[:, -1].copy()
+    append_time = features_time = 0.0
+    for _ in range(args.appends):
+        last_price = np.clip(last_price + rng.normal(0, 0.005, args.markets).astype(np.float32), 0.01, 0.99)
+        last_volume = last_volume + rng.uniform(0, 100, args.markets).astype(np.float32)
+        started = time.perf_counter()
+        incremental.append(last_price, last_volume)
+        append_time += time.perf_counter() - started
+        started = time.perf_counter()
+        incremental.features()
+        features_time += time.perf_counter() - started
+    print(f"incremental append:               {append_time / args.appends * 1e3:.2f} ms per interval")
+    print(f"incremental features():           {features_time / args.appends * 1e3:.2f} ms per interval")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+MarketStateStore at 100k markets: memory, single-market reads, vectorized filters and top-N, compared
+with the same queries over a dict of per-market dicts.
+
+Usage: python benchmarks/bench_market_state.py [--markets 100000]
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+import timeit
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from collectors.market_state_store import BUILTIN_CATEGORIES, MarketStateStore
+
+
+def per_call(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--markets", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    now = time.time()
+    store, dicts = MarketStateStore(), {}
+    started = time.perf_counter()
+    for i in range(args.markets):
+        row = dict(price=rng.random(), volume=rng.lognormvariate(8, 2), liquidity=rng.lognormvariate(6, 2),
+                   category=rng.choice(BUILTIN_CATEGORIES), ends_at=now + rng.uniform(0, 90 * 86400),
+                   updated_at=now)
+        store.upsert(f"m{i}", **row)
+        dicts[f"m{i}"] = row
+    load_time = time.perf_counter() - started
+    ids = [f"m{rng.randrange(args.markets)}" for _ in range(1000)]
+    market_id = ids[0]
+
+    print(f"markets:                          {len(store):,} (loaded in {load_time:.2f}s)")
+    print(f"column memory:                    {store.nbytes / 1e6:.1f} MB")
+    row_bytes = sum(sys.getsizeof(state) + sum(sys.getsizeof(value) for value in state[2:])
+                    for state in map(store.get, dicts))
+    print(f"row objects for get(id):          {row_bytes / 1e6:.1f} MB")
+    store_price = per_call(lambda: store.price(market_id), 100_000)
+    dict_price = per_call(lambda: dicts[market_id]['price'], 100_000)
+    print(f"price(id):                        {store_price * 1e9:.0f} ns")
+    print(f"dict-of-dicts price lookup:       {dict_price * 1e9:.0f} ns")
+    print(f"get(id) full row:                 {per_call(lambda: store.get(market_id), 100_000) * 1e9:.0f} ns")
+
+    def dict_filter():
+        return [k for k, v in dicts.items() if v["category"] == "sports" and v["volume"] >= 5000
+                and now <= v["ends_at"] <= now + 48 * 3600]
+
+    def dict_top():
+        return heapq.nlargest(20, dicts.items(), key=lambda kv: kv[1]["volume"])
+
+    def store_filter():
+        return store.filter(category="sports", min_volume=5000, expiring_within_hours=48, now=now)
+
+    def store_top():
+        return store.top(20, by="volume")
+
+    assert sorted(store_filter()) == sorted(dict_filter())
+    print(f"filter (category, volume, 48h):   {per_call(store_filter, 20) * 1e3:.2f} ms "
+          f"(dicts: {per_call(dict_filter, 5) * 1e3:.2f} ms)")
+    print(f"top 20 by volume:                 {per_call(store_top, 20) * 1e3:.2f} ms "
+          f"(dicts: {per_call(dict_top, 5) * 1e3:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Simulated price freshness of MarketCollector's two polling modes under the same Gamma budget
+(CALLS per PERIOD): walking the whole universe in pages of MARKET_PAGE_SIZE as fast as the budget allows,
+versus AdaptivePollingScheduler polling due markets by id plus a full walk every
+MARKET_UNIVERSE_REFRESH_SECONDS. Markets follow random walks with a mix of volatilities (most dormant);
+error is |true price - last fetched price|, sampled every cycle.
+
+Usage: python benchmarks/bench_polling.py [--markets 20000] [--hours 2] [--cycle-seconds 15]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from collectors.polling_scheduler import AdaptivePollingScheduler
+
+CALLS, PERIOD = 30, 60  # MarketCollector.CALLS / PERIOD
+PAGE_SIZE = 500
+IDS_PER_REQUEST = 250
+UNIVERSE_REFRESH_SECONDS = 900
+
+# (share of markets, hourly volatility, median 24h volume)
+PROFILES = ((0.05, 0.05, 300_000), (0.15, 0.01, 30_000), (0.30, 0.002, 2_000), (0.50, 0.0, 200))
+
+
+class Simulation:
+    def __init__(self, markets: int, seed: int):
+        rng = np.random.default_rng(seed)
+        shares = np.array([share for share, _, _ in PROFILES])
+        self.profile = rng.choice(len(PROFILES), size=markets, p=shares / shares.sum())
+        self.volatility = np.array([volatility for _, volatility, _ in PROFILES])[self.profile]
+        median_volume = np.array([volume for _, _, volume in PROFILES])[self.profile]
+        self.volume_24h = median_volume * rng.lognormal(0, 0.5, markets)
+        self.ends_at = rng.uniform(3600, 60 * 86400, markets)
+        self.price = rng.uniform(0.1, 0.9, markets)
+        self.seen = self.price.copy()
+        self.rng = rng
+
+    def step(self, seconds: float):
+        moves = self.rng.normal(0, 1, self.price.size) * self.volatility * np.sqrt(seconds / 3600)
+        self.price = np.clip(self.price + moves, 0.01, 0.99)
+
+    def errors(self) -> np.ndarray:
+        return np.abs(self.price - self.seen)
+
+
+def run_universe_walk(sim: Simulation, cycles: int, cycle_seconds: float) -> tuple[np.ndarray, int]:
+    """Pages fetched round-robin at whatever rate the budget allows."""
+    markets = sim.price.size
+    pages = -(-markets // PAGE_SIZE)
+    calls_per_cycle = CALLS * cycle_seconds / PERIOD
+    credit, next_page, calls, errors = 0.0, 0, 0, []
+    for _ in range(cycles):
+        sim.step(cycle_seconds)
+        credit += calls_per_cycle
+        while credit >= 1:
+            rows = slice(next_page * PAGE_SIZE, (next_page + 1) * PAGE_SIZE)
+            sim.seen[rows] = sim.price[rows]
+            next_page = (next_page + 1) % pages
+            credit -= 1
+            calls += 1
+        errors.append(sim.errors())
+    return np.array(errors), calls
+
+
+def run_adaptive(sim: Simulation, cycles: int, cycle_seconds: float) -> tuple[np.ndarray, int, dict]:
+    markets = sim.price.size
+    scheduler = AdaptivePollingScheduler(CALLS, PERIOD, IDS_PER_REQUEST)
+    pages = -(-markets // PAGE_SIZE)
+    now, universe_at, calls, errors = 0.0, None, 0, []
+    for _ in range(cycles):
+        sim.step(cycle_seconds)
+        now += cycle_seconds
+        if universe_at is None or now - universe_at >= UNIVERSE_REFRESH_SECONDS:
+            # The walk is rate limited too: it takes as many cycles as it needs, polling nothing else.
+            scheduler.spend(pages, now)
+            calls += pages
+            sim.seen[:] = sim.price
+            for row in range(markets):
+                scheduler.observe(str(row), float(sim.price[row]), float(sim.volume_24h[row]),
+                                  float(sim.ends_at[row]), now)
+            universe_at = now
+        else:
+            for batch in scheduler.plan(now):
+                scheduler.spend(1, now)
+                calls += 1
+                for market_id in batch:
+                    row = int(market_id)
+                    sim.seen[row] = sim.price[row]
+                    scheduler.observe(market_id, float(sim.price[row]), float(sim.volume_24h[row]),
+                                      float(sim.ends_at[row]), now)
+        errors.append(sim.errors())
+    return np.array(errors), calls, scheduler.bucket_counts()
+
+
+def report(name: str, errors: np.ndarray, calls: int, profile: np.ndarray, hours: float):
+    # Skip the first hour so both modes are past their initial full fetch.
+    errors = errors[len(errors) // 2:] if hours >= 2 else errors
+    by_profile = "  ".join(f"{np.mean(errors[:, profile == index]):.4f}" for index in range(len(PROFILES)))
+    print(f"{name:<16}{calls / hours:>9.0f} {np.mean(errors):>10.4f}   {by_profile}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--markets", type=int, default=20_000)
+    parser.add_argument("--hours", type=float, default=2.0)
+    parser.add_argument("--cycle-seconds", type=float, default=15.0, help="how often the collector runs")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    cycles = int(args.hours * 3600 / args.cycle_seconds)
+
+    walk_sim = Simulation(args.markets, args.seed)
+    walk_errors, walk_calls = run_universe_walk(walk_sim, cycles, args.cycle_seconds)
+    sim = Simulation(args.markets, args.seed)
+    adaptive_errors, adaptive_calls, buckets = run_adaptive(sim, cycles, args.cycle_seconds)
+
+    print(f"{args.markets:,} markets, {args.hours:g} h, budget {CALLS} calls per {PERIOD}s, "
+          f"cycle every {args.cycle_seconds:g}s")
+    volatilities = "  ".join(f"{volatility:<6g}" for _, volatility, _ in PROFILES)
+    print(f"{'':<16}{'calls/h':>9} {'mean err':>10}   mean error by hourly volatility {volatilities}")
+    report("universe walk", walk_errors, walk_calls, sim.profile, args.hours)
+    report("adaptive", adaptive_errors, adaptive_calls, sim.profile, args.hours)
+    print(f"adaptive buckets at the end: {buckets}")
+
+
+if __name__ == "__main__":
+    main()
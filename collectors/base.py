@@ -2,6 +2,7 @@ import time
 import logging
 import sys
 import os
+import threading
 from abc import ABC, abstractmethod
 from tenacity import retry, stop_after_attempt, wait_exponential
 from ratelimit import limits, RateLimitException
@@ -12,6 +13,8 @@ if project_root not in sys.path:
 
 from app.core.config import settings # Corrected import if needed
 from app.core.db import execute_query
+from collectors.http_client import get_call_budget, get_session
+from collectors.http_cache import CacheEntry, CachedFetch, conditional_get, get_response_cache
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -19,11 +22,56 @@ logger = logging.getLogger(__name__)
 class BaseCollector(ABC):
     CALLS = 5
     PERIOD = 60
+    HTTP_TIMEOUT = 15  # seconds, per request
+    HTTP_POOL_SIZE = 4  # keep-alive connections kept per host
 
     def __init__(self, source_name: str, category: str):
         self.source_name = source_name
         self.category = category
         self.logger = logging.getLogger(self.__class__.__name__)
+        # Like the session, the CALLS/PERIOD budget belongs to the source, shared by all its instances.
+        # _http_get spends it on every outbound request (the decorator below only covers the abstract method).
+        self.call_budget = get_call_budget(self.source_name, self.CALLS, self.PERIOD)
+        self.http = get_session(self.source_name, pool_maxsize=self.HTTP_POOL_SIZE)
+        # Cache entries of this cycle's responses, put by commit_cache_entries() once they are persisted.
+        self._pending_cache_entries: dict[str, CacheEntry] = {}
+        self._pending_cache_lock = threading.Lock()
+
+    def _http_get(self, url: str, params: dict | None = None, **kwargs):
+        """Rate-limited GET on the source's shared keep-alive session, with the source's timeout."""
+        self.call_budget.acquire()
+        kwargs.setdefault("timeout", self.HTTP_TIMEOUT)
+        return self.http.get(url, params=params, **kwargs)
+
+    def _http_get_cached(self, url: str, params: dict | None = None, **kwargs) -> CachedFetch:
+        """
+        Conditional GET through the shared response cache. changed=False (a 304, or a body identical
+        to the last one) tells the caller it can skip standardizing and persisting altogether.
+        Pass parse_stream to parse the body incrementally instead of loading it whole (see conditional_get).
+        Entries are kept per source and category, and only saved by commit_cache_entries(): a response
+        whose data failed to persist still counts as changed next time.
+        """
+        cache = get_response_cache() if settings.HTTP_CACHE_ENABLED else None
+        fetch = conditional_get(self._http_get, cache, url, params=params,
+                                namespace=f"{self.source_name}/{self.category}", defer_store=True, **kwargs)
+        if fetch.entry is not None:
+            with self._pending_cache_lock:
+                self._pending_cache_entries[fetch.key] = fetch.entry
+        return fetch
+
+    def commit_cache_entries(self):
+        """Saves the cache entries of the responses fetched since the last commit or discard."""
+        with self._pending_cache_lock:
+            pending, self._pending_cache_entries = self._pending_cache_entries, {}
+        if pending:
+            cache = get_response_cache()
+            for key, entry in pending.items():
+                cache.put(key, entry)
+
+    def discard_cache_entries(self):
+        """Forgets the pending cache entries, so their responses count as changed when fetched again."""
+        with self._pending_cache_lock:
+            self._pending_cache_entries = {}
 
     @abstractmethod
     @limits(calls=CALLS, period=PERIOD)
@@ -7,6 +7,7 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if project_root not in sys.path: sys.path.insert(0, project_root)
 
 from collectors.base import BaseCollector
+from collectors.classifier import breaking_news_classifier
 from app.core.db import execute_query, Json
 
 logger = logging.getLogger(__name__)
@@ -49,10 +50,8 @@ class BreakingNewsMonitor(BaseCollector):
         if "flash" in content_str: urgency = max(urgency, 8)
         if not is_breaking_flag and "important" in content_str: urgency = max(urgency, 5)
 
-        category = event_to_assess.get('category_guess', 'miscellaneous')
-        if any(kw in content_str for kw in ['election', 'president', 'government', 'senate']): category = 'political'
-        elif any(kw in content_str for kw in ['sports', 'game', 'match', 'player']): category = 'sports'
-        elif any(kw in content_str for kw in ['market', 'economy', 'gdp', 'fed', 'stocks']): category = 'economic'
+        category = (breaking_news_classifier.classify(content_str).category
+                    or event_to_assess.get('category_guess', 'miscellaneous'))
 
         if urgency < 5:
             self.logger.info(f"Event {event_to_assess.get('id')} considered not urgent enough by keyword scan ({urgency}).")
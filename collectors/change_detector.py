@@ -0,0 +1,98 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections.abc import Iterable
+
+from app.core.db import stream_query
+from collectors.market_fields import MARKET_STATE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Fields of the market state record (see collectors.market_fields) whose change is worth a new raw event
+# and snapshot. metadata_hash covers the static fields, and with them the derived category.
+MARKET_FINGERPRINT_FIELDS = MARKET_STATE_FIELDS + ("metadata_hash",)
+
+
+def market_fingerprint(market: dict, fields: Iterable[str] = MARKET_FINGERPRINT_FIELDS) -> bytes:
+    values = [market.get(field) for field in fields]
+    return hashlib.blake2b(json.dumps(values, default=str).encode(), digest_size=16).digest()
+
+
+class ChangeDetector:
+    """
+    Keeps a fingerprint and last-emitted time per key, so a collector only emits items whose relevant
+    fields changed, plus unchanged ones whose last emission is older than heartbeat_seconds.
+
+    changed_items() only selects; call record() once the selected items were persisted, so a failed
+    write is retried on the next cycle instead of being considered seen.
+    """
+
+    def __init__(self, heartbeat_seconds: float = 0, fingerprint=market_fingerprint):
+        self.heartbeat_seconds = heartbeat_seconds
+        self.fingerprint = fingerprint
+        self._state: dict[str, tuple[bytes, float]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._state)
+
+    def seed(self, query: str, params=None, chunk_size: int = 5000) -> int:
+        """
+        Loads state from rows of (key, item, emitted_at_epoch) streamed from the DB.
+        Returns the number of keys loaded.
+        """
+        loaded = 0
+        for rows in stream_query(query, params, chunk_size=chunk_size):
+            with self._lock:
+                for key, item, emitted_at in rows:
+                    if key is None or not isinstance(item, dict):
+                        continue
+                    self._state[str(key)] = (self.fingerprint(item), float(emitted_at or 0))
+                    loaded += 1
+        return loaded
+
+    def changed_items(self, items: dict[str, dict], now: float | None = None) -> tuple[dict[str, bytes], int]:
+        """
+        Takes {key: item} and returns ({key: fingerprint} for the items to emit, number of heartbeats
+        among them).
+        """
+        now = time.time() if now is None else now
+        selected, heartbeats = {}, 0
+        with self._lock:
+            for key, item in items.items():
+                fingerprint = self.fingerprint(item)
+                previous = self._state.get(key)
+                if previous is None or previous[0] != fingerprint:
+                    selected[key] = fingerprint
+                elif self.heartbeat_seconds and now - previous[1] >= self.heartbeat_seconds:
+                    selected[key] = fingerprint
+                    heartbeats += 1
+        return selected, heartbeats
+
+    def record(self, fingerprints: dict[str, bytes], now: float | None = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            for key, fingerprint in fingerprints.items():
+                self._state[key] = (fingerprint, now)
+
+    def forget(self, keys: Iterable[str]):
+        with self._lock:
+            for key in keys:
+                self._state.pop(key, None)
+
+    def heartbeat_due(self, keys: Iterable[str], now: float | None = None) -> bool:
+        """
+        True if any of keys (e.g. the markets of the current fetch) is known and has gone heartbeat_seconds
+        without being emitted. Keys that are not passed, such as markets no longer listed, never make it due.
+        """
+        if not self.heartbeat_seconds:
+            return False
+        now = time.time() if now is None else now
+        with self._lock:
+            for key in keys:
+                previous = self._state.get(key)
+                if previous is not None and now - previous[1] >= self.heartbeat_seconds:
+                    return True
+        return False
@@ -0,0 +1,110 @@
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+# Category keyword tables, in priority order: the first category with any matching keyword wins.
+# Keywords match as lowercase substrings, so "econ" also matches "economy".
+MARKET_CATEGORY_KEYWORDS = {
+    "political": ["politic", "election", "government", "vote", "president", "senate", "congress", "biden",
+                  "trump", "white house"],
+    "sports": ["sport", "nfl", "nba", "mlb", "nhl", "soccer", "cup", "league", "game", "match", "player",
+               "olympic", "esports", "football", "basketball", "baseball"],
+    "economic": ["business", "econ", "finance", "stock", "market", "gdp", "fed", "nasdaq", "dow jones",
+                 "inflation", "recession", "interest rate", "earnings", "company"],
+}
+
+BREAKING_NEWS_CATEGORY_KEYWORDS = {
+    "political": ["election", "president", "government", "senate"],
+    "sports": ["sports", "game", "match", "player"],
+    "economic": ["market", "economy", "gdp", "fed", "stocks"],
+}
+
+
+MAX_TERM_COMBINATIONS = 10_000  # per classifier, see KeywordClassifier._by_terms
+
+
+class Classification(NamedTuple):
+    category: str | None
+    matched_terms: tuple[str, ...]
+
+
+def _trie_pattern(keywords: list[str]) -> str:
+    """Builds a regex alternation shaped like a trie, so each text position is rejected after one char."""
+    root: dict = {}
+    for keyword in keywords:
+        node = root
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A keyword ends here but longer ones continue: make the continuation optional (greedy, so the
+        # longest wins).
+        return f"(?:{body})?" if "" in node else body
+
+    return build(root)
+
+
+class KeywordClassifier:
+    """
+    Single-pass multi-keyword classifier.
+    All keywords of a table are compiled into one trie-shaped regex inside a lookahead, so a single
+    findall() pass reports the longest keyword starting at every position, overlapping occurrences
+    included, which keeps the substring semantics of the per-keyword `kw in text` checks it replaces.
+    Uncached, that pass is a little faster than those checks; results are memoized per text, so
+    classifying the same market question again is a dict lookup.
+    """
+
+    def __init__(self, keyword_table: dict[str, list[str]], default: str | None = None,
+                 cache_size: int = 100_000):
+        self.default = default
+        self._priority = {category: rank for rank, category in enumerate(keyword_table)}
+        keywords = {keyword.lower(): category for category in reversed(keyword_table)
+                    for keyword in keyword_table[category]}
+        # The regex reports the longest keyword at each position; rank it by the best category among it
+        # and any shorter keywords that are prefixes of it.
+        self._rank_of = {
+            term: min(self._priority[category] for keyword, category in keywords.items()
+                      if term.startswith(keyword))
+            for term in keywords
+        }
+        self._categories = list(keyword_table)
+        self._findall = re.compile(f"(?=({_trie_pattern(list(keywords))}))").findall
+        self._unmatched = Classification(default, ())
+        # Distinct keyword combinations are few, so texts matching the same terms share one result.
+        self._by_terms: dict[tuple[str, ...], Classification] = {}
+        self._classify_cached = (lru_cache(maxsize=cache_size)(self._classify) if cache_size
+                                 else self._classify)
+
+    def _classify(self, text: str) -> Classification:
+        terms = tuple(self._findall(text.lower()))
+        if not terms:
+            return self._unmatched
+        result = self._by_terms.get(terms)
+        if result is None:
+            best_rank = min(map(self._rank_of.__getitem__, terms))
+            result = Classification(self._categories[best_rank], tuple(dict.fromkeys(terms)))
+            if len(self._by_terms) < MAX_TERM_COMBINATIONS:
+                self._by_terms[terms] = result
+        return result
+
+    def classify(self, text: str | None) -> Classification:
+        if not isinstance(text, str) or not text:
+            return Classification(self.default, ())
+        return self._classify_cached(text)
+
+    def cache_info(self):
+        return self._classify_cached.cache_info() if hasattr(self._classify_cached, "cache_info") else None
+
+    def clear_cache(self):
+        if hasattr(self._classify_cached, "cache_clear"):
+            self._classify_cached.cache_clear()
+
+
+market_classifier = KeywordClassifier(MARKET_CATEGORY_KEYWORDS, default="miscellaneous")
+# Breaking-news content differs on every event, so caching would only hold memory.
+breaking_news_classifier = KeywordClassifier(BREAKING_NEWS_CATEGORY_KEYWORDS, default=None, cache_size=0)
@@ -0,0 +1,205 @@
+"""
+Local stand-in for the CLOB market websocket: replays recorded messages (JSON lines, as written by
+ClobStreamCollector --record) to every client that subscribes, so the stream collector can be run,
+tested and benchmarked offline.
+
+Usage: python collectors/clob_replay_server.py [--file collectors/recordings/clob_market_sample.jsonl]
+                                               [--port 8765] [--speed 1.0] [--loop]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import random
+
+import websockets
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RECORDING = "collectors/recordings/clob_market_sample.jsonl"
+
+
+def load_recording(path: str) -> list[str]:
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def _message_assets(message: dict) -> set[str]:
+    if "price_changes" in message:
+        return {change.get("asset_id") for change in message["price_changes"]}
+    return {message.get("asset_id")}
+
+
+def _message_timestamp(raw: str) -> float | None:
+    try:
+        payload = json.loads(raw)
+        first = payload[0] if isinstance(payload, list) and payload else payload
+        return float(first["timestamp"]) / 1000.0
+    except (ValueError, KeyError, TypeError, IndexError):
+        return None
+
+
+def synthetic_messages(asset_ids: list[str], count: int, seed: int = 11, start_ms: int = 1_700_000_000_000,
+                       step_ms: int = 50) -> list[str]:
+    """
+    A book snapshot per asset followed by random level changes and trades around a drifting mid.
+    A new level clears the opposite side's levels it would cross, so the replayed books never cross.
+    """
+    rng = random.Random(seed)
+    mids = {asset_id: rng.uniform(0.2, 0.8) for asset_id in asset_ids}
+    messages, timestamp = [], start_ms
+
+    def level(price: float) -> str:
+        return f"{min(max(price, 0.01), 0.99):.2f}"
+
+    books = []
+    for asset_id in asset_ids:
+        mid = mids[asset_id]
+        books.append({
+            "event_type": "book", "asset_id": asset_id,
+            "market": "0x" + hashlib.sha1(asset_id.encode()).hexdigest(),
+            "bids": [{"price": level(mid - 0.01 * (i + 1)), "size": str(rng.randint(10, 500))}
+                     for i in range(5)],
+            "asks": [{"price": level(mid + 0.01 * (i + 1)), "size": str(rng.randint(10, 500))}
+                     for i in range(5)],
+            "timestamp": str(timestamp), "hash": f"{rng.getrandbits(64):016x}",
+        })
+    messages.append(json.dumps(books))
+    resting = {book["asset_id"]: {"BUY": {level["price"] for level in book["bids"]},
+                                  "SELL": {level["price"] for level in book["asks"]}} for book in books}
+    while len(messages) < count:
+        timestamp += step_ms
+        asset_id = rng.choice(asset_ids)
+        mids[asset_id] = min(max(mids[asset_id] + rng.gauss(0, 0.004), 0.03), 0.97)
+        mid = mids[asset_id]
+        if rng.random() < 0.15:
+            messages.append(json.dumps({
+                "event_type": "last_trade_price", "asset_id": asset_id,
+                "market": books[asset_ids.index(asset_id)]["market"],
+                "price": level(mid), "side": rng.choice(("BUY", "SELL")), "size": str(rng.randint(1, 200)),
+                "timestamp": str(timestamp),
+            }))
+            continue
+        side = rng.choice(("BUY", "SELL"))
+        offset = rng.randint(1, 3) * 0.01
+        price = level(mid - offset if side == "BUY" else mid + offset)
+        size = "0" if rng.random() < 0.3 else str(rng.randint(1, 500))
+        changes = [{"asset_id": asset_id, "price": price, "size": size, "side": side}]
+        if size == "0":
+            resting[asset_id][side].discard(price)
+        else:
+            resting[asset_id][side].add(price)
+            other = "SELL" if side == "BUY" else "BUY"
+            crossed = {p for p in resting[asset_id][other]
+                       if (float(p) <= float(price) if side == "BUY" else float(p) >= float(price))}
+            resting[asset_id][other] -= crossed
+            changes.extend({"asset_id": asset_id, "price": p, "size": "0", "side": other}
+                           for p in sorted(crossed))
+        for change in changes:
+            change["hash"] = f"{rng.getrandbits(64):016x}"
+        messages.append(json.dumps({
+            "event_type": "price_change", "market": books[asset_ids.index(asset_id)]["market"],
+            "price_changes": changes, "timestamp": str(timestamp),
+        }))
+    return messages
+
+
+class ClobReplayServer:
+    """
+    Serves the market channel protocol: waits for a client's subscribe message, then sends it the
+    recorded messages that touch its subscribed assets (all of them if it subscribed to none).
+    speed=0 sends as fast as possible; otherwise gaps between recorded timestamps are divided by speed.
+    Answers "PING" with "PONG" like the real server.
+    """
+
+    def __init__(self, messages: list[str], host: str = "127.0.0.1", port: int = 0, speed: float = 0.0,
+                 loop: bool = False):
+        self.messages = messages
+        self.host = host
+        self.port = port
+        self.speed = speed
+        self.loop = loop
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def _answer_pings(self, websocket):
+        async for message in websocket:
+            if message == "PING":
+                await websocket.send("PONG")
+
+    async def _replay(self, websocket, assets: set[str]):
+        while True:
+            previous_ts = None
+            for raw in self.messages:
+                if assets:
+                    payload = json.loads(raw)
+                    events = payload if isinstance(payload, list) else [payload]
+                    events = [event for event in events if _message_assets(event) & assets]
+                    if not events:
+                        continue
+                    raw = json.dumps(events if isinstance(payload, list) else events[0])
+                if self.speed > 0:
+                    timestamp = _message_timestamp(raw)
+                    if previous_ts is not None and timestamp is not None and timestamp > previous_ts:
+                        await asyncio.sleep((timestamp - previous_ts) / self.speed)
+                    previous_ts = timestamp if timestamp is not None else previous_ts
+                await websocket.send(raw)
+            if not self.loop:
+                return
+
+    async def _handle(self, websocket):
+        try:
+            subscription = json.loads(await websocket.recv())
+            assets = set(subscription.get("assets_ids") or [])
+            pings = asyncio.create_task(self._answer_pings(websocket))
+            try:
+                await self._replay(websocket, assets)
+                await pings  # keep the connection open until the client leaves
+            finally:
+                pings.cancel()
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def start(self):
+        self._server = await websockets.serve(self._handle, self.host, self.port, max_size=None)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Replaying {len(self.messages)} CLOB messages on {self.url}")
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+
+async def _serve_forever(server: ClobReplayServer):
+    async with server:
+        await asyncio.Future()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", default=DEFAULT_RECORDING)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--speed", type=float, default=1.0, help="0 replays as fast as possible")
+    parser.add_argument("--loop", action="store_true", help="start over at the end of the recording")
+    args = parser.parse_args()
+    try:
+        server = ClobReplayServer(load_recording(args.file), args.host, args.port, args.speed, args.loop)
+        asyncio.run(_serve_forever(server))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,268 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from collections.abc import Callable
+
+import websockets
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from app.core.config import settings
+from app.core.db import execute_query
+from collectors.order_book import BookTop, OrderBook
+from workers.data_validator_worker import get_raw_event_buffer
+
+logger = logging.getLogger(__name__)
+
+TopCallback = Callable[[BookTop], None]
+TradeCallback = Callable[[dict], None]
+
+
+def _seconds(timestamp) -> float:
+    """CLOB timestamps are epoch milliseconds, usually sent as strings."""
+    try:
+        return float(timestamp) / 1000.0
+    except (TypeError, ValueError):
+        return time.time()
+
+
+class ClobStreamCollector:
+    """
+    Keeps a websocket subscription to the CLOB market channel for a set of outcome tokens (asset ids),
+    maintains a local L2 OrderBook per asset from `book` snapshots and `price_change` updates, and
+    publishes a BookTop to the on_top callbacks whenever an asset's best bid or ask moves.
+    `last_trade_price` messages go to the on_trade callbacks and, with persist_trades, to raw_data_events
+    through the write-behind buffer. The buffer is never waited on: when it is full, the trade is dropped
+    and counted in stats["trades_dropped"], so the event loop keeps reading (and answering pings).
+
+    Reconnects with exponential backoff; the server re-sends book snapshots on subscribe, so books are
+    rebuilt from scratch after every reconnect. With record_path, every raw message received is appended
+    there as JSON lines, which collectors/clob_replay_server.py can play back.
+    """
+
+    def __init__(self, assets: dict[str, str] | list[str], url: str | None = None,
+                 on_top: list[TopCallback] | None = None, on_trade: list[TradeCallback] | None = None,
+                 persist_trades: bool = False, record_path: str | None = None,
+                 source_name: str = "polymarket_clob"):
+        # asset id -> category of its market (used for persisted trades)
+        self.assets = (dict(assets) if isinstance(assets, dict)
+                       else {asset_id: "miscellaneous" for asset_id in assets})
+        self.url = url or settings.CLOB_WS_URL
+        self.on_top = list(on_top or [])
+        self.on_trade = list(on_trade or [])
+        self.persist_trades = persist_trades
+        self.record_path = record_path
+        self.source_name = source_name
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.books: dict[str, OrderBook] = {}
+        self.tops: dict[str, BookTop] = {}
+        self.stats = {"messages": 0, "book_snapshots": 0, "level_changes": 0, "trades": 0,
+                      "trades_dropped": 0, "top_changes": 0, "reconnects": 0, "errors": 0}
+
+    def _book(self, asset_id: str) -> OrderBook:
+        book = self.books.get(asset_id)
+        if book is None:
+            book = self.books[asset_id] = OrderBook(asset_id)
+        return book
+
+    def _publish_if_moved(self, asset_id: str):
+        top = self.books[asset_id].top()
+        previous = self.tops.get(asset_id)
+        if previous is not None and previous.best_bid == top.best_bid and previous.best_ask == top.best_ask:
+            return
+        self.tops[asset_id] = top
+        self.stats["top_changes"] += 1
+        for callback in self.on_top:
+            try:
+                callback(top)
+            except Exception as e:
+                self.logger.error(f"on_top callback failed for asset {asset_id}: {e}", exc_info=True)
+
+    def _handle_event(self, event: dict):
+        event_type = event.get("event_type")
+        timestamp = _seconds(event.get("timestamp"))
+        if event_type == "book":
+            asset_id = event["asset_id"]
+            self._book(asset_id).apply_snapshot(
+                event.get("bids", event.get("buys", [])), event.get("asks", event.get("sells", [])),
+                timestamp, event.get("hash")
+            )
+            self.stats["book_snapshots"] += 1
+            self._publish_if_moved(asset_id)
+        elif event_type == "price_change":
+            moved = set()
+            if "price_changes" in event:
+                # One message per market: each change names its own asset.
+                for change in event["price_changes"]:
+                    self._book(change["asset_id"]).apply_change(
+                        change["side"], float(change["price"]), float(change["size"]), timestamp,
+                        change.get("hash"))
+                    moved.add(change["asset_id"])
+            else:
+                asset_id = event["asset_id"]
+                book = self._book(asset_id)
+                for change in event.get("changes", []):
+                    book.apply_change(change["side"], float(change["price"]), float(change["size"]),
+                                      timestamp)
+                if event.get("hash"):
+                    book.hash = event["hash"]
+                moved.add(asset_id)
+            self.stats["level_changes"] += 1
+            for asset_id in moved:
+                self._publish_if_moved(asset_id)
+        elif event_type == "last_trade_price":
+            self.stats["trades"] += 1
+            trade = {
+                "asset_id": event.get("asset_id"), "market": event.get("market"),
+                "price": float(event["price"]), "size": float(event.get("size") or 0),
+                "side": event.get("side"), "timestamp": timestamp,
+            }
+            for callback in self.on_trade:
+                try:
+                    callback(trade)
+                except Exception as e:
+                    self.logger.error(f"on_trade callback failed for asset {trade['asset_id']}: {e}",
+                                      exc_info=True)
+            if self.persist_trades:
+                self._persist_trade(trade)
+        # tick_size_change and unknown event types carry nothing the books need.
+
+    def _persist_trade(self, trade: dict):
+        accepted = get_raw_event_buffer().enqueue({
+            "source": self.source_name, "event_type": "market_trade_polymarket",
+            "category": self.assets.get(trade["asset_id"], "miscellaneous"), "content": trade,
+            "metadata": {"fetch_timestamp": time.time(), "asset_id": trade["asset_id"],
+                         "market": trade["market"]},
+            "relevance_score": None,
+        }, block=False)
+        if not accepted:
+            self.stats["trades_dropped"] += 1
+            dropped = self.stats["trades_dropped"]
+            if dropped & (dropped - 1) == 0:  # 1, 2, 4, 8, ...: visible without flooding the log
+                self.logger.warning(f"Write-behind buffer full; {dropped} trades dropped so far.")
+
+    def handle_message(self, raw: str | bytes) -> int:
+        """
+        Applies one websocket message (a single event or a JSON array of events).
+        Returns the number of events applied.
+        """
+        if raw in ("PONG", b"PONG"):
+            return 0
+        self.stats["messages"] += 1
+        try:
+            payload = json.loads(raw)
+        except ValueError:
+            self.logger.warning(f"Ignoring non-JSON CLOB message: {str(raw)[:200]}")
+            return 0
+        events = payload if isinstance(payload, list) else [payload]
+        for event in events:
+            try:
+                self._handle_event(event)
+            except (KeyError, TypeError, ValueError) as e:
+                self.stats["errors"] += 1
+                self.logger.warning(f"Malformed CLOB event skipped ({e}): {str(event)[:200]}")
+        return len(events)
+
+    async def _keepalive(self, websocket):
+        while True:
+            await asyncio.sleep(settings.CLOB_WS_PING_INTERVAL)
+            await websocket.send("PING")
+
+    async def _consume(self, stop_event: asyncio.Event, max_messages: int | None):
+        record = open(self.record_path, "a") if self.record_path else None
+        try:
+            # Unread messages pause reading, so on shutdown the server's close frame may never be seen:
+            # keep the closing handshake short.
+            async with websockets.connect(self.url, ping_interval=None, max_size=None,
+                                          close_timeout=2) as websocket:
+                await websocket.send(json.dumps({"type": "market", "assets_ids": list(self.assets)}))
+                self.logger.info(f"Subscribed to {len(self.assets)} CLOB assets at {self.url}")
+                keepalive = asyncio.create_task(self._keepalive(websocket))
+                try:
+                    while not stop_event.is_set():
+                        try:
+                            raw = await asyncio.wait_for(websocket.recv(), timeout=1.0)
+                        except asyncio.TimeoutError:
+                            continue
+                        if record is not None and raw != "PONG":
+                            record.write((raw if isinstance(raw, str) else raw.decode()) + "\n")
+                        self.handle_message(raw)
+                        if max_messages is not None and self.stats["messages"] >= max_messages:
+                            stop_event.set()
+                finally:
+                    keepalive.cancel()
+        finally:
+            if record is not None:
+                record.close()
+
+    async def run(self, stop_event: asyncio.Event | None = None, max_messages: int | None = None):
+        """Streams until stop_event is set (or max_messages were received), reconnecting on errors."""
+        stop_event = stop_event or asyncio.Event()
+        backoff = 1.0
+        while not stop_event.is_set():
+            try:
+                await self._consume(stop_event, max_messages)
+                backoff = 1.0
+            except (OSError, websockets.exceptions.WebSocketException) as e:
+                if stop_event.is_set():
+                    break
+                self.stats["reconnects"] += 1
+                self.logger.warning(f"CLOB websocket dropped ({e}); reconnecting in {backoff:.0f}s")
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=backoff)
+                except asyncio.TimeoutError:
+                    pass
+                backoff = min(backoff * 2, 30.0)
+
+
+def tracked_assets(limit: int | None = None) -> dict[str, str]:
+    """Outcome token ids of the live markets in market_metadata, highest volume first, with their category."""
+    rows = execute_query(
+        """
+        SELECT m.metadata->>'clobTokenIds', m.category FROM market_metadata m
+        LEFT JOIN market_snapshots s ON s.market_id = m.market_id
+        WHERE m.metadata ? 'clobTokenIds' AND (m.end_date IS NULL OR m.end_date > NOW())
+        ORDER BY s.volume DESC NULLS LAST
+        LIMIT %s;
+        """,
+        (limit or settings.CLOB_WS_MAX_MARKETS,), fetch_all=True
+    ) or []
+    assets = {}
+    for token_ids, category in rows:
+        try:
+            # Gamma sends clobTokenIds as a JSON-encoded list inside the market object.
+            for asset_id in json.loads(token_ids) if isinstance(token_ids, str) else token_ids or []:
+                assets[str(asset_id)] = category or "miscellaneous"
+        except ValueError:
+            logger.debug(f"Unparseable clobTokenIds skipped: {token_ids}")
+    return assets
+
+
+def log_top(top: BookTop):
+    logger.info(f"{top.asset_id[:12]}… bid={top.best_bid} ask={top.best_ask} mid={top.mid}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Stream CLOB order books for the tracked markets.")
+    parser.add_argument("--url", default=None,
+                        help="websocket URL (e.g. ws://localhost:8765 for the replay server)")
+    parser.add_argument("--asset", action="append",
+                        help="asset id to subscribe to (default: tracked markets from the DB)")
+    parser.add_argument("--record", default=None, help="append every received message to this JSONL file")
+    parser.add_argument("--persist-trades", action="store_true")
+    args = parser.parse_args()
+
+    collector = ClobStreamCollector(args.asset or tracked_assets(), url=args.url, on_top=[log_top],
+                                    persist_trades=args.persist_trades, record_path=args.record)
+    try:
+        asyncio.run(collector.run())
+    except KeyboardInterrupt:
+        pass
+    logger.info(f"CLOB stream stats: {collector.stats}")
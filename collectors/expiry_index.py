@@ -0,0 +1,88 @@
+import heapq
+import threading
+import time
+from datetime import datetime, timezone
+
+
+def parse_end_date(value: str) -> datetime:
+    """Parses a Gamma ISO 8601 timestamp ('Z' or offset suffix) into an aware datetime; naive means UTC."""
+    if not isinstance(value, str):
+        raise ValueError(f"'endDate' not a string: {value}")
+    parsed = datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+    if parsed.tzinfo is None or parsed.tzinfo.utcoffset(parsed) is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+class ExpiryIndex:
+    """
+    Known markets ordered by end time.
+    Each market's endDate string is parsed once and cached; it is re-parsed only if the string changes.
+    End times sit in a heap of (end_ts, market_id) with lazy deletion: a changed or discarded market
+    leaves its old entry behind, to be skipped when popped, so observe() and discard() are O(log n) and
+    O(1) and expired markets are popped from the top. The heap is rebuilt once stale entries outnumber
+    live ones. expiring_within() has to look at every market (O(n log k)), which is fine for its
+    occasional callers.
+    """
+
+    def __init__(self):
+        self._ends: dict[str, tuple[str, datetime, float]] = {}
+        self._heap: list[tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ends)
+
+    def __contains__(self, market_id: str):
+        return market_id in self._ends
+
+    def observe(self, market_id: str, end_date: str, ended_before: float | None = None) -> datetime:
+        """
+        Returns the parsed end time of a market, parsing end_date only if it differs from the cached string.
+        A market ending before ended_before (e.g. the start of the cycle) is returned but not indexed, so
+        ended markets still listed by the API are not popped as expired again every cycle.
+        Raises ValueError if it cannot be parsed.
+        """
+        cached = self._ends.get(market_id)
+        if cached is not None and cached[0] == end_date:
+            return cached[1]
+        ends_at = parse_end_date(end_date)
+        end_ts = ends_at.timestamp()
+        with self._lock:
+            if ended_before is not None and end_ts < ended_before:
+                self._ends.pop(market_id, None)
+                return ends_at
+            self._ends[market_id] = (end_date, ends_at, end_ts)
+            heapq.heappush(self._heap, (end_ts, market_id))
+            if len(self._heap) > 2 * len(self._ends) + 64:
+                self._heap = [(end_ts, market_id) for market_id, (_, _, end_ts) in self._ends.items()]
+                heapq.heapify(self._heap)
+        return ends_at
+
+    def _is_current(self, end_ts: float, market_id: str) -> bool:
+        cached = self._ends.get(market_id)
+        return cached is not None and cached[2] == end_ts
+
+    def discard(self, market_id: str):
+        with self._lock:
+            self._ends.pop(market_id, None)
+
+    def pop_expired(self, now: float | None = None) -> list[str]:
+        """Removes and returns the markets whose end time is before now, oldest first."""
+        now = time.time() if now is None else now
+        expired = []
+        with self._lock:
+            while self._heap and self._heap[0][0] < now:
+                end_ts, market_id = heapq.heappop(self._heap)
+                if self._is_current(end_ts, market_id):
+                    del self._ends[market_id]
+                    expired.append(market_id)
+        return expired
+
+    def expiring_within(self, hours: float, now: float | None = None) -> list[tuple[str, datetime]]:
+        """Markets ending between now and now + hours, soonest first, as (market_id, ends_at)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            window = [(end_ts, market_id, ends_at) for market_id, (_, ends_at, end_ts) in self._ends.items()
+                      if now <= end_ts <= now + hours * 3600]
+        return [(market_id, ends_at) for _, market_id, ends_at in sorted(window)]
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+from urllib.parse import urlencode
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that must never end up in cache keys or on disk.
+SECRET_PARAMS = {"apiKey", "api_key", "apikey", "token"}
+
+
+class CacheEntry(NamedTuple):
+    etag: str | None
+    last_modified: str | None
+    body_hash: str
+    body: bytes | None
+    stored_at: float
+
+
+def cache_key(url: str, params: dict | None = None, namespace: str | None = None) -> str:
+    """namespace separates consumers of the same URL, whose changed flags must not affect each other."""
+    public_params = sorted((k, str(v)) for k, v in (params or {}).items() if k not in SECRET_PARAMS)
+    key = f"{url}?{urlencode(public_params)}" if public_params else url
+    return f"{namespace}|{key}" if namespace else key
+
+
+class ResponseCache:
+    """
+    Validators (ETag / Last-Modified), body hash and optionally the body of recent GET responses.
+    The in-memory store is an LRU bounded by entry count and total body bytes; with disk_dir set,
+    entries are also written through to disk so they survive restarts.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024,
+                 disk_dir: str | None = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key: str) -> CacheEntry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key: str, entry: CacheEntry):
+        self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def _remember(self, key: str, entry: CacheEntry):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.body or b"")
+            self._entries[key] = entry
+            self._bytes += len(entry.body or b"")
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body or b"")
+
+    def _disk_paths(self, key: str) -> tuple[str, str]:
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.json"), os.path.join(self.disk_dir, f"{digest}.body")
+
+    def _read_disk(self, key: str) -> CacheEntry | None:
+        if not self.disk_dir:
+            return None
+        meta_path, body_path = self._disk_paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            body = None
+            if meta.get("has_body"):
+                with open(body_path, "rb") as f:
+                    body = f.read()
+            return CacheEntry(meta["etag"], meta["last_modified"], meta["body_hash"], body, meta["stored_at"])
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable HTTP cache entry {meta_path}: {e}")
+            return None
+
+    def _write_disk(self, key: str, entry: CacheEntry):
+        if not self.disk_dir:
+            return
+        meta_path, body_path = self._disk_paths(key)
+        try:
+            if entry.body is not None:
+                with open(body_path + ".tmp", "wb") as f:
+                    f.write(entry.body)
+                os.replace(body_path + ".tmp", body_path)
+            meta = {"key": key, "etag": entry.etag, "last_modified": entry.last_modified,
+                    "body_hash": entry.body_hash, "stored_at": entry.stored_at,
+                    "has_body": entry.body is not None}
+            with open(meta_path + ".tmp", "w") as f:
+                json.dump(meta, f)
+            os.replace(meta_path + ".tmp", meta_path)
+        except OSError as e:
+            logger.warning(f"Could not write HTTP cache entry to {self.disk_dir}: {e}")
+
+
+class CachedFetch(NamedTuple):
+    body: bytes | None  # None only on a 304 for which no body was cached
+    changed: bool  # False on 304 Not Modified or when the body hash matches the cached one
+    status_code: int
+    data: object = None  # parse_stream's result on a 200 fetched with parse_stream
+    key: str | None = None
+    entry: CacheEntry | None = None  # with defer_store, the entry to put once the response is persisted
+
+
+class HashingReader:
+    """File-like view of a streamed response body that hashes the (decoded) bytes as they are read."""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._digest = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        if size == 0:  # ijson probes the stream type with read(0)
+            return b""
+        chunk = self._raw.read(size if size > 0 else None, decode_content=True)
+        self._digest.update(chunk)
+        return chunk
+
+    def drain(self, chunk_size: int = 65536):
+        while self.read(chunk_size):
+            pass
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+def conditional_get(session_get, cache: ResponseCache | None, url: str, params: dict | None = None,
+                    store_body: bool = True, parse_stream=None, namespace: str | None = None,
+                    defer_store: bool = False, **kwargs) -> CachedFetch:
+    """
+    GET with If-None-Match / If-Modified-Since from the cached validators.
+    session_get is the callable doing the request (e.g. BaseCollector._http_get); with cache=None every
+    fetch counts as changed.
+    With defer_store, a new response is not put in the cache but returned as entry, for the caller to
+    put once it has persisted what it derived from it; until then the same response keeps counting as
+    changed, so a failed store is retried.
+    With parse_stream, the body is never held whole: parse_stream(reader) consumes the streamed response
+    incrementally, the body hash is computed as it is read, and the parsed result (as JSON) is what gets
+    cached and returned as body.
+    """
+    key = cache_key(url, params, namespace)
+    cached = cache.get(key) if cache is not None else None
+    headers = dict(kwargs.pop("headers", None) or {})
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+    if parse_stream is not None:
+        kwargs["stream"] = True
+
+    response = session_get(url, params=params, headers=headers, **kwargs)
+    if response.status_code == 304 and cached is not None:
+        response.close()
+        return CachedFetch(cached.body, False, 304, key=key)
+    try:
+        response.raise_for_status()
+        if parse_stream is None:
+            data, body = None, response.content
+            body_hash = hashlib.sha256(body).hexdigest()
+        else:
+            reader = HashingReader(response.raw)
+            data = parse_stream(reader)
+            reader.drain()
+            body_hash = reader.hexdigest()
+            body = json.dumps(data).encode()
+    finally:
+        response.close()
+
+    changed = cached is None or cached.body_hash != body_hash
+    if cache is None:
+        return CachedFetch(body, changed, response.status_code, data)
+    entry = CacheEntry(
+        etag=response.headers.get("ETag"), last_modified=response.headers.get("Last-Modified"),
+        body_hash=body_hash, body=body if store_body else None, stored_at=time.time(),
+    )
+    if defer_store:
+        return CachedFetch(body, changed, response.status_code, data, key, entry)
+    cache.put(key, entry)
+    return CachedFetch(body, changed, response.status_code, data, key)
+
+
+_response_cache: ResponseCache | None = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(
+                max_entries=settings.HTTP_CACHE_MAX_ENTRIES,
+                max_bytes=settings.HTTP_CACHE_MAX_BYTES,
+                disk_dir=settings.HTTP_CACHE_DIR,
+            )
+        return _response_cache
@@ -0,0 +1,98 @@
+import atexit
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_HEADERS = {
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+    "User-Agent": "polymarket-ai-trader/0.1",
+}
+
+_sessions: dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+_budgets: dict[str, "CallBudget"] = {}
+
+
+def get_session(source_name: str, pool_maxsize: int = 10) -> requests.Session:
+    """
+    Returns the shared keep-alive session for a source, creating it on first use.
+    Every collector instance for the same source (e.g. one NewsCollector per category) reuses its
+    pooled connections and TLS sessions instead of opening a new pool on each requests.get.
+    """
+    with _sessions_lock:
+        session = _sessions.get(source_name)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(DEFAULT_HEADERS)
+            # Retries are handled by the collectors (tenacity), not by urllib3.
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[source_name] = session
+        return session
+
+
+class CallBudget:
+    """
+    Sliding-window request budget: at most `calls` requests in any `period` seconds. acquire() blocks
+    until a request is allowed and counts it; available() tells a planner how many are left right now.
+    """
+
+    def __init__(self, calls: int, period: float):
+        self.calls = calls
+        self.period = period
+        self._made: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        while self._made and self._made[0] <= now - self.period:
+            self._made.popleft()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.time()
+                self._prune(now)
+                if len(self._made) < self.calls:
+                    self._made.append(now)
+                    return
+                wait = self._made[0] + self.period - now
+            time.sleep(max(wait, 0.01))
+
+    def record(self, calls: int = 1, now: float | None = None):
+        """Counts requests made without acquire() (e.g. in a simulation with its own clock)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._made.extend([now] * calls)
+
+    def available(self, now: float | None = None) -> int:
+        now = time.time() if now is None else now
+        with self._lock:
+            self._prune(now)
+            return max(0, self.calls - len(self._made))
+
+
+def get_call_budget(source_name: str, calls: int, period: float) -> CallBudget:
+    """
+    Returns the request budget shared by every collector instance of a source, like get_session:
+    five NewsCollectors, one per category, share NewsCollector.CALLS per PERIOD instead of each
+    getting the whole quota. The first caller's calls/period define it.
+    """
+    with _sessions_lock:
+        budget = _budgets.get(source_name)
+        if budget is None:
+            budget = _budgets[source_name] = CallBudget(calls, period)
+        return budget
+
+
+@atexit.register
+def close_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,282 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+
+import requests
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from app.core.config import settings
+from app.core.db import execute_query, execute_values, stream_query, transaction
+from app.core.partitions import ensure_partitions
+from collectors.http_client import get_call_budget, get_session
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TABLE = "market_snapshot_history"
+
+
+class BackfillChunk(NamedTuple):
+    market_id: str
+    token_id: str  # CLOB outcome token whose price is the market's price (the first outcome)
+    category: str | None
+    start: datetime
+    end: datetime
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _uncovered(lower: datetime, upper: datetime,
+               covered: list[tuple[datetime, datetime]]) -> list[tuple[datetime, datetime]]:
+    """The parts of [lower, upper) outside the covered ranges, which are sorted by start."""
+    gaps, cursor = [], lower
+    for covered_start, covered_end in covered:
+        if covered_start >= upper:
+            break
+        if covered_end <= cursor:
+            continue
+        if covered_start > cursor:
+            gaps.append((cursor, covered_start))
+        cursor = covered_end
+    if cursor < upper:
+        gaps.append((cursor, upper))
+    return gaps
+
+
+def plan_chunks(markets: dict[str, tuple[str, str | None]], start: datetime, end: datetime, chunk_days: int,
+                completed: dict[str, list[tuple[datetime, datetime]]] | None = None) -> list[BackfillChunk]:
+    """
+    Splits [start, end) per market into windows of a chunk_days grid aligned to the epoch, so chunks keep
+    the same boundaries whatever range a run asks for. completed maps market_id -> checkpointed
+    [start, end) ranges: only the parts of each window they do not cover are planned, so a rerun reaching
+    further back or further ahead loads the head or tail of a window an earlier run only partly covered.
+    markets maps market_id -> (token_id, category).
+    """
+    step = timedelta(days=chunk_days)
+    first_slot = EPOCH + step * ((start - EPOCH) // step)
+    completed = completed or {}
+    chunks = []
+    for market_id, (token_id, category) in markets.items():
+        covered = sorted(completed.get(market_id, ()))
+        slot = first_slot
+        while slot < end:
+            for chunk_start, chunk_end in _uncovered(max(slot, start), min(slot + step, end), covered):
+                chunks.append(BackfillChunk(market_id, token_id, category, chunk_start, chunk_end))
+            slot += step
+    return chunks
+
+
+class MarketBackfill:
+    """
+    Backfills market_snapshot_history from the CLOB /prices-history endpoint.
+
+    The requested range is split into chunks per market, which a bounded thread pool downloads through
+    the CLOB source's shared request budget and keep-alive session. Each chunk's points are bulk-inserted
+    together with its [start, end) row in market_backfill_checkpoints in one transaction, so a killed run
+    resumes by skipping the checkpointed ranges, and no range is ever loaded twice.
+    """
+
+    CHECKPOINT_QUERY = """
+    SELECT market_id, chunk_start, chunk_end FROM market_backfill_checkpoints
+    WHERE market_id = ANY(%s) AND fidelity_minutes = %s AND chunk_end > %s AND chunk_start < %s;
+    """
+    # Only a run with resume off plans a range starting where a checkpointed one does.
+    CHECKPOINT_UPSERT = """
+    INSERT INTO market_backfill_checkpoints (market_id, chunk_start, chunk_end, fidelity_minutes, points)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (market_id, chunk_start, fidelity_minutes) DO UPDATE SET
+        chunk_end = GREATEST(market_backfill_checkpoints.chunk_end, EXCLUDED.chunk_end),
+        points = market_backfill_checkpoints.points + EXCLUDED.points, completed_at = NOW();
+    """
+
+    def __init__(self, base_url: str | None = None, fidelity_minutes: int | None = None,
+                 chunk_days: int | None = None, concurrency: int | None = None,
+                 source_name: str = "polymarket_clob_backfill"):
+        self.base_url = (base_url or settings.CLOB_API_URL).rstrip("/")
+        self.fidelity_minutes = fidelity_minutes or settings.BACKFILL_FIDELITY_MINUTES
+        self.chunk_days = chunk_days or settings.BACKFILL_CHUNK_DAYS
+        self.concurrency = max(1, concurrency or settings.BACKFILL_CONCURRENCY)
+        self.source_name = source_name
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.http = get_session("polymarket_clob", pool_maxsize=self.concurrency)
+        # Shared by all workers, and by anything else calling the CLOB API in this process.
+        self.call_budget = get_call_budget("polymarket_clob", settings.BACKFILL_CALLS,
+                                           settings.BACKFILL_PERIOD)
+
+    def resolve_markets(self, market_ids: list[str] | None = None,
+                        limit: int | None = None) -> dict[str, tuple[str, str | None]]:
+        """
+        market_id -> (token_id, category) from market_metadata; all live markets by volume when market_ids
+        is None.
+        """
+        if market_ids:
+            query = """
+            SELECT market_id, metadata->>'clobTokenIds', category FROM market_metadata
+            WHERE market_id = ANY(%s);
+            """
+            params = (list(market_ids),)
+        else:
+            query = """
+            SELECT m.market_id, m.metadata->>'clobTokenIds', m.category FROM market_metadata m
+            LEFT JOIN market_snapshots s ON s.market_id = m.market_id
+            WHERE m.metadata ? 'clobTokenIds' AND (m.end_date IS NULL OR m.end_date > NOW())
+            ORDER BY s.volume DESC NULLS LAST
+            LIMIT %s;
+            """
+            params = (limit,)
+        markets = {}
+        for market_id, token_ids, category in execute_query(query, params, fetch_all=True) or []:
+            try:
+                tokens = json.loads(token_ids) if isinstance(token_ids, str) else token_ids
+            except ValueError:
+                tokens = None
+            if not tokens:
+                self.logger.warning(f"Market {market_id} has no CLOB token ids; skipping.")
+                continue
+            markets[market_id] = (str(tokens[0]), category)
+        missing = set(market_ids or []) - set(markets)
+        if missing:
+            self.logger.warning(
+                f"{len(missing)} requested markets are not in market_metadata: {sorted(missing)[:20]}")
+        return markets
+
+    def completed_chunks(self, market_ids: list[str], start: datetime,
+                         end: datetime) -> dict[str, list[tuple[datetime, datetime]]]:
+        """market_id -> checkpointed [start, end) ranges overlapping [start, end)."""
+        completed: dict[str, list[tuple[datetime, datetime]]] = {}
+        params = (market_ids, self.fidelity_minutes, start, end)
+        for rows in stream_query(self.CHECKPOINT_QUERY, params, chunk_size=10000):
+            for market_id, chunk_start, chunk_end in rows:
+                completed.setdefault(market_id, []).append((chunk_start, chunk_end))
+        return completed
+
+    @retry(stop=stop_after_attempt(4), wait=wait_exponential(multiplier=1, min=1, max=30),
+           retry=retry_if_exception_type(requests.exceptions.RequestException), reraise=True)
+    def fetch_history(self, chunk: BackfillChunk) -> list[tuple[datetime, float]]:
+        self.call_budget.acquire()
+        response = self.http.get(f"{self.base_url}/prices-history", timeout=30, params={
+            "market": chunk.token_id, "startTs": int(chunk.start.timestamp()),
+            "endTs": int(chunk.end.timestamp()), "fidelity": self.fidelity_minutes,
+        })
+        response.raise_for_status()
+        points = []
+        for point in response.json().get("history") or []:
+            ts = datetime.fromtimestamp(int(point["t"]), tz=timezone.utc)
+            if chunk.start <= ts < chunk.end:  # the API's range is inclusive at both ends
+                points.append((ts, float(point["p"])))
+        return points
+
+    def write_chunk(self, chunk: BackfillChunk, points: list[tuple[datetime, float]]) -> int:
+        history_query = f"INSERT INTO {HISTORY_TABLE} (market_id, ts, source, category, price) VALUES %s;"
+        with transaction(name=history_query) as cur:
+            if points:
+                rows = [(chunk.market_id, ts, self.source_name, chunk.category, price)
+                        for ts, price in points]
+                execute_values(cur, history_query, rows, page_size=1000)
+            cur.execute(self.CHECKPOINT_UPSERT,
+                        (chunk.market_id, chunk.start, chunk.end, self.fidelity_minutes, len(points)))
+        return len(points)
+
+    def prepare_history(self, start: datetime) -> datetime:
+        """
+        Clamps start to the history retention (older partitions would be dropped again) and creates the
+        partitions from start on, since old ticks would otherwise land in the default partition.
+        """
+        retention_days = settings.MARKET_HISTORY_RETENTION_DAYS
+        if retention_days > 0:
+            earliest_kept = datetime.now(timezone.utc) - timedelta(days=retention_days)
+            if start < earliest_kept:
+                self.logger.warning(f"Clamping backfill start {start:%Y-%m-%d} to the {retention_days}-day "
+                                    f"history retention.")
+                start = earliest_kept
+        ensure_partitions(HISTORY_TABLE, settings.MARKET_HISTORY_PARTITION_INTERVAL, start=start.date())
+        return start
+
+    def _run_chunk(self, chunk: BackfillChunk) -> int:
+        return self.write_chunk(chunk, self.fetch_history(chunk))
+
+    def run(self, markets: dict[str, tuple[str, str | None]], start: datetime, end: datetime,
+            resume: bool = True) -> dict:
+        """Backfills [start, end) for markets (see resolve_markets). Returns counts of chunks and points."""
+        start = self.prepare_history(start)
+        completed = self.completed_chunks(list(markets), start, end) if resume and markets else None
+        chunks = plan_chunks(markets, start, end, self.chunk_days, completed)
+        stats = {"markets": len(markets), "chunks": len(chunks), "done": 0, "failed": 0, "points": 0}
+        self.logger.info(f"Backfilling {len(markets)} markets from {start:%Y-%m-%d %H:%M} to "
+                         f"{end:%Y-%m-%d %H:%M}: {len(chunks)} chunks of {self.chunk_days}d to go "
+                         f"at {self.fidelity_minutes}m fidelity.")
+        started = time.monotonic()
+        last_report = started
+        pending = iter(chunks)
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="backfill") as executor:
+            in_flight = {}
+            while True:
+                # Twice the pool size in flight: workers never idle, and memory does not grow with the run.
+                while len(in_flight) < 2 * self.concurrency:
+                    chunk = next(pending, None)
+                    if chunk is None:
+                        break
+                    in_flight[executor.submit(self._run_chunk, chunk)] = chunk
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = in_flight.pop(future)
+                    try:
+                        stats["points"] += future.result()
+                        stats["done"] += 1
+                    except Exception as e:
+                        stats["failed"] += 1
+                        self.logger.error(f"Backfill chunk {chunk.market_id} {chunk.start:%Y-%m-%d} failed; "
+                                          f"it will be retried on the next run. Error: {e}")
+                now = time.monotonic()
+                if now - last_report >= 30:
+                    last_report = now
+                    finished = stats["done"] + stats["failed"]
+                    rate = finished / (now - started)
+                    eta = (stats["chunks"] - finished) / rate if rate else float("inf")
+                    self.logger.info(f"Backfill progress: {finished}/{stats['chunks']} chunks, "
+                                     f"{stats['points']} points, {rate:.1f} chunks/s, ETA {eta / 60:.0f} min")
+        stats["seconds"] = round(time.monotonic() - started, 1)
+        self.logger.info(f"Backfill finished: {stats}")
+        return stats
+
+
+def _parse_time(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Backfill market_snapshot_history from CLOB price history.")
+    parser.add_argument("--market-id", action="append",
+                        help="market to backfill (default: live markets by volume)")
+    parser.add_argument("--limit", type=int, default=1000,
+                        help="number of live markets when no --market-id is given")
+    parser.add_argument("--start", type=_parse_time, default=None,
+                        help="ISO date/time (default: 30 days ago)")
+    parser.add_argument("--end", type=_parse_time, default=None, help="ISO date/time (default: now)")
+    parser.add_argument("--fidelity", type=int, default=None, help="minutes between points")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--base-url", default=None,
+                        help="e.g. http://127.0.0.1:8766 for collectors/price_history_server.py")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="ignore checkpoints (points may be loaded twice)")
+    args = parser.parse_args()
+
+    end = args.end or datetime.now(timezone.utc)
+    start = args.start or end - timedelta(days=30)
+    backfill = MarketBackfill(base_url=args.base_url, fidelity_minutes=args.fidelity,
+                              concurrency=args.concurrency)
+    backfill.run(backfill.resolve_markets(args.market_id, args.limit), start, end, resume=not args.no_resume)
@@ -1,48 +1,310 @@
+import json
 import requests
 import logging
 import time
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timezone
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from collectors.base import BaseCollector
+from collectors.http_cache import conditional_get
+from collectors.change_detector import ChangeDetector
+from collectors.expiry_index import ExpiryIndex
+from collectors.classifier import market_classifier
+from collectors.market_fields import parse_market_page, split_market, to_float
+from collectors.market_state_store import get_market_state_store
+from collectors.market_universe import MarketUniverse, change_time
+from collectors.polling_scheduler import AdaptivePollingScheduler
 from app.core.config import settings
-from app.core.db import execute_query, Json
-from workers.data_validator_worker import validate_and_store_raw_event
+from app.core.db import execute_values, stream_query, transaction
+from workers.data_validator_worker import store_raw_events
 
 logger = logging.getLogger(__name__)
 
+MARKET_CATEGORIES = ("political", "sports", "economic", "miscellaneous")
+# Pass as `category` to fetch the universe once and route every market to its own category.
+ALL_CATEGORIES = "all"
+
 class MarketCollector(BaseCollector):
     CALLS = 30
     PERIOD = 60
+    HTTP_TIMEOUT = 15
+    HTTP_POOL_SIZE = settings.MARKET_FETCH_CONCURRENCY
+
+    SNAPSHOT_UPSERT_COLUMNS = (
+        "(market_id, source, category, price, volume, best_bid, best_ask, liquidity, market_data)"
+    )
+    SNAPSHOT_UPSERT_CONFLICT = """
+    ON CONFLICT (market_id) DO UPDATE SET
+        source = EXCLUDED.source, category = EXCLUDED.category, price = EXCLUDED.price,
+        volume = EXCLUDED.volume, best_bid = EXCLUDED.best_bid, best_ask = EXCLUDED.best_ask,
+        liquidity = EXCLUDED.liquidity, market_data = EXCLUDED.market_data, timestamp = NOW()
+    """
+    # The WHERE keeps a re-sent, unchanged metadata record from rewriting the row.
+    METADATA_UPSERT_QUERY = """
+    INSERT INTO market_metadata
+        (market_id, source, category, question, slug, end_date, metadata, metadata_hash)
+    VALUES %s
+    ON CONFLICT (market_id) DO UPDATE SET
+        source = EXCLUDED.source, category = EXCLUDED.category, question = EXCLUDED.question,
+        slug = EXCLUDED.slug, end_date = EXCLUDED.end_date, metadata = EXCLUDED.metadata,
+        metadata_hash = EXCLUDED.metadata_hash, updated_at = NOW()
+    WHERE market_metadata.metadata_hash IS DISTINCT FROM EXCLUDED.metadata_hash;
+    """
 
     def __init__(self, category: str, market_source_name: str = "polymarket_api"):
         super().__init__(source_name=market_source_name, category=category)
         self.polymarket_api_url = "https://gamma-api.polymarket.com/markets"
+        self.page_size = settings.MARKET_PAGE_SIZE
+        self.max_pages = settings.MARKET_MAX_PAGES
+        self.max_parallel_requests = max(1, settings.MARKET_FETCH_CONCURRENCY)
+        self.change_detector = (ChangeDetector(settings.MARKET_HEARTBEAT_SECONDS)
+                                if settings.MARKET_CHANGE_DETECTION else None)
+        self._change_detector_seeded = False
+        # metadata_hash last written to market_metadata per market; seeded with the change detector.
+        self._metadata_hashes: dict[str, str] = {}
+        self.expiry_index = ExpiryIndex()
+        # In-process latest state of every live market, for readers that should not query market_snapshots.
+        self.state_store = get_market_state_store()
+        self._cycle_started_at = time.time()
+        # Between full universe walks, only the markets the scheduler finds due are re-fetched, by id.
+        self.poll_scheduler = AdaptivePollingScheduler(
+            self.CALLS, self.PERIOD, settings.MARKET_POLL_IDS_PER_REQUEST, budget=self.call_budget
+        ) if settings.MARKET_ADAPTIVE_POLLING else None
+        self._universe_fetched_at: float | None = None
+        # Local copy of the live universe; with MARKET_DELTA_SYNC, cycles between full walks only ask
+        # for markets updated since its watermark.
+        self.market_universe = MarketUniverse(settings.MARKET_DELTA_OVERLAP_SECONDS)
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=0.5, min=0.5, max=4),
+           retry=retry_if_exception_type(requests.exceptions.RequestException), reraise=True)
+    def _fetch_market_page(self, params: dict, offset: int,
+                           limit: int | None = None) -> tuple[list[dict], bool]:
+        """
+        Returns the page's markets and whether the page changed since it was last fetched.
+        In streaming mode markets are parsed one at a time off the socket and keep only MARKET_FIELDS,
+        and the cache holds that projection (a 304 replays it), so the raw page is never held in memory.
+        """
+        page_params = {**params, 'limit': limit or self.page_size, 'offset': offset}
+        if settings.MARKET_STREAM_PARSING:
+            fetch = self._http_get_cached(self.polymarket_api_url, params=page_params,
+                                          parse_stream=parse_market_page)
+            markets = fetch.data if fetch.data is not None else json.loads(fetch.body) if fetch.body else []
+            return markets, fetch.changed
+        fetch = self._http_get_cached(self.polymarket_api_url, params=page_params)
+        data = json.loads(fetch.body) if fetch.body else []
+        markets = data if isinstance(data, list) else data.get("data", [])
+        return markets or [], fetch.changed # Ensure it's a list
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=0.5, min=0.5, max=4),
+           retry=retry_if_exception_type(requests.exceptions.RequestException), reraise=True)
+    def _fetch_markets_by_id(self, market_ids: list[str]) -> list[dict]:
+        """
+        One /markets request for a batch of markets; id lists vary per cycle, so it bypasses the
+        response cache.
+        """
+        params = {'id': market_ids, 'limit': len(market_ids)}
+        if settings.MARKET_STREAM_PARSING:
+            fetch = conditional_get(self._http_get, None, self.polymarket_api_url, params=params,
+                                    parse_stream=parse_market_page)
+            return fetch.data or []
+        fetch = conditional_get(self._http_get, None, self.polymarket_api_url, params=params)
+        data = json.loads(fetch.body or b"[]")
+        return (data if isinstance(data, list) else data.get("data", [])) or []
+
+    def _fetch_due_markets(self, exclude: set[str] | None = None) -> list[dict]:
+        """
+        Re-fetches the markets the polling scheduler finds due, within the calls left in the rate budget,
+        except those in exclude. Markets asked for but not returned, or returned closed, are dropped from
+        the schedule.
+        """
+        batches = self.poll_scheduler.plan(exclude=exclude or ())
+        if not batches:
+            return []
+        markets = []
+        with ThreadPoolExecutor(max_workers=self.max_parallel_requests,
+                                thread_name_prefix="gamma-poll") as executor:
+            for market_ids, result in zip(batches, executor.map(self._fetch_markets_by_id, batches)):
+                markets.extend(result)
+                # Closed markets are dropped in _standardize_data and would otherwise stay due forever.
+                returned = {str(market.get("id")) for market in result
+                            if market.get("closed") is not True and market.get("active") is not False}
+                self.poll_scheduler.discard(market_id for market_id in market_ids
+                                            if market_id not in returned)
+        self.logger.info(f"Polled {sum(len(batch) for batch in batches)} due markets in {len(batches)} "
+                         f"requests (buckets: {self.poll_scheduler.bucket_counts()}, "
+                         f"demand {self.poll_scheduler.demand():.1f} of {self.CALLS} calls "
+                         f"per {self.PERIOD}s).")
+        return markets
+
+    def _fetch_market_changes(self) -> list[dict] | None:
+        """
+        Pages through /markets most recently updated first until reaching the universe's watermark, so the
+        requests made and markets parsed follow the churn since the last sync, not the universe size.
+        The first page keeps the same URL between cycles, so with no churn it is a 304 and nothing is parsed;
+        its cache entry, like the watermark, is only saved once the cycle was persisted (_commit_cycle).
+        Returns the markets changed since the watermark (closed ones included), or None when they do not
+        fit in max_pages and a full resync is needed. There is no end_date_gte filter, which would also hide
+        markets closing after their end date; MarketUniverse.merge drops markets past their endDate instead.
+        """
+        since = self.market_universe.since()
+        if since is None:
+            return None
+        params = {'order': 'updatedAt', 'ascending': False}
+        page_size = settings.MARKET_DELTA_PAGE_SIZE
+        max_pages = self.max_pages * self.page_size // page_size
+        changed = []
+        for page_index in range(max_pages):
+            markets, page_changed = self._fetch_market_page(params, page_index * page_size, page_size)
+            if page_index == 0 and not page_changed:
+                return []
+            for market in markets:
+                changed_at = change_time(market)
+                if changed_at is not None and changed_at < since:
+                    return changed
+                changed.append(market)
+            if len(markets) < page_size:
+                return changed
+        self.logger.warning(f"More than {max_pages * page_size} markets changed since {since.isoformat()}; "
+                            f"falling back to a full resync.")
+        return None
+
+    def _fetch_incremental(self) -> list[dict] | None:
+        """
+        A cycle between full walks: the delta since the watermark (with MARKET_DELTA_SYNC) plus the markets
+        the polling scheduler finds due. Returns None when a full resync is needed instead.
+        """
+        markets = []
+        if settings.MARKET_DELTA_SYNC:
+            delta = self._fetch_market_changes()
+            if delta is None:
+                return None
+            sync = self.market_universe.merge(delta)
+            self._forget_markets(sync.removed)
+            markets = sync.changed
+            self.logger.info(f"Delta sync: {len(sync.changed)} new or changed markets, "
+                             f"{len(sync.removed)} closed, {sync.unchanged} already known "
+                             f"(universe {len(self.market_universe)}).")
+        if self.poll_scheduler is not None:
+            polled = self._fetch_due_markets(exclude={str(market.get("id")) for market in markets})
+            self.market_universe.update(polled)
+            markets.extend(polled)
+        return markets
+
+    def _universe_refresh_due(self) -> bool:
+        """Whether this cycle walks the whole universe: every cycle unless delta sync or polling is on."""
+        if self._universe_fetched_at is None:
+            return True
+        if settings.MARKET_DELTA_SYNC:
+            interval = settings.MARKET_FULL_RESYNC_SECONDS
+        elif self.poll_scheduler is not None:
+            interval = settings.MARKET_UNIVERSE_REFRESH_SECONDS
+        else:
+            return True
+        return time.time() - self._universe_fetched_at >= interval
+
+    def _fetch_market_universe(self, params: dict) -> tuple[list[dict], bool]:
+        """
+        Walks the /markets offsets with up to max_parallel_requests pages in flight, all going through
+        the collector's rate limiter. Stops at the first short page (or max_pages) and merges the pages
+        in offset order, dropping markets that shifted onto a later page between requests.
+        Also returns whether any page changed since the previous fetch.
+        """
+        pages: dict[int, list[dict]] = {}
+        changed_pages: set[int] = set()
+        last_page = self.max_pages - 1  # lowered to the first short page once one comes back
+        next_page = 0
+        with ThreadPoolExecutor(max_workers=self.max_parallel_requests,
+                                thread_name_prefix="gamma-page") as executor:
+            in_flight = {}
+            while in_flight or next_page <= last_page:
+                while next_page <= last_page and len(in_flight) < self.max_parallel_requests:
+                    future = executor.submit(self._fetch_market_page, params, next_page * self.page_size)
+                    in_flight[future] = next_page
+                    next_page += 1
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page_index = in_flight.pop(future)
+                    if page_index > last_page:
+                        continue # past the end found by another page
+                    try:
+                        markets, page_changed = future.result()
+                    except Exception:
+                        for pending in in_flight:
+                            pending.cancel()
+                        raise
+                    pages[page_index] = markets
+                    if page_changed:
+                        changed_pages.add(page_index)
+                    if len(markets) < self.page_size:
+                        last_page = min(last_page, page_index)
+
+        merged, seen_ids = [], set()
+        for page_index in sorted(pages):
+            if page_index > last_page:
+                continue
+            for market in pages[page_index]:
+                market_key = market.get("id") or market.get("slug")
+                if market_key is not None:
+                    if market_key in seen_ids:
+                        continue
+                    seen_ids.add(market_key)
+                merged.append(market)
+        page_count = min(len(pages), last_page + 1)
+        changed = any(page_index <= last_page for page_index in changed_pages)
+        self.logger.info(f"Fetched {len(merged)} unique markets over {page_count} pages of up to "
+                         f"{self.page_size} ({'changed' if changed else 'unchanged'}).")
+        return merged, changed
 
     def _fetch_data(self) -> list[dict]:
-        current_iso_time_utc = datetime.now(timezone.utc).isoformat()
+        # Truncated to the hour so the request URL, and with it the response cache entry, stays stable
+        # between polls; markets that ended since are dropped in _standardize_data.
+        current_hour_utc = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        current_iso_time_utc = current_hour_utc.isoformat()
         self.logger.info(f"Fetching market data from {self.polymarket_api_url} for internal category '{self.category}'")
         self.logger.info(f"Using API filters: active=True, closed=False, end_date_gte={current_iso_time_utc}, order=volume")
         params = {
             'active': True, 'closed': False, 'end_date_gte': current_iso_time_utc,
-            'limit': 100, 'order': 'volume', 'ascending': False,
+            'order': 'volume', 'ascending': False,
         }
         markets_from_api = []
         try:
-            response = requests.get(self.polymarket_api_url, params=params, timeout=15)
-            self.logger.debug(f"Requesting URL: {response.url}")
-            response.raise_for_status()
-            data = response.json()
-            markets_from_api = data if isinstance(data, list) else data.get("data", [])
-            markets_from_api = markets_from_api or [] # Ensure it's a list
+            incremental = None if self._universe_refresh_due() else self._fetch_incremental()
+            if incremental is not None:
+                if not incremental:
+                    self.logger.info("No new, changed or due markets this cycle.")
+                    return []
+                markets_from_api = incremental
+            else:
+                markets_from_api, universe_changed = self._fetch_market_universe(params)
+                self._universe_fetched_at = time.time()
+                had_markets = len(self.market_universe) > 0
+                sync = self.market_universe.replace(markets_from_api)
+                self._forget_markets(sync.removed)
+                if had_markets:
+                    self.logger.info(f"Full resync: {len(sync.changed)} new or changed markets, "
+                                     f"{len(sync.removed)} dropped, {sync.unchanged} unchanged "
+                                     f"since the last sync.")
+                fetched_ids = (str(market.get("id") or market.get("slug")) for market in markets_from_api)
+                heartbeat_due = (self.change_detector is not None
+                                 and self.change_detector.heartbeat_due(fetched_ids))
+                if not universe_changed and not heartbeat_due:
+                    if self.poll_scheduler is not None:
+                        self.poll_scheduler.reschedule(str(market.get("id")) for market in markets_from_api)
+                    self.logger.info("Market universe unchanged since the last fetch; "
+                                     "skipping standardization and persistence.")
+                    return []
             self.logger.info(f"Fetched {len(markets_from_api)} markets from API after applying initial API filters.")
             if markets_from_api:
-                self.logger.info(f"Logging the first fetched market object for inspection: {markets_from_api[0]}")
+                first_market = markets_from_api[0]
+                self.logger.debug(f"First fetched market: id={first_market.get('id')}, "
+                                  f"question={str(first_market.get('question'))[:100]!r}")
                 unique_original_categories = set(m.get("category") for m in markets_from_api if m.get("category") and isinstance(m.get("category"), str))
                 if unique_original_categories:
                     self.logger.info(f"Unique values from original 'category' field in API markets: {unique_original_categories}")
@@ -51,11 +313,22 @@ class MarketCollector(BaseCollector):
         except requests.exceptions.RequestException as e:
             self.logger.error(f"API request failed for {self.source_name}, category {self.category}: {e}", exc_info=True)
             if hasattr(e, 'response') and e.response is not None: self.logger.error(f"API Error Response: {e.response.text}")
+            self._discard_cycle()
             return []
         except Exception as e:
             self.logger.error(f"Unexpected error in _fetch_data for {self.source_name}, category {self.category}: {e}", exc_info=True)
+            self._discard_cycle()
             return []
 
+        if self.category == ALL_CATEGORIES:
+            # Every market is kept; _standardize_data assigns its category.
+            filtered_markets = [market for market in markets_from_api
+                                if isinstance(market.get("question"), str) and market.get("question")]
+            skipped = len(markets_from_api) - len(filtered_markets)
+            self.logger.info(f"Returning {len(filtered_markets)} markets for all categories "
+                             f"(skipped {skipped} without a 'question').")
+            return filtered_markets
+
         filtered_markets = []
         for market in markets_from_api:
             text_for_keywords = market.get("question", "")
@@ -63,12 +336,9 @@ class MarketCollector(BaseCollector):
             if not text_for_keywords:
                 self.logger.debug(f"Market {market.get('id', 'N/A')} has no 'question' for keyword analysis. Skipping.")
                 continue
-            text_lower = text_for_keywords.lower()
-            derived_internal_category = "miscellaneous"
-            if any(kw in text_lower for kw in ["politic", "election", "government", "vote", "president", "senate", "congress", "biden", "trump", "white house"]): derived_internal_category = "political"
-            elif any(kw in text_lower for kw in ["sport", "nfl", "nba", "mlb", "nhl", "soccer", "cup", "league", "game", "match", "player", "olympic", "esports", "football", "basketball", "baseball"]): derived_internal_category = "sports"
-            elif any(kw in text_lower for kw in ["business", "econ", "finance", "stock", "market", "gdp", "fed", "nasdaq", "dow jones", "inflation", "recession", "interest rate", "earnings", "company"]): derived_internal_category = "economic"
-            if derived_internal_category == self.category: filtered_markets.append(market)
+            # Memoized: _standardize_data's lookup for the same question is a cache hit.
+            if market_classifier.classify(text_for_keywords).category == self.category:
+                filtered_markets.append(market)
         self.logger.info(f"Returning {len(filtered_markets)} markets for internal category '{self.category}' after keyword-based client-side filtering (using 'question' field).")
         return filtered_markets
 
@@ -105,105 +375,349 @@ class MarketCollector(BaseCollector):
             return None
 
         try:
-            if not isinstance(ends_at_str_api, str):
-                raise ValueError(f"'endDate' not a string: {ends_at_str_api}")
-            # API typically provides ISO 8601 with 'Z' or offset. Ensure tz-aware.
-            if ends_at_str_api.endswith('Z'):
-                ends_at_dt = datetime.fromisoformat(ends_at_str_api[:-1] + '+00:00')
-            else:
-                ends_at_dt = datetime.fromisoformat(ends_at_str_api)
-            if ends_at_dt.tzinfo is None or ends_at_dt.tzinfo.utcoffset(ends_at_dt) is None:
-                ends_at_dt = ends_at_dt.replace(tzinfo=timezone.utc) # Assume UTC if naive
-            if ends_at_dt < datetime.now(timezone.utc):
-                logger.debug(f"Skipping market {market_key_identifier} (Filter: 'endDate' in past: {ends_at_str_api}). Title: {market.get('question', 'N/A')}")
-                return None
+            # Parsed once per market (and again only if its endDate changes); expired ones are popped
+            # per cycle. Markets that already ended (the API's end_date_gte filter is truncated to the
+            # hour) are not indexed.
+            ends_at_dt = self.expiry_index.observe(
+                str(market_key_identifier), ends_at_str_api, ended_before=self._cycle_started_at)
         except Exception as e: # Catch ValueError from fromisoformat or other issues
             logger.debug(f"Skipping market {market_key_identifier} (Filter: 'endDate' parse error '{ends_at_str_api}'): {e}. Title: {market.get('question', 'N/A')}")
             return None
+        if ends_at_dt.timestamp() < self._cycle_started_at:
+            logger.debug(f"Skipping market {market_key_identifier} "
+                         f"(Filter: 'endDate' in past: {ends_at_str_api}). "
+                         f"Title: {market.get('question', 'N/A')}")
+            return None
 
         text_for_keywords_std = market.get("question", "")
         if not isinstance(text_for_keywords_std, str): text_for_keywords_std = ""
-        standardized_category = "miscellaneous"
-        text_lower_std = text_for_keywords_std.lower()
-        if any(kw in text_lower_std for kw in ["politic", "election", "government", "vote", "president", "senate", "congress", "biden", "trump", "white house"]): standardized_category = "political"
-        elif any(kw in text_lower_std for kw in ["sport", "nfl", "nba", "mlb", "nhl", "soccer", "cup", "league", "game", "match", "player", "olympic", "esports", "football", "basketball", "baseball"]): standardized_category = "sports"
-        elif any(kw in text_lower_std for kw in ["business", "econ", "finance", "stock", "market", "gdp", "fed", "nasdaq", "dow jones", "inflation", "recession", "interest rate", "earnings", "company"]): standardized_category = "economic"
+        classification = market_classifier.classify(text_for_keywords_std)
+        standardized_category = classification.category
 
         original_api_category_field = market.get("category", "N/A") # Still useful to log original 'category' field value
         title = market.get("question", "N/A")
         # CORRECTED: use market_slug_from_api which is now from market.get("slug")
         constructed_url = f"https://polymarket.com/event/{market_slug_from_api or market_key_identifier}"
+        # Static fields go to market_metadata (only when their hash changes); raw events and snapshots
+        # carry the slim state record, which references the metadata through its hash.
+        market_metadata, market_state = split_market(market)
 
         standard_event_item = {
-            "source": self.source_name, "event_type": "market_data_polymarket", "category": standardized_category, "content": market,
+            "source": self.source_name, "event_type": "market_data_polymarket",
+            "category": standardized_category, "content": market_state,
             "metadata": {
-                "fetch_timestamp": time.time(), "market_id": str(market_key_identifier), "title": title, "url": constructed_url,
-                "status_from_api": market_status_str, "active_flag_from_api": market_is_active_bool,
-                "ends_at_from_api": ends_at_str_api, # Now correctly from 'endDate'
-                "original_api_category_field": original_api_category_field,
-                "text_used_for_categorization": text_for_keywords_std[:200]
+                "fetch_timestamp": time.time(), "market_id": str(market_key_identifier),
+                "status_from_api": market_status_str, "metadata_hash": market_state["metadata_hash"],
             },
             "relevance_score": None,
         }
 
         # CORRECTED: Field names for snapshot data
-        current_price = market.get("lastTradePrice")
-        volume_for_snapshot = market.get("volume") # Using total volume; or market.get("volume24hr") for 24h volume
+        current_price = to_float(market.get("lastTradePrice"))
+        # Using total volume; or market.get("volume24hr") for 24h volume
+        volume_for_snapshot = to_float(market.get("volume"))
 
         market_snapshot_data = {
             "market_id_snapshot": str(market_key_identifier), "category_snapshot": standardized_category,
-            "price_snapshot": float(current_price) if current_price is not None else None,
-            "volume_snapshot": int(float(volume_for_snapshot)) if volume_for_snapshot is not None and str(volume_for_snapshot).strip() != "" else None,
-            "market_data_snapshot": market
+            "price_snapshot": current_price,
+            "volume_snapshot": int(volume_for_snapshot) if volume_for_snapshot is not None else None,
+            "best_bid_snapshot": to_float(market.get("bestBid")),
+            "best_ask_snapshot": to_float(market.get("bestAsk")),
+            "liquidity_snapshot": to_float(market.get("liquidity")),
+            "ends_at_snapshot": ends_at_dt.timestamp(),
+            "market_data_snapshot": market_state
         }
         standard_event_item['_market_snapshot_specific'] = market_snapshot_data
+        standard_event_item['_market_metadata_specific'] = {
+            "market_id": str(market_key_identifier), "category": standardized_category, "title": title,
+            "url": constructed_url,
+            "slug": market_slug_from_api, "ends_at": ends_at_dt, "metadata": market_metadata,
+            "metadata_hash": market_state["metadata_hash"],
+            "original_api_category_field": original_api_category_field,
+            "category_matched_terms": list(classification.matched_terms),
+        }
         return standard_event_item
 
-    def _persist_market_snapshot(self, market_snapshot_data: dict):
+    def _snapshot_params(self, market_id: str, snapshot_data: dict) -> tuple:
+        return (
+            market_id, self.source_name, snapshot_data['category_snapshot'],
+            snapshot_data['price_snapshot'], snapshot_data['volume_snapshot'],
+            snapshot_data.get('best_bid_snapshot'), snapshot_data.get('best_ask_snapshot'),
+            snapshot_data.get('liquidity_snapshot'), json.dumps(snapshot_data['market_data_snapshot'])
+        )
+
+    def _write_snapshot_rows(self, params: list[tuple]) -> set[str]:
+        """
+        Upserts the "latest" rows in market_snapshots and appends the same ticks to the
+        append-only market_snapshot_history, in one transaction. Returns the persisted market ids.
+        """
+        upsert_query = f"""
+        INSERT INTO market_snapshots {self.SNAPSHOT_UPSERT_COLUMNS}
+        VALUES %s
+        {self.SNAPSHOT_UPSERT_CONFLICT}
+        RETURNING market_id;
+        """
+        history_query = """
+        INSERT INTO market_snapshot_history
+            (market_id, source, category, price, volume, best_bid, best_ask, liquidity)
+        VALUES %s;
+        """
+        with transaction(name=upsert_query) as cur:
+            rows = execute_values(
+                cur, upsert_query, params, template="(%s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb)",
+                page_size=len(params), fetch=True
+            )
+            execute_values(cur, history_query, [row_params[:8] for row_params in params],
+                           page_size=len(params))
+        return {row[0] for row in rows}
+
+    def _persist_market_snapshot(self, market_snapshot_data: dict) -> bool:
         try:
             market_id = market_snapshot_data.get('market_id_snapshot')
             if not market_id:
                 logger.error(f"Market ID missing in snapshot. Skipping. Data: {market_snapshot_data}")
-                return
-            query = """
-            INSERT INTO market_snapshots (market_id, source, category, price, volume, market_data)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON CONFLICT (market_id) DO UPDATE SET
-                source = EXCLUDED.source, category = EXCLUDED.category, price = EXCLUDED.price,
-                volume = EXCLUDED.volume, market_data = EXCLUDED.market_data, timestamp = NOW();
-            """
-            params = (
-                market_id, self.source_name, market_snapshot_data['category_snapshot'],
-                market_snapshot_data['price_snapshot'], market_snapshot_data['volume_snapshot'],
-                Json(market_snapshot_data['market_data_snapshot'])
-            )
-            execute_query(query, params, commit=True)
+                return False
+            params = self._snapshot_params(market_id, market_snapshot_data)
+            persisted_ids = self._write_snapshot_rows([params])
+            return market_id in persisted_ids
         except Exception as e:
             failed_market_id = market_snapshot_data.get('market_id_snapshot', 'UNKNOWN_ID')
             logger.error(f"Failed to persist market snapshot for market_id '{failed_market_id}'. Error: {e}", exc_info=True)
+            return False
+
+    def _persist_market_snapshots(self, snapshots: list[dict]) -> dict[str, bool]:
+        """
+        Upserts all snapshots of a cycle with one multi-row INSERT ... ON CONFLICT statement and
+        appends them to the snapshot history in the same transaction.
+        Returns {market_id: persisted}. If the batch fails, each snapshot is retried
+        on its own so one bad row only fails its own market.
+        """
+        results: dict[str, bool] = {}
+        # ON CONFLICT cannot update the same row twice in one statement, so keep the last snapshot per market.
+        latest_by_market: dict[str, dict] = {}
+        for snapshot_data in snapshots:
+            market_id = snapshot_data.get('market_id_snapshot')
+            if not market_id:
+                logger.error(f"Market ID missing in snapshot. Skipping. Data: {snapshot_data}")
+                continue
+            latest_by_market[market_id] = snapshot_data
+
+        params = []
+        for market_id, snapshot_data in latest_by_market.items():
+            try:
+                params.append(self._snapshot_params(market_id, snapshot_data))
+            except (KeyError, TypeError, ValueError) as e:
+                logger.error(f"Invalid market snapshot for market_id '{market_id}'. Error: {e}")
+                results[market_id] = False
+        if not params:
+            return results
+
+        try:
+            persisted_ids = self._write_snapshot_rows(params)
+            for row_params in params:
+                results[row_params[0]] = row_params[0] in persisted_ids
+        except Exception as e:
+            logger.error(f"Batch upsert of {len(params)} market snapshots failed, retrying row by row. "
+                         f"Error: {e}")
+            for row_params in params:
+                results[row_params[0]] = self._persist_market_snapshot(latest_by_market[row_params[0]])
+        return results
+
+    def _persist_market_metadata(self, records: list[dict]) -> set[str]:
+        """
+        Upserts market_metadata for markets whose metadata hash differs from the last one written.
+        Returns the market ids written (or found already up to date).
+        """
+        params = [
+            (record['market_id'], self.source_name, record['category'], record['title'], record['slug'],
+             record['ends_at'], json.dumps(record['metadata']), record['metadata_hash'])
+            for record in records
+        ]
+        if not params:
+            return set()
+        try:
+            with transaction(name=self.METADATA_UPSERT_QUERY) as cur:
+                execute_values(cur, self.METADATA_UPSERT_QUERY, params,
+                               template="(%s, %s, %s, %s, %s, %s, %s::jsonb, %s)", page_size=len(params))
+        except Exception as e:
+            self.logger.error(f"Failed to upsert metadata for {len(params)} markets; retrying next cycle. "
+                              f"Error: {e}", exc_info=True)
+            return set()
+        for record in records:
+            self._metadata_hashes[record['market_id']] = record['metadata_hash']
+        return {record['market_id'] for record in records}
+
+    def _metadata_event(self, record: dict) -> dict:
+        """raw_data_events row recording a new or changed market definition."""
+        return {
+            "source": self.source_name, "event_type": "market_metadata_polymarket",
+            "category": record['category'], "content": record['metadata'],
+            "metadata": {
+                "fetch_timestamp": time.time(), "market_id": record['market_id'], "title": record['title'],
+                "url": record['url'], "ends_at_from_api": record['metadata'].get("endDate"),
+                "original_api_category_field": record['original_api_category_field'],
+                "category_matched_terms": record['category_matched_terms'],
+                "metadata_hash": record['metadata_hash'],
+            },
+            "relevance_score": None,
+        }
+
+    def _seed_change_detector(self):
+        """
+        Loads the last persisted state of each live market, so a fresh process does not re-emit every market.
+        Closed and ended markets are left out: they will not be fetched again and would only sit in memory.
+        """
+        if self.change_detector is None or self._change_detector_seeded:
+            return
+        self._change_detector_seeded = True
+        snapshots_query = """
+        SELECT s.market_id, s.market_data, EXTRACT(EPOCH FROM s.timestamp AT TIME ZONE 'UTC')
+        FROM market_snapshots s
+        JOIN market_metadata m ON m.market_id = s.market_id
+        WHERE s.source = %s AND m.end_date > NOW()
+          AND COALESCE((s.market_data->>'closed')::boolean, FALSE) = FALSE;
+        """
+        metadata_query = """
+        SELECT market_id, metadata_hash FROM market_metadata WHERE source = %s AND end_date > NOW();
+        """
+        try:
+            loaded = self.change_detector.seed(snapshots_query, (self.source_name,))
+            for rows in stream_query(metadata_query, (self.source_name,), chunk_size=5000):
+                self._metadata_hashes.update(rows)
+            self.logger.info(f"Seeded change detection with {loaded} market snapshots and "
+                             f"{len(self._metadata_hashes)} metadata hashes.")
+        except Exception as e:
+            self.logger.warning(f"Could not seed change detection from market_snapshots; every market counts "
+                                f"as changed this cycle. Error: {e}")
+
+    def _select_changed(self, raw_items: list[dict],
+                        snapshots: list[dict]) -> tuple[list[dict], list[dict], dict[str, bytes]]:
+        """Drops markets whose fingerprint matches the last persisted one and whose heartbeat is not due."""
+        markets_by_id = {item['metadata']['market_id']: item['content'] for item in raw_items}
+        fingerprints, heartbeats = self.change_detector.changed_items(markets_by_id)
+        raw_items = [item for item in raw_items if item['metadata']['market_id'] in fingerprints]
+        snapshots = [snapshot for snapshot in snapshots if snapshot.get('market_id_snapshot') in fingerprints]
+        self.logger.info(f"Change detection: {len(fingerprints) - heartbeats} changed, "
+                         f"{heartbeats} heartbeats, "
+                         f"{len(markets_by_id) - len(fingerprints)} unchanged markets skipped.")
+        return raw_items, snapshots, fingerprints
+
+    def _forget_markets(self, market_ids: list[str]):
+        """Drops every piece of per-market state kept for markets that ended, closed or left the universe."""
+        if not market_ids:
+            return
+        if self.change_detector is not None:
+            self.change_detector.forget(market_ids)
+        for market_id in market_ids:
+            self._metadata_hashes.pop(market_id, None)
+            self.expiry_index.discard(market_id)
+        self.state_store.remove(market_ids)
+        if self.poll_scheduler is not None:
+            self.poll_scheduler.discard(market_ids)
+        self.market_universe.discard(market_ids)
+
+    def _drop_expired_markets(self):
+        """Pops markets whose endDate has passed and forgets their per-market state."""
+        self._cycle_started_at = time.time()
+        expired = self.expiry_index.pop_expired(self._cycle_started_at)
+        if not expired:
+            return
+        self._forget_markets(expired)
+        self.logger.info(f"{len(expired)} markets expired since the last cycle.")
+
+    def _commit_cycle(self):
+        """Everything fetched this cycle was persisted: save its cache entries and move the sync watermark."""
+        self.commit_cache_entries()
+        self.market_universe.commit()
+
+    def _discard_cycle(self):
+        """Something fetched this cycle was not persisted: the next cycle fetches and treats it as changed."""
+        self.discard_cache_entries()
+        self.market_universe.rollback()
+
+    def markets_expiring_within(self, hours: float) -> list[tuple[str, datetime]]:
+        """Known markets ending within the next `hours`, soonest first, as (market_id, ends_at)."""
+        return self.expiry_index.expiring_within(hours)
 
     def collect_and_store(self):
+        self._seed_change_detector()
+        self._drop_expired_markets()
+        # Pages are only remembered as seen (cache entries, sync watermark) once what was read from them
+        # is persisted.
+        self._discard_cycle()
         standardized_items = super().collect()
         processed_raw_count, processed_snapshot_count = 0, 0
         if not standardized_items:
             self.logger.info(f"No items to store for category {self.category} after filtering and standardization.")
+            self._commit_cycle()
             return 0
+        raw_items, snapshots, metadata_records = [], [], []
         for item in standardized_items:
             if item:
                 snapshot_data = item.pop('_market_snapshot_specific', None)
-                try:
-                    if not all(k in item for k in ['source', 'event_type', 'category', 'content']):
-                        logger.error(f"Std item missing essential fields. Item: {item}")
-                        continue
-                    validate_and_store_raw_event(item)
-                    processed_raw_count += 1
-                except Exception as e:
-                    logger.error(f"Error storing raw market event for market_id '{item.get('metadata', {}).get('market_id', 'N/A')}': {e}", exc_info=True)
+                metadata_record = item.pop('_market_metadata_specific', None)
+                if (metadata_record and self._metadata_hashes.get(metadata_record['market_id'])
+                        != metadata_record['metadata_hash']):
+                    metadata_records.append(metadata_record)
+                if not all(k in item for k in ['source', 'event_type', 'category', 'content']):
+                    logger.error(f"Std item missing essential fields. Item: {item}")
+                else:
+                    raw_items.append(item)
                 if snapshot_data:
-                    try:
-                        self._persist_market_snapshot(snapshot_data)
-                        processed_snapshot_count += 1
-                    except Exception: pass # Logged in _persist_market_snapshot
+                    snapshots.append(snapshot_data)
+        if self.category == ALL_CATEGORIES:
+            per_category = {category: 0 for category in MARKET_CATEGORIES}
+            for item in raw_items:
+                per_category[item['category']] = per_category.get(item['category'], 0) + 1
+            self.logger.info(f"Routing markets by category in one cycle: {per_category}")
+        # Every fetched market, changed or not, refreshes the in-memory state.
+        fetched_at = time.time()
+        for snapshot in snapshots:
+            self.state_store.upsert(
+                snapshot['market_id_snapshot'], snapshot['price_snapshot'], snapshot['volume_snapshot'],
+                snapshot.get('liquidity_snapshot'), snapshot['category_snapshot'],
+                snapshot.get('ends_at_snapshot'), fetched_at
+            )
+            if self.poll_scheduler is not None:
+                self.poll_scheduler.observe(
+                    snapshot['market_id_snapshot'], snapshot['price_snapshot'],
+                    to_float(snapshot['market_data_snapshot'].get('volume24hr')),
+                    snapshot.get('ends_at_snapshot'), fetched_at
+                )
+        fingerprints = None
+        if self.change_detector is not None:
+            raw_items, snapshots, fingerprints = self._select_changed(raw_items, snapshots)
+        # Metadata is compared to what was last written independently of change detection, so a failed
+        # metadata write is retried next cycle even when the market's state has not moved.
+        stored_everything = True
+        if metadata_records:
+            written = self._persist_market_metadata(metadata_records)
+            stored_everything = len(written) == len(metadata_records)
+            raw_items.extend(self._metadata_event(record) for record in metadata_records
+                             if record['market_id'] in written)
+            self.logger.info(f"Wrote metadata for {len(written)} of {len(metadata_records)} "
+                             f"new or changed markets.")
+        processed_raw_count = store_raw_events(raw_items)
+        stored_everything = stored_everything and processed_raw_count == len(raw_items)
+        if snapshots:
+            snapshot_results = self._persist_market_snapshots(snapshots)
+            if fingerprints is not None:
+                self.change_detector.record({market_id: fingerprints[market_id]
+                                             for market_id, persisted in snapshot_results.items()
+                                             if persisted and market_id in fingerprints})
+            processed_snapshot_count = sum(1 for persisted in snapshot_results.values() if persisted)
+            failed_market_ids = [market_id for market_id, persisted in snapshot_results.items()
+                                 if not persisted]
+            if failed_market_ids:
+                stored_everything = False
+                self.logger.warning(f"Failed to persist {len(failed_market_ids)} market snapshots: "
+                                    f"{failed_market_ids[:20]}")
+        if stored_everything:
+            self._commit_cycle()
+        else:
+            # Next cycle the same pages count as changed again; change detection narrows the retry
+            # down to the markets that did not make it.
+            self._discard_cycle()
         if processed_raw_count > 0 or processed_snapshot_count > 0:
             self.logger.info(f"Processed {processed_raw_count} raw market events and {processed_snapshot_count} market snapshots for category {self.category}.")
         return processed_raw_count + processed_snapshot_count
@@ -212,14 +726,11 @@ if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     # logging.getLogger("MarketCollector").setLevel(logging.DEBUG) # For more verbose logs
 
-    categories_to_run = ["political", "sports", "economic", "miscellaneous"]
-    for category_name in categories_to_run:
-        logger.info(f"Running market collector for category: {category_name}")
-        try:
-            collector = MarketCollector(category=category_name)
-            items_processed = collector.collect_and_store()
-            logger.info(f"Collector for category '{category_name}' processed {items_processed} items.")
-        except Exception as e:
-            logger.error(f"Unhandled error for category '{category_name}': {e}", exc_info=True)
-        if len(categories_to_run) > 1:
-            time.sleep(2)
+    try:
+        # One fetch and one classification pass for every category, persisted in a single cycle.
+        collector = MarketCollector(category=ALL_CATEGORIES)
+        items_processed = collector.collect_and_store()
+        logger.info(f"Market collector processed {items_processed} items across categories "
+                    f"{list(MARKET_CATEGORIES)}.")
+    except Exception as e:
+        logger.error(f"Unhandled error in market collection cycle: {e}", exc_info=True)
@@ -0,0 +1,91 @@
+import hashlib
+import json
+
+try:
+    import ijson
+except ImportError:  # streaming falls back to json.load on the whole page
+    ijson = None
+
+# Gamma market fields that only change when a market is edited: stored once per change in market_metadata.
+MARKET_METADATA_FIELDS = (
+    "id", "slug", "question", "description", "conditionId", "questionID", "marketType", "outcomes",
+    "clobTokenIds", "startDate", "endDate", "resolutionSource", "category", "image", "icon",
+)
+# Fields that move between polls: written every poll as the slim state record in market_snapshots.
+MARKET_STATE_FIELDS = (
+    "lastTradePrice", "bestBid", "bestAsk", "spread", "outcomePrices", "volume", "volume24hr",
+    "liquidity", "active", "closed",
+)
+
+# Change times, used only to sync the local market universe incrementally (collectors/market_universe.py).
+MARKET_SYNC_FIELDS = ("updatedAt", "createdAt")
+
+# Everything MarketCollector reads from a market; parse_market_page drops the rest while parsing.
+MARKET_FIELDS = frozenset(MARKET_METADATA_FIELDS + MARKET_STATE_FIELDS + MARKET_SYNC_FIELDS + ("status",))
+# A /markets page is either a JSON array of markets or {"data": [...]}.
+MARKET_PAGE_PREFIXES = ("item", "data.item")
+
+
+def to_float(value) -> float | None:
+    """Gamma sends numbers as numbers or numeric strings, and "" for unknown."""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def metadata_hash(metadata: dict) -> str:
+    encoded = json.dumps(metadata, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def split_market(market: dict) -> tuple[dict, dict]:
+    """
+    Splits a Gamma market object into (metadata, state). Absent fields are left out of both.
+    The state carries the metadata hash, so a state record still pins the metadata version it was seen with.
+    """
+    metadata = {field: market[field] for field in MARKET_METADATA_FIELDS if field in market}
+    state = {field: market[field] for field in MARKET_STATE_FIELDS if field in market}
+    state["metadata_hash"] = metadata_hash(metadata)
+    return metadata, state
+
+
+def project_market(market: dict) -> dict:
+    return {field: value for field, value in market.items() if field in MARKET_FIELDS}
+
+
+def iter_market_page(stream):
+    """
+    Yields the markets of a /markets page read incrementally from a file-like stream, one at a time and
+    projected to MARKET_FIELDS; unused fields are skipped as they are parsed, so memory stays at one market.
+    """
+    if ijson is None:
+        data = json.load(stream)
+        for market in data if isinstance(data, list) else data.get("data") or []:
+            if isinstance(market, dict):
+                yield project_market(market)
+        return
+
+    builder, item_prefix, skipping = None, None, False
+    for prefix, event, value in ijson.parse(stream, use_float=True):
+        if builder is None:
+            if event == "start_map" and prefix in MARKET_PAGE_PREFIXES:
+                builder, item_prefix, skipping = ijson.ObjectBuilder(), prefix, False
+                builder.event(event, value)
+            continue
+        if prefix == item_prefix:
+            if event == "map_key":
+                skipping = value not in MARKET_FIELDS
+            elif event == "end_map":
+                builder.event(event, value)
+                yield builder.value
+                builder = None
+                continue
+        if not skipping:
+            builder.event(event, value)
+
+
+def parse_market_page(stream) -> list[dict]:
+    return list(iter_market_page(stream))
@@ -0,0 +1,203 @@
+import math
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from collectors.classifier import MARKET_CATEGORY_KEYWORDS
+
+# Category codes for the int8 category column; unknown categories get codes as they are first seen.
+BUILTIN_CATEGORIES = (*MARKET_CATEGORY_KEYWORDS, "miscellaneous")
+RANK_COLUMNS = ("volume", "liquidity", "move", "abs_move")
+
+
+class MarketState(NamedTuple):
+    market_id: str
+    category: str | None
+    price: float
+    prev_price: float
+    volume: float
+    liquidity: float
+    ends_at: float  # epoch seconds, NaN if unknown
+    updated_at: float  # epoch seconds
+
+
+class MarketStateStore:
+    """
+    Latest state of every known market in process memory, one NumPy array per field (structure of arrays).
+
+    Markets map to row indexes through a dict; filters and rankings are single vectorized passes over
+    the columns. Columns grow by doubling, and removing a market moves the last row into its slot, so
+    live rows are always the first len(store). Single-market reads skip the columns: upsert() also keeps
+    each market's row as a ready MarketState, so get() and price() are one dict get, at about 250 bytes
+    per market on top of the columns.
+    NaN marks unknown numbers. Writes take a lock; reads do not, which is safe for the single-row reads
+    (a row is published only after its values are written) and good enough for scans.
+    """
+
+    FLOAT_COLUMNS = ("price", "prev_price", "volume", "liquidity", "ends_at", "updated_at")
+
+    def __init__(self, capacity: int = 1024):
+        self._lock = threading.Lock()
+        self._index: dict[str, int] = {}
+        self._states: dict[str, MarketState] = {}
+        self._ids: list[str] = []
+        self._categories: list[str] = list(BUILTIN_CATEGORIES)
+        self._category_codes = {category: code for code, category in enumerate(self._categories)}
+        self._capacity = max(1, capacity)
+        for column in self.FLOAT_COLUMNS:
+            setattr(self, f"_{column}", np.full(self._capacity, np.nan))
+        self._category = np.full(self._capacity, -1, dtype=np.int8)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, market_id: str):
+        return market_id in self._index
+
+    @property
+    def nbytes(self) -> int:
+        float_bytes = sum(getattr(self, f"_{column}").nbytes for column in self.FLOAT_COLUMNS)
+        return float_bytes + self._category.nbytes
+
+    def _grow(self):
+        self._capacity *= 2
+        for column in (*self.FLOAT_COLUMNS, "category"):
+            old = getattr(self, f"_{column}")
+            new = np.full(self._capacity, -1 if column == "category" else np.nan, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, f"_{column}", new)
+
+    def _category_code(self, category: str | None) -> int:
+        if category is None:
+            return -1
+        code = self._category_codes.get(category)
+        if code is None:
+            if len(self._categories) >= 127:
+                raise ValueError("MarketStateStore supports at most 127 categories")
+            code = self._category_codes[category] = len(self._categories)
+            self._categories.append(category)
+        return code
+
+    def upsert(self, market_id: str, price: float | None, volume: float | None = None,
+               liquidity: float | None = None, category: str | None = None, ends_at: float | None = None,
+               updated_at: float | None = None):
+        """Sets a market's latest values; the previous price is kept in prev_price when the price changes."""
+        nan = np.nan
+        price = nan if price is None else float(price)
+        volume = nan if volume is None else float(volume)
+        liquidity = nan if liquidity is None else float(liquidity)
+        ends_at = nan if ends_at is None else float(ends_at)
+        updated_at = time.time() if updated_at is None else float(updated_at)
+        with self._lock:
+            row = self._index.get(market_id)
+            if row is None:
+                row = len(self._ids)
+                if row >= self._capacity:
+                    self._grow()
+                self._ids.append(market_id)
+                prev_price = nan
+            else:
+                previous = self._states[market_id]
+                prev_price = previous.prev_price
+                if not math.isnan(price) and previous.price != price:
+                    prev_price = previous.price
+            self._price[row] = price
+            self._prev_price[row] = prev_price
+            self._volume[row] = volume
+            self._liquidity[row] = liquidity
+            self._ends_at[row] = ends_at
+            self._updated_at[row] = updated_at
+            self._category[row] = self._category_code(category)
+            self._states[market_id] = MarketState(market_id, category, price, prev_price, volume, liquidity,
+                                                  ends_at, updated_at)
+            self._index[market_id] = row
+
+    def remove(self, market_ids):
+        with self._lock:
+            for market_id in market_ids:
+                row = self._index.pop(market_id, None)
+                if row is None:
+                    continue
+                del self._states[market_id]
+                last = len(self._ids) - 1
+                if row != last:
+                    moved_id = self._ids[last]
+                    for column in (*self.FLOAT_COLUMNS, "category"):
+                        values = getattr(self, f"_{column}")
+                        values[row] = values[last]
+                    self._ids[row] = moved_id
+                    self._index[moved_id] = row
+                self._ids.pop()
+
+    def price(self, market_id: str) -> float | None:
+        state = self._states.get(market_id)
+        return None if state is None else state.price
+
+    def get(self, market_id: str) -> MarketState | None:
+        return self._states.get(market_id)
+
+    def _mask(self, category: str | None, min_volume: float | None, expiring_within_hours: float | None,
+               now: float | None) -> np.ndarray:
+        size = len(self._ids)
+        mask = np.ones(size, dtype=bool)
+        if category is not None:
+            code = self._category_codes.get(category)
+            if code is None:
+                return np.zeros(size, dtype=bool)
+            mask &= self._category[:size] == code
+        if min_volume is not None:
+            mask &= self._volume[:size] >= min_volume
+        if expiring_within_hours is not None:
+            now = time.time() if now is None else now
+            ends_at = self._ends_at[:size]
+            mask &= (ends_at >= now) & (ends_at <= now + expiring_within_hours * 3600)
+        return mask
+
+    def filter(self, category: str | None = None, min_volume: float | None = None,
+               expiring_within_hours: float | None = None, now: float | None = None) -> list[str]:
+        """Ids of the markets matching every given condition (NaN volumes/end times never match)."""
+        rows = np.flatnonzero(self._mask(category, min_volume, expiring_within_hours, now))
+        ids = self._ids
+        return [ids[row] for row in rows]
+
+    def top(self, n: int, by: str = "volume", category: str | None = None, min_volume: float | None = None,
+            expiring_within_hours: float | None = None, now: float | None = None) -> list[tuple[str, float]]:
+        """
+        The n markets with the largest `by` value among those matching the filters, largest first.
+        by is one of volume, liquidity, move (price - prev_price) or abs_move.
+        """
+        if by not in RANK_COLUMNS:
+            raise ValueError(f"Unsupported ranking '{by}'. Use one of {list(RANK_COLUMNS)}.")
+        size = len(self._ids)
+        if by in ("move", "abs_move"):
+            values = self._price[:size] - self._prev_price[:size]
+            if by == "abs_move":
+                values = np.abs(values)
+        else:
+            values = getattr(self, f"_{by}")[:size]
+        mask = self._mask(category, min_volume, expiring_within_hours, now) & ~np.isnan(values)
+        rows = np.flatnonzero(mask)
+        if n <= 0 or rows.size == 0:
+            return []
+        candidates = values[rows]
+        if rows.size > n:
+            keep = np.argpartition(candidates, -n)[-n:]
+            rows, candidates = rows[keep], candidates[keep]
+        order = np.argsort(candidates)[::-1]
+        ids = self._ids
+        return [(ids[row], float(value)) for row, value in zip(rows[order], candidates[order])]
+
+
+_market_state_store: MarketStateStore | None = None
+_market_state_store_lock = threading.Lock()
+
+
+def get_market_state_store() -> MarketStateStore:
+    """Process-wide store that MarketCollector updates every cycle."""
+    global _market_state_store
+    with _market_state_store_lock:
+        if _market_state_store is None:
+            _market_state_store = MarketStateStore()
+        return _market_state_store
@@ -0,0 +1,158 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from collectors.expiry_index import parse_end_date
+
+
+def change_time(market: dict) -> datetime | None:
+    """When a Gamma market was last updated (or created, if never updated); None if neither parses."""
+    times = []
+    for field in ("updatedAt", "createdAt"):
+        try:
+            times.append(parse_end_date(market[field]))
+        except (KeyError, ValueError):
+            continue
+    return max(times) if times else None
+
+
+def is_live(market: dict, now: float | None = None) -> bool:
+    """Not closed or inactive and, with now given, not past its endDate (Gamma leaves those open a while)."""
+    if market.get("closed") is True or market.get("active") is False:
+        return False
+    if now is not None and market.get("endDate"):
+        try:
+            return parse_end_date(market["endDate"]).timestamp() >= now
+        except ValueError:
+            return True  # left to the collector's own endDate check
+    return True
+
+
+class SyncResult(NamedTuple):
+    changed: list[dict]  # new markets, and known ones whose updatedAt moved
+    removed: list[str]  # markets that closed, or that a full resync no longer returned
+    unchanged: int
+
+
+class MarketUniverse:
+    """
+    The collector's local copy of the live market universe ({market_id: projected market}) plus a
+    high-watermark of the newest updatedAt/createdAt seen, so a cycle only has to ask Gamma for markets
+    changed since then (see MarketCollector._fetch_market_changes).
+
+    merge() folds in a delta: markets whose updatedAt did not move are recognised as already known (the
+    delta window overlaps the previous one by overlap_seconds to absorb late writes), and closed markets,
+    or markets past their endDate, leave the universe. replace() folds in a full resync: it also drops
+    every market the resync did not return, which is what corrects drift from missed updates.
+
+    A sync only becomes final with commit(), once the collector has persisted what it returned: until
+    then the watermark does not move, and rollback() forgets the versions it recorded, so after a failed
+    store the next delta reaches back as far again and returns the same markets as changed.
+    """
+
+    def __init__(self, overlap_seconds: float = 60.0):
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self.markets: dict[str, dict] = {}
+        self._versions: dict[str, str | None] = {}  # market_id -> updatedAt string last merged
+        self.watermark: datetime | None = None
+        self._pending_watermark: datetime | None = None
+        self._pending_ids: set[str] = set()  # markets whose recorded version is not committed yet
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.markets)
+
+    def __contains__(self, market_id: str):
+        return market_id in self.markets
+
+    def since(self) -> datetime | None:
+        """Oldest change time the next delta has to reach back to; None before the first sync."""
+        return None if self.watermark is None else self.watermark - self.overlap
+
+    def _advance(self, market: dict):
+        changed_at = change_time(market)
+        pending = self._pending_watermark
+        if changed_at is not None and (pending is None or changed_at > pending):
+            self._pending_watermark = changed_at
+
+    def _merge(self, markets: list[dict], changed: list[dict], removed: list[str]) -> int:
+        unchanged = 0
+        now = time.time()
+        for market in markets:
+            market_id = str(market.get("id") or market.get("slug") or "")
+            if not market_id:
+                continue
+            self._advance(market)
+            if not is_live(market, now):
+                if self.markets.pop(market_id, None) is not None:
+                    self._versions.pop(market_id, None)
+                    removed.append(market_id)
+                continue
+            version = market.get("updatedAt") or market.get("createdAt")
+            if market_id in self.markets and version is not None and self._versions.get(market_id) == version:
+                unchanged += 1
+                continue
+            self.markets[market_id] = market
+            self._versions[market_id] = version
+            self._pending_ids.add(market_id)
+            changed.append(market)
+        return unchanged
+
+    def merge(self, markets: list[dict]) -> SyncResult:
+        """Folds in the markets of a delta sync."""
+        changed, removed = [], []
+        with self._lock:
+            unchanged = self._merge(markets, changed, removed)
+        return SyncResult(changed, removed, unchanged)
+
+    def replace(self, markets: list[dict]) -> SyncResult:
+        """Folds in a full resync; known markets it did not return are removed."""
+        changed, removed = [], []
+        with self._lock:
+            unchanged = self._merge(markets, changed, removed)
+            returned = {str(market.get("id") or market.get("slug") or "") for market in markets}
+            for market_id in [market_id for market_id in self.markets if market_id not in returned]:
+                del self.markets[market_id]
+                self._versions.pop(market_id, None)
+                removed.append(market_id)
+        return SyncResult(changed, removed, unchanged)
+
+    def update(self, markets: list[dict]):
+        """Records markets fetched outside a sync (e.g. polled by id) without moving the watermark."""
+        now = time.time()
+        with self._lock:
+            for market in markets:
+                market_id = str(market.get("id") or market.get("slug") or "")
+                if not market_id:
+                    continue
+                if is_live(market, now):
+                    self.markets[market_id] = market
+                    self._versions[market_id] = market.get("updatedAt") or market.get("createdAt")
+                    self._pending_ids.add(market_id)
+                else:
+                    self.markets.pop(market_id, None)
+                    self._versions.pop(market_id, None)
+
+    def commit(self):
+        """Makes the syncs since the last commit final: the watermark moves to the newest change seen."""
+        with self._lock:
+            if self._pending_watermark is not None and (self.watermark is None
+                                                        or self._pending_watermark > self.watermark):
+                self.watermark = self._pending_watermark
+            self._pending_watermark = None
+            self._pending_ids.clear()
+
+    def rollback(self):
+        """Drops the uncommitted syncs' watermark and versions; their markets count as changed next time."""
+        with self._lock:
+            for market_id in self._pending_ids:
+                self._versions.pop(market_id, None)
+            self._pending_watermark = None
+            self._pending_ids.clear()
+
+    def discard(self, market_ids):
+        with self._lock:
+            for market_id in market_ids:
+                self.markets.pop(market_id, None)
+                self._versions.pop(market_id, None)
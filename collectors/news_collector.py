@@ -1,3 +1,4 @@
+import json
 import requests
 import logging
 import time
@@ -8,13 +9,15 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from collectors.base import BaseCollector
 from app.core.config import settings
-from workers.data_validator_worker import validate_and_store_raw_event
+from workers.data_validator_worker import store_raw_events
 
 logger = logging.getLogger(__name__)
 
 class NewsCollector(BaseCollector):
     CALLS = 100
     PERIOD = 86400
+    HTTP_TIMEOUT = 10
+    HTTP_POOL_SIZE = 2
 
     def __init__(self, category: str = "general", news_source_name: str = "news_api_org"):
         super().__init__(source_name=news_source_name, category=category)
@@ -38,9 +41,12 @@ class NewsCollector(BaseCollector):
             return self._get_mock_data()
         try:
             self.logger.info(f"Fetching news for category: {self.category}")
-            response = requests.get(self.endpoint, params=self.params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            fetch = self._http_get_cached(self.endpoint, params=self.params)
+            if not fetch.changed:
+                self.logger.info(f"Headlines unchanged for category: {self.category}; "
+                                 f"skipping standardization and storage.")
+                return []
+            data = json.loads(fetch.body)
             if data.get('status') != 'ok':
                 self.logger.error(f"NewsAPI error: {data.get('message', 'Unknown error')}")
                 return []
@@ -53,9 +59,11 @@ class NewsCollector(BaseCollector):
             return filtered_articles
         except requests.exceptions.RequestException as e:
             self.logger.error(f"API request failed for {self.source_name} ({self.category}): {e}")
+            self.discard_cache_entries()
             return []
         except Exception as e:
             self.logger.error(f"Unexpected error fetching news: {e}")
+            self.discard_cache_entries()
             return []
 
     def _get_mock_data(self) -> list[dict]:
@@ -121,13 +129,15 @@ class NewsCollector(BaseCollector):
         """Collects, standardizes, and directly stores news articles."""
         try:
             self.logger.info(f"Starting collection for {self.source_name}, category: {self.category}")
+            self.discard_cache_entries()
             raw_items = self._fetch_data()
 
             if not raw_items:
                 self.logger.info(f"No new data found for {self.source_name}, category: {self.category}")
+                self.commit_cache_entries()
                 return 0
 
-            processed_count = 0
+            standardized_items = []
             for item in raw_items:
                 if not item: # Skip if a None item was somehow included in raw_items
                     self.logger.warning(f"Skipping None item encountered in raw_items from {self.source_name}")
@@ -135,11 +145,19 @@ class NewsCollector(BaseCollector):
                 try:
                     standardized_item = self._standardize_data(item)
                     if standardized_item:
-                        validate_and_store_raw_event(standardized_item)
-                        processed_count += 1
+                        standardized_items.append(standardized_item)
                 except Exception as e:
                     # Log the problematic item along with the error for better debugging
-                    self.logger.error(f"Error standardizing or storing item from {self.source_name}. Item: {item}. Error: {e}", exc_info=True)
+                    self.logger.error(
+                        f"Error standardizing item from {self.source_name}. Item: {item}. Error: {e}",
+                        exc_info=True)
+
+            processed_count = store_raw_events(standardized_items)
+            # The headlines only count as seen once every article is stored; otherwise they are retried.
+            if processed_count == len(standardized_items):
+                self.commit_cache_entries()
+            else:
+                self.discard_cache_entries()
 
             if processed_count > 0:
                  self.logger.info(f"Successfully collected and stored {processed_count} items from {self.source_name}")
@@ -150,6 +168,7 @@ class NewsCollector(BaseCollector):
 
         except Exception as e:
             self.logger.error(f"Error in collect_and_store method for {self.source_name}: {e}", exc_info=True)
+            self.discard_cache_entries()
             return 0
 
 def run_all_categories():
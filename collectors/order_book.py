@@ -0,0 +1,84 @@
+from bisect import bisect_left, insort
+from typing import NamedTuple
+
+
+class BookTop(NamedTuple):
+    asset_id: str
+    best_bid: float | None
+    best_ask: float | None
+    mid: float | None
+    timestamp: float  # exchange timestamp of the update, seconds
+
+
+class BookSide:
+    """Price levels of one side of an L2 book: sizes by price plus the prices kept sorted ascending."""
+
+    def __init__(self, descending: bool):
+        self.descending = descending
+        self.sizes: dict[float, float] = {}
+        self._prices: list[float] = []
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def set(self, price: float, size: float):
+        """Sets the resting size at price; size 0 removes the level."""
+        if size <= 0:
+            if self.sizes.pop(price, None) is not None:
+                del self._prices[bisect_left(self._prices, price)]
+            return
+        if price not in self.sizes:
+            insort(self._prices, price)
+        self.sizes[price] = size
+
+    def clear(self):
+        self.sizes.clear()
+        self._prices.clear()
+
+    def best(self) -> float | None:
+        if not self._prices:
+            return None
+        return self._prices[-1] if self.descending else self._prices[0]
+
+    def levels(self, depth: int | None = None) -> list[tuple[float, float]]:
+        """(price, size) from the best price outwards."""
+        prices = reversed(self._prices) if self.descending else iter(self._prices)
+        result = []
+        for price in prices:
+            if depth is not None and len(result) >= depth:
+                break
+            result.append((price, self.sizes[price]))
+        return result
+
+
+class OrderBook:
+    """Local L2 book of one CLOB asset (outcome token), kept up to date from snapshots and level changes."""
+
+    def __init__(self, asset_id: str):
+        self.asset_id = asset_id
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self.timestamp = 0.0
+        self.hash: str | None = None
+
+    def apply_snapshot(self, bids: list[dict], asks: list[dict], timestamp: float,
+                       book_hash: str | None = None):
+        self.bids.clear()
+        self.asks.clear()
+        for level in bids:
+            self.bids.set(float(level["price"]), float(level["size"]))
+        for level in asks:
+            self.asks.set(float(level["price"]), float(level["size"]))
+        self.timestamp, self.hash = timestamp, book_hash
+
+    def apply_change(self, side: str, price: float, size: float, timestamp: float,
+                     book_hash: str | None = None):
+        (self.bids if side.upper() == "BUY" else self.asks).set(price, size)
+        self.timestamp = max(self.timestamp, timestamp)
+        if book_hash is not None:
+            self.hash = book_hash
+
+    def top(self) -> BookTop:
+        best_bid, best_ask = self.bids.best(), self.asks.best()
+        mid = (best_bid + best_ask) / 2 if best_bid is not None and best_ask is not None else None
+        return BookTop(self.asset_id, best_bid, best_ask, mid, self.timestamp)
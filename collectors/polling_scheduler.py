@@ -0,0 +1,236 @@
+import heapq
+import math
+import threading
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import NamedTuple
+
+from collectors.http_client import CallBudget
+
+
+class PollingBucket(NamedTuple):
+    """
+    A polling cadence and the conditions that put a market in it: any one of them is enough.
+    volatility is the market's smoothed |price change| per sqrt(hour) between polls.
+    """
+    name: str
+    interval_seconds: float
+    min_volatility: float | None = None
+    min_volume_24h: float | None = None
+    ends_within_hours: float | None = None
+
+
+# Checked in order; the first bucket with a matching condition wins and the last one takes the rest.
+DEFAULT_BUCKETS = (
+    PollingBucket("hot", 15, min_volatility=0.02, min_volume_24h=250_000, ends_within_hours=6),
+    PollingBucket("warm", 120, min_volatility=0.005, min_volume_24h=25_000, ends_within_hours=48),
+    PollingBucket("cool", 600, min_volatility=0.001, min_volume_24h=1_000),
+    PollingBucket("cold", 3600),
+)
+
+
+@dataclass(slots=True)
+class MarketPollState:
+    bucket: int
+    next_due: float
+    last_polled: float | None = None
+    price: float | None = None
+    volatility: float | None = None
+    volume_24h: float | None = None
+    ends_at: float | None = None
+
+
+class AdaptivePollingScheduler:
+    """
+    Decides which markets to re-fetch each cycle so a fixed request budget (calls per period, the
+    collector's rate limit) goes to the markets whose data actually changes. Pass the source's shared
+    CallBudget as budget so plan() sees the calls every collector of the source has made.
+
+    Every poll of a market feeds observe(), which updates its volatility (an EWMA of the price move
+    between polls, scaled to one hour) and re-buckets it by volatility, 24h volume and time to end.
+    A bucket's interval sets when the market is next due; a market is also due when it is about to
+    enter a hotter bucket's ends_within_hours window. When polling every market on time would use less
+    than `utilization` of the budget, all intervals shrink together (down to min_scale of the configured
+    ones) so the spare calls go to fresher data. plan() returns the due markets in batches of
+    ids_per_request, hottest bucket first, capped by the calls left in the current period; whatever
+    does not fit stays due for the next cycle, and spare ids in the last request go to markets that are
+    nearly due. Markets that do not move drift to colder buckets, so quiet markets cost little and
+    budget left over is simply not spent.
+    """
+
+    def __init__(self, calls: int, period: float, ids_per_request: int = 100,
+                 buckets: tuple[PollingBucket, ...] = DEFAULT_BUCKETS, smoothing: float = 0.3,
+                 utilization: float = 0.8, min_scale: float = 0.25, budget: CallBudget | None = None):
+        self.calls = calls
+        self.period = period
+        self.ids_per_request = max(1, ids_per_request)
+        self.buckets = buckets
+        self.smoothing = smoothing
+        self.utilization = utilization
+        self.min_scale = min_scale
+        self._bucket_sizes = [0] * len(buckets)
+        self._markets: dict[str, MarketPollState] = {}
+        self._due: list[tuple[float, str]] = []  # heap of (next_due, market_id); stale entries are skipped
+        self.budget = budget if budget is not None else CallBudget(calls, period)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._markets)
+
+    def __contains__(self, market_id: str):
+        return market_id in self._markets
+
+    def get(self, market_id: str) -> MarketPollState | None:
+        return self._markets.get(market_id)
+
+    def _classify(self, state: MarketPollState, now: float) -> int:
+        hours_left = (state.ends_at - now) / 3600 if state.ends_at is not None else math.inf
+        for index, bucket in enumerate(self.buckets[:-1]):
+            if (bucket.min_volatility is not None and state.volatility is not None
+                    and state.volatility >= bucket.min_volatility):
+                return index
+            if (bucket.min_volume_24h is not None and state.volume_24h is not None
+                    and state.volume_24h >= bucket.min_volume_24h):
+                return index
+            if bucket.ends_within_hours is not None and hours_left <= bucket.ends_within_hours:
+                return index
+        return len(self.buckets) - 1
+
+    def interval_scale(self) -> float:
+        """Factor applied to every bucket's interval_seconds to fit the polling demand to the budget."""
+        return min(1.0, max(self.min_scale, self.demand() / (self.calls * self.utilization)))
+
+    def interval(self, bucket: int) -> float:
+        return self.buckets[bucket].interval_seconds * self.interval_scale()
+
+    def _next_due(self, state: MarketPollState, now: float) -> float:
+        next_due = now + self.interval(state.bucket)
+        if state.ends_at is not None:
+            # Re-check the market when it crosses into a hotter bucket's end-time window.
+            for bucket in self.buckets[:state.bucket]:
+                if bucket.ends_within_hours is not None:
+                    enters_at = state.ends_at - bucket.ends_within_hours * 3600
+                    if now < enters_at < next_due:
+                        next_due = enters_at
+        return next_due
+
+    def _schedule(self, market_id: str, state: MarketPollState, next_due: float):
+        state.next_due = next_due
+        heapq.heappush(self._due, (next_due, market_id))
+
+    def observe(self, market_id: str, price: float | None, volume_24h: float | None = None,
+                ends_at: float | None = None, now: float | None = None) -> str:
+        """Records a fresh poll of a market and reschedules it. Returns the name of its new bucket."""
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._markets.get(market_id)
+            if state is None:
+                state = self._markets[market_id] = MarketPollState(bucket=len(self.buckets) - 1, next_due=now)
+                self._bucket_sizes[state.bucket] += 1
+            if price is not None and state.price is not None and state.last_polled is not None:
+                elapsed_hours = max((now - state.last_polled) / 3600, 1 / 60)
+                move = abs(price - state.price) / math.sqrt(elapsed_hours)
+                state.volatility = move if state.volatility is None else (
+                    self.smoothing * move + (1 - self.smoothing) * state.volatility)
+            state.last_polled = now
+            state.price = price if price is not None else state.price
+            state.volume_24h = volume_24h
+            state.ends_at = ends_at
+            bucket = self._classify(state, now)
+            self._bucket_sizes[state.bucket] -= 1
+            self._bucket_sizes[bucket] += 1
+            state.bucket = bucket
+            self._schedule(market_id, state, self._next_due(state, now))
+            return self.buckets[state.bucket].name
+
+    def reschedule(self, market_ids: Iterable[str], now: float | None = None):
+        """Marks markets as polled without new values (e.g. their page came back unchanged)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            for market_id in market_ids:
+                state = self._markets.get(market_id)
+                if state is not None:
+                    state.last_polled = now
+                    self._schedule(market_id, state, self._next_due(state, now))
+
+    def discard(self, market_ids: Iterable[str]):
+        with self._lock:
+            for market_id in market_ids:
+                state = self._markets.pop(market_id, None)
+                if state is not None:
+                    self._bucket_sizes[state.bucket] -= 1
+        # Their heap entries no longer match a market and are dropped when popped.
+
+    def spend(self, calls: int = 1, now: float | None = None):
+        """
+        Counts requests made against the budget outside CallBudget.acquire() (requests made through
+        BaseCollector._http_get are already counted).
+        """
+        self.budget.record(calls, now)
+
+    def available_calls(self, now: float | None = None) -> int:
+        return self.budget.available(now)
+
+    def plan(self, now: float | None = None, max_calls: int | None = None,
+             exclude: Iterable[str] = ()) -> list[list[str]]:
+        """
+        Batches of due market ids to fetch now, one batch per request, at most max_calls batches
+        (default: the calls left in the current period). Markets in exclude (already fetched this cycle)
+        are skipped.
+        """
+        exclude = set(exclude)
+        now = time.time() if now is None else now
+        calls = self.available_calls(now) if max_calls is None else max_calls
+        with self._lock:
+            intervals = [self.interval(bucket) for bucket in range(len(self.buckets))]
+            due, excluded = [], []
+            while self._due and self._due[0][0] <= now:
+                next_due, market_id = heapq.heappop(self._due)
+                state = self._markets.get(market_id)
+                if state is None or state.next_due != next_due:
+                    continue  # stale entry
+                if market_id in exclude:
+                    excluded.append((next_due, market_id))
+                    continue
+                # Hotter buckets first; a market late by whole intervals of its own bucket moves up
+                # by as many buckets, so colder markets are delayed but never starved.
+                lateness = (now - next_due) / intervals[state.bucket]
+                due.append((state.bucket - lateness, next_due, market_id))
+            # Every due market, excluded ones included, stays due until observe() or reschedule() moves it
+            # on, so markets left out (or whose fetch fails) come first next cycle.
+            for next_due, market_id in excluded:
+                heapq.heappush(self._due, (next_due, market_id))
+            for _, next_due, market_id in due:
+                heapq.heappush(self._due, (next_due, market_id))
+            due.sort()
+            selected = [market_id for _, _, market_id in due[:calls * self.ids_per_request]]
+            spare = -len(selected) % self.ids_per_request
+            if spare and len(selected) < calls * self.ids_per_request:
+                selected.extend(self._early_polls(now, spare, exclude.union(selected)))
+        size = self.ids_per_request
+        return [selected[start:start + size] for start in range(0, len(selected), size)]
+
+    def _early_polls(self, now: float, count: int, exclude: set[str]) -> list[str]:
+        """
+        Markets to fill the last request's spare ids with, since they cost nothing extra: those at least
+        halfway through their interval, hottest bucket and furthest along first.
+        """
+        candidates = []
+        intervals = [self.interval(bucket) for bucket in range(len(self.buckets))]
+        for market_id, state in self._markets.items():
+            if market_id in exclude or state.last_polled is None:
+                continue
+            progress = (now - state.last_polled) / intervals[state.bucket]
+            if progress >= 0.5:
+                candidates.append((state.bucket, -progress, market_id))
+        return [market_id for _, _, market_id in heapq.nsmallest(count, candidates)]
+
+    def bucket_counts(self) -> dict[str, int]:
+        return {bucket.name: size for bucket, size in zip(self.buckets, self._bucket_sizes)}
+
+    def demand(self) -> float:
+        """Requests per period needed to poll every market at its bucket's configured interval."""
+        markets_per_period = sum(size * self.period / bucket.interval_seconds
+                                 for bucket, size in zip(self.buckets, self._bucket_sizes))
+        return markets_per_period / self.ids_per_request
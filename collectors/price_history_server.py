@@ -0,0 +1,130 @@
+"""
+Local stand-in for the CLOB GET /prices-history endpoint, for running and benchmarking
+collectors/market_backfill.py offline. Tokens found in the recording (a JSON object mapping token id to
+its [{"t": unix_seconds, "p": price}, ...] history) are served from it; any other token gets a
+deterministic synthetic random walk at the requested fidelity.
+
+Usage: python collectors/price_history_server.py [--file collectors/recordings/prices_history_sample.json]
+                                                 [--port 8766] [--latency-ms 0]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RECORDING = "collectors/recordings/prices_history_sample.json"
+
+
+def synthetic_history(token_id: str, start_ts: int, end_ts: int, fidelity_minutes: int) -> list[dict]:
+    """Random walk whose value at a timestamp depends only on the token and the timestamp's step."""
+    step = max(1, fidelity_minutes) * 60
+    first = -(-start_ts // step) * step
+    seed = int(hashlib.sha1(token_id.encode()).hexdigest()[:8], 16)
+    history = []
+    for ts in range(first, end_ts + 1, step):
+        rng = random.Random(seed ^ (ts // step))
+        history.append({"t": ts, "p": round(0.5 + 0.4 * (rng.random() - 0.5), 4)})
+    return history
+
+
+class PriceHistoryServer:
+    """Threaded HTTP server on a background thread; latency (seconds) is added to every response."""
+
+    def __init__(self, recording: dict[str, list[dict]] | None = None, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0):
+        self.recording = recording or {}
+        self.latency = latency
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != "/prices-history":
+                    self.send_error(404)
+                    return
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                try:
+                    token_id = query["market"]
+                    start_ts, end_ts = int(query["startTs"]), int(query["endTs"])
+                    fidelity = int(query.get("fidelity", 60))
+                except (KeyError, ValueError):
+                    self.send_error(400, "market, startTs and endTs are required")
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+                if token_id in server.recording:
+                    history = [point for point in server.recording[token_id]
+                               if start_ts <= point["t"] <= end_ts]
+                else:
+                    history = synthetic_history(token_id, start_ts, end_ts, fidelity)
+                body = json.dumps({"history": history}).encode()
+                server.requests += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="price-history-server",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", default=DEFAULT_RECORDING)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every response")
+    args = parser.parse_args()
+    with open(args.file) as f:
+        recording = json.load(f)
+    server = PriceHistoryServer(recording, args.host, args.port, args.latency_ms / 1000)
+    logger.info(f"Serving price history for {len(recording)} recorded tokens (others synthetic) "
+                f"on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,36 @@
+-- Append-only price/volume history for markets, next to the "latest" rows in market_snapshots.
+-- Range-partitioned by ts; partitions are named <table>_pYYYYMMDD after their lower bound and are
+-- created ahead of time / dropped after retention by workers/partition_maintenance_worker.py.
+
+CREATE TABLE IF NOT EXISTS market_snapshot_history (
+    market_id VARCHAR(100) NOT NULL,
+    ts TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    source VARCHAR(50),
+    category VARCHAR(50),
+    price DECIMAL(10,6),
+    volume BIGINT
+) PARTITION BY RANGE (ts);
+
+-- Catches rows outside every premade partition so inserts never fail. It should stay empty:
+-- a new partition cannot be attached while the default holds rows in its range.
+CREATE TABLE IF NOT EXISTS market_snapshot_history_default PARTITION OF market_snapshot_history DEFAULT;
+
+-- Rows arrive in ts order, so a BRIN index stays tiny and serves time-range scans;
+-- the btree serves per-market series lookups.
+CREATE INDEX IF NOT EXISTS market_snapshot_history_ts_brin ON market_snapshot_history USING BRIN (ts);
+CREATE INDEX IF NOT EXISTS market_snapshot_history_market_ts_idx ON market_snapshot_history (market_id, ts);
+
+-- Premake the first week of daily partitions.
+DO $$
+DECLARE
+    day DATE;
+BEGIN
+    FOR i IN 0..7 LOOP
+        day := (NOW() AT TIME ZONE 'UTC')::date + i;
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF market_snapshot_history FOR VALUES FROM (%L) TO (%L)',
+            'market_snapshot_history_p' || to_char(day, 'YYYYMMDD'),
+            day::timestamp AT TIME ZONE 'UTC', (day + 1)::timestamp AT TIME ZONE 'UTC'
+        );
+    END LOOP;
+END $$;
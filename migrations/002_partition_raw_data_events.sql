@@ -0,0 +1,50 @@
+-- Converts raw_data_events into a table range-partitioned by created_at (daily partitions named
+-- raw_data_events_pYYYYMMDD, maintained by workers/partition_maintenance_worker.py).
+-- Inserts from validate_and_store_raw_event(s) keep working unchanged: same name, columns and defaults.
+--
+-- The old table is kept as raw_data_events_unpartitioned so the copy can be verified. Foreign keys
+-- that reference it (e.g. from breaking_events) stay attached to it: a partitioned table can only
+-- enforce uniqueness on keys that include created_at, so such constraints cannot be re-pointed.
+-- Drop them and the old table once the new one is verified.
+
+BEGIN;
+
+ALTER TABLE raw_data_events RENAME TO raw_data_events_unpartitioned;
+ALTER TABLE raw_data_events_unpartitioned RENAME CONSTRAINT raw_data_events_pkey TO raw_data_events_unpartitioned_pkey;
+
+CREATE TABLE raw_data_events (LIKE raw_data_events_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+    PARTITION BY RANGE (created_at);
+UPDATE raw_data_events_unpartitioned SET created_at = NOW() WHERE created_at IS NULL;
+ALTER TABLE raw_data_events ALTER COLUMN created_at SET NOT NULL;
+-- The partition key has to be part of the primary key.
+ALTER TABLE raw_data_events ADD PRIMARY KEY (id, created_at);
+
+-- Rows outside every premade partition land here; it should stay empty (see partition maintenance).
+CREATE TABLE raw_data_events_default PARTITION OF raw_data_events DEFAULT;
+
+-- One partition per day from the oldest existing row to a week ahead.
+DO $$
+DECLARE
+    day DATE;
+    last_day DATE := (NOW() AT TIME ZONE 'UTC')::date + 7;
+BEGIN
+    SELECT COALESCE(MIN(created_at)::date, (NOW() AT TIME ZONE 'UTC')::date) INTO day FROM raw_data_events_unpartitioned;
+    WHILE day <= last_day LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF raw_data_events FOR VALUES FROM (%L) TO (%L)',
+            'raw_data_events_p' || to_char(day, 'YYYYMMDD'), day::timestamp, (day + 1)::timestamp
+        );
+        day := day + 1;
+    END LOOP;
+END $$;
+
+INSERT INTO raw_data_events SELECT * FROM raw_data_events_unpartitioned;
+
+-- Serves the breaking-news scan (processed = FALSE AND created_at > NOW() - ... ORDER BY created_at DESC)
+-- and the SKIP LOCKED queue in workers/raw_event_queue.py. It only holds the unprocessed backlog, so it
+-- stays small no matter how large the table grows; time predicates also prune whole partitions.
+CREATE INDEX raw_data_events_unprocessed_created_at_idx ON raw_data_events (created_at DESC) WHERE processed = FALSE;
+
+COMMIT;
+
+ANALYZE raw_data_events;
@@ -0,0 +1,42 @@
+-- Splits the static part of Gamma market objects (question, slug, endDate, description, outcomes, ...)
+-- out of market_snapshots. MarketCollector upserts market_metadata only when the metadata hash changes;
+-- market_snapshots.market_data and raw market events keep just the slim volatile state record
+-- (see collectors/market_fields.py), and best bid/ask and liquidity get their own columns.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS market_metadata (
+    market_id VARCHAR(100) PRIMARY KEY,
+    source VARCHAR(50),
+    category VARCHAR(50),
+    question TEXT,
+    slug TEXT,
+    end_date TIMESTAMPTZ,
+    metadata JSONB NOT NULL,
+    metadata_hash CHAR(32) NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS market_metadata_end_date_idx ON market_metadata (end_date);
+
+-- Backfill from the full objects stored so far; the collector rewrites each row (with its hash) on
+-- first sight, since the placeholder hash never matches.
+INSERT INTO market_metadata (market_id, source, category, question, slug, end_date, metadata, metadata_hash)
+SELECT market_id, source, category, market_data->>'question', market_data->>'slug',
+       CASE WHEN market_data->>'endDate' ~ '^\d{4}-\d{2}-\d{2}' THEN (market_data->>'endDate')::timestamptz END,
+       market_data, repeat('0', 32)
+FROM market_snapshots
+WHERE market_data IS NOT NULL AND market_data ? 'question'
+ON CONFLICT (market_id) DO NOTHING;
+
+ALTER TABLE market_snapshots
+    ADD COLUMN IF NOT EXISTS best_bid DECIMAL(10,6),
+    ADD COLUMN IF NOT EXISTS best_ask DECIMAL(10,6),
+    ADD COLUMN IF NOT EXISTS liquidity DECIMAL(20,6);
+
+ALTER TABLE market_snapshot_history
+    ADD COLUMN IF NOT EXISTS best_bid DECIMAL(10,6),
+    ADD COLUMN IF NOT EXISTS best_ask DECIMAL(10,6),
+    ADD COLUMN IF NOT EXISTS liquidity DECIMAL(20,6);
+
+COMMIT;
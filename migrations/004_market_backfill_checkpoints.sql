@@ -0,0 +1,14 @@
+-- Progress of historical price backfills (collectors/market_backfill.py): one row per loaded
+-- [chunk_start, chunk_end) range. A row is written in the same transaction as the chunk's
+-- market_snapshot_history rows, so a chunk is either fully loaded and checkpointed or not at all,
+-- and a killed run resumes by skipping the checkpointed ranges.
+
+CREATE TABLE IF NOT EXISTS market_backfill_checkpoints (
+    market_id VARCHAR(100) NOT NULL,
+    chunk_start TIMESTAMPTZ NOT NULL,
+    chunk_end TIMESTAMPTZ NOT NULL,
+    fidelity_minutes INT NOT NULL,
+    points INT NOT NULL,
+    completed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (market_id, chunk_start, fidelity_minutes)
+);
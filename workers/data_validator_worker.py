@@ -1,18 +1,36 @@
+import json
 import logging
-from app.core.db import execute_query, get_db_connection
+import threading
+from app.core.db import execute_query, execute_batch_query, get_db_connection
 from psycopg2.extras import Json
 from app.core.config import settings
+from workers.ingestion_buffer import WriteBehindBuffer
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+REQUIRED_FIELDS = ('source', 'event_type', 'category', 'content')
 
-def validate_and_store_raw_event(data_item: dict):
+
+def _validate_raw_event(data_item: dict):
+    # Validation (Example: using Pydantic or simple checks)
+    if not isinstance(data_item, dict):
+        raise ValueError(f"Expected a dict, got {type(data_item).__name__}.")
+    if not all(k in data_item for k in REQUIRED_FIELDS): # [cite: 150]
+        raise ValueError("Missing essential fields in data_item.")
+
+
+def validate_and_store_raw_event(data_item: dict, write_behind: bool | None = None):
     logger.info(f"Received data for validation and storage: source={data_item.get('source')}")
+    if write_behind is None:
+        write_behind = settings.INGESTION_WRITE_BEHIND
     try:
-        # 1. Validation (Example: using Pydantic or simple checks)
-        if not all(k in data_item for k in ['source', 'event_type', 'category', 'content']): # [cite: 150]
-            raise ValueError("Missing essential fields in data_item.")
+        # 1. Validation
+        _validate_raw_event(data_item)
+
+        if write_behind:
+            get_raw_event_buffer().enqueue(data_item)
+            return
 
         # 2. Store in raw_data_events table
         query = """
@@ -42,3 +60,84 @@ def validate_and_store_raw_event(data_item: dict):
     except Exception as e:
         logger.error(f"Error processing data item: {data_item}. Error: {e}", exc_info=True)
         # Handle DB errors, etc.
+
+
+def validate_and_store_raw_events(data_items: list[dict]) -> list:
+    """
+    Batch variant of validate_and_store_raw_event.
+    Validates every item, then writes all valid ones with a single multi-row INSERT in one transaction.
+    Returns a list aligned with data_items holding the new row id, or None for items that failed
+    validation (or for every item if the write itself failed).
+    """
+    row_ids = [None] * len(data_items)
+    valid_positions, params = [], []
+    for position, data_item in enumerate(data_items):
+        try:
+            _validate_raw_event(data_item)
+            # Serialize here so an unserializable payload is rejected on its own instead of failing the batch.
+            params.append((
+                data_item['source'],
+                data_item['event_type'],
+                data_item['category'],
+                json.dumps(data_item['content']),
+                json.dumps(data_item.get('metadata')),
+                data_item.get('relevance_score')
+            ))
+            valid_positions.append(position)
+        except (ValueError, TypeError) as e:
+            logger.error(f"Validation error for data item at position {position}: {data_item}. Error: {e}")
+
+    if not params:
+        return row_ids
+
+    query = """
+    INSERT INTO raw_data_events (source, event_type, category, content, metadata, relevance_score)
+    VALUES %s RETURNING id;
+    """
+    try:
+        rows = execute_batch_query(
+            query, params, template="(%s, %s, %s, %s::jsonb, %s::jsonb, %s)", page_size=len(params),
+            fetch=True,
+        )
+    except Exception as e:
+        logger.error(f"Error storing batch of {len(params)} raw events. Error: {e}", exc_info=True)
+        return row_ids
+
+    for position, row in zip(valid_positions, rows):
+        row_ids[position] = row[0]
+    logger.info(f"Stored {len(rows)} of {len(data_items)} raw events in one batch.")
+    return row_ids
+
+
+_raw_event_buffer: WriteBehindBuffer | None = None
+_raw_event_buffer_lock = threading.Lock()
+
+
+def get_raw_event_buffer() -> WriteBehindBuffer:
+    """Process-wide write-behind buffer whose flusher writes raw events with validate_and_store_raw_events."""
+    global _raw_event_buffer
+    with _raw_event_buffer_lock:
+        if _raw_event_buffer is None:
+            _raw_event_buffer = WriteBehindBuffer(
+                validate_and_store_raw_events,
+                name="raw_data_events",
+                max_batch_size=settings.INGESTION_BUFFER_BATCH_SIZE,
+                max_latency=settings.INGESTION_BUFFER_MAX_LATENCY,
+                max_pending=settings.INGESTION_BUFFER_MAX_PENDING,
+            )
+        return _raw_event_buffer
+
+
+def store_raw_events(data_items: list[dict], write_behind: bool | None = None) -> int:
+    """
+    Entry point for collectors: stores a batch synchronously, or hands it to the write-behind buffer
+    when write_behind (default: settings.INGESTION_WRITE_BEHIND) is on.
+    Returns the number of items stored, or accepted by the buffer.
+    """
+    if write_behind is None:
+        write_behind = settings.INGESTION_WRITE_BEHIND
+    if not data_items:
+        return 0
+    if write_behind:
+        return get_raw_event_buffer().enqueue_many(data_items)
+    return sum(1 for row_id in validate_and_store_raw_events(data_items) if row_id is not None)
@@ -0,0 +1,179 @@
+import atexit
+import logging
+import queue
+import signal
+import sys
+import threading
+import time
+from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+_live_buffers: list["WriteBehindBuffer"] = []
+_live_buffers_lock = threading.Lock()
+_signal_handlers_installed = False
+
+
+class WriteBehindBuffer:
+    """
+    Bounded in-process queue drained by a background thread.
+    Producers enqueue items and return immediately; the flusher hands them to flush_fn in batches
+    of up to max_batch_size, or sooner once the oldest pending item has waited max_latency seconds.
+    enqueue() blocks while max_pending items are waiting (backpressure), and close() flushes
+    everything still pending, which also happens at interpreter exit and on SIGTERM.
+    When flush_fn returns a list aligned with the batch (e.g. row ids), None entries count as failed items.
+    """
+
+    def __init__(self, flush_fn: Callable[[list], object], name: str = "write_behind",
+                 max_batch_size: int = 500, max_latency: float = 2.0, max_pending: int = 10000):
+        self.flush_fn = flush_fn
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._closing = threading.Event()
+        # Producers between the closing check and their put; close() waits for them, so an item that
+        # passed the check is always seen by the flusher.
+        self._putting = 0
+        self._putting_done = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=f"{name}-flusher", daemon=True)
+        self.stats = {"enqueued": 0, "flushed": 0, "failed": 0, "batches": 0}
+        self._stats_lock = threading.Lock()  # updated by producers and the flusher thread
+        self._thread.start()
+        _register(self)
+
+    def enqueue(self, item, timeout: float | None = None, block: bool = True) -> bool:
+        """
+        Queues one item. Blocks while the buffer is full; returns False if timeout expires first.
+        With block=False it returns False at once when the buffer is full; the caller accounts for the drop.
+        """
+        with self._putting_done:
+            if self._closing.is_set():
+                raise RuntimeError(f"Buffer '{self.name}' is closed")
+            self._putting += 1
+        try:
+            self._queue.put(item, block=block, timeout=timeout)
+        except queue.Full:
+            if block:
+                logger.warning(f"Buffer '{self.name}' still full after {timeout}s; dropping item.")
+            return False
+        finally:
+            with self._putting_done:
+                self._putting -= 1
+                if not self._putting:
+                    self._putting_done.notify_all()
+        with self._stats_lock:
+            self.stats["enqueued"] += 1
+        return True
+
+    def enqueue_many(self, items, timeout: float | None = None) -> int:
+        return sum(1 for item in items if self.enqueue(item, timeout=timeout))
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def flush(self):
+        """Blocks until every item enqueued so far has been handed to flush_fn."""
+        self._queue.join()
+
+    def close(self, timeout: float | None = None):
+        """Stops accepting items, flushes whatever is pending and stops the flusher thread."""
+        with self._putting_done:
+            if self._closing.is_set():
+                return
+            self._closing.set()
+            # The flusher keeps draining meanwhile, so producers blocked on a full queue get through.
+            self._putting_done.wait_for(lambda: not self._putting, timeout)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error(
+                f"Buffer '{self.name}' did not drain within {timeout}s; {self.pending()} items left.")
+        _unregister(self)
+
+    def _next_batch(self) -> list:
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            try:
+                if self._closing.is_set():
+                    batch.append(self._queue.get_nowait())
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                if self._closing.is_set():
+                    return
+                continue
+            flushed = 0
+            try:
+                result = self.flush_fn(batch)
+                if isinstance(result, list) and len(result) == len(batch):
+                    flushed = sum(1 for item_result in result if item_result is not None)
+                else:
+                    flushed = len(batch)
+                if flushed < len(batch):
+                    logger.warning(
+                        f"Buffer '{self.name}': {len(batch) - flushed} of {len(batch)} items not stored.")
+            except Exception as e:
+                logger.error(f"Buffer '{self.name}' failed to flush {len(batch)} items: {e}", exc_info=True)
+            finally:
+                with self._stats_lock:
+                    self.stats["flushed"] += flushed
+                    self.stats["failed"] += len(batch) - flushed
+                    self.stats["batches"] += 1
+                for _ in batch:
+                    self._queue.task_done()
+
+
+def close_all_buffers(timeout: float | None = 30.0):
+    with _live_buffers_lock:
+        buffers = list(_live_buffers)
+    for buffer in buffers:
+        buffer.close(timeout)
+
+
+def _register(buffer: WriteBehindBuffer):
+    with _live_buffers_lock:
+        _live_buffers.append(buffer)
+    _install_signal_handlers()
+
+
+def _unregister(buffer: WriteBehindBuffer):
+    with _live_buffers_lock:
+        if buffer in _live_buffers:
+            _live_buffers.remove(buffer)
+
+
+def _install_signal_handlers():
+    """Flush on SIGTERM before exiting; SIGINT already unwinds through atexit via KeyboardInterrupt."""
+    global _signal_handlers_installed
+    if _signal_handlers_installed or threading.current_thread() is not threading.main_thread():
+        return
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def _handle_sigterm(signum, frame):
+        logger.info("SIGTERM received; flushing write-behind buffers.")
+        close_all_buffers()
+        if callable(previous):
+            previous(signum, frame)
+        else:
+            sys.exit(128 + signum)
+
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+    _signal_handlers_installed = True
+
+
+atexit.register(close_all_buffers)
@@ -0,0 +1,52 @@
+import argparse
+import logging
+import os
+import sys
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from app.core.config import settings
+from app.core.partitions import PARTITIONED_TABLES, drop_partitions_older_than, ensure_partitions
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def run_partition_maintenance() -> dict:
+    """
+    Premakes upcoming partitions and drops expired ones for every table in PARTITIONED_TABLES.
+    Meant to run at least daily, either from cron or as a long-running process with --loop.
+    """
+    summary = {}
+    for table, config in PARTITIONED_TABLES.items():
+        try:
+            created = ensure_partitions(table, interval=config["interval"])
+            dropped = drop_partitions_older_than(table, config["retention_days"], interval=config["interval"])
+            summary[table] = {"created": created, "dropped": dropped}
+            logger.info(f"Partition maintenance for {table}: created {len(created)}, dropped {len(dropped)}.")
+        except Exception as e:
+            logger.error(f"Partition maintenance failed for {table}: {e}", exc_info=True)
+            summary[table] = {"error": str(e)}
+    return summary
+
+
+def run_forever(interval: float | None = None):
+    """Keeps future partitions in place by re-running maintenance every `interval` seconds."""
+    interval = interval or settings.PARTITION_MAINTENANCE_INTERVAL
+    while True:
+        run_partition_maintenance()
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create upcoming and drop expired table partitions.")
+    parser.add_argument("--loop", action="store_true",
+                        help="keep running every PARTITION_MAINTENANCE_INTERVAL seconds")
+    args = parser.parse_args()
+    if args.loop:
+        run_forever()
+    else:
+        run_partition_maintenance()
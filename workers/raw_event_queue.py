@@ -0,0 +1,133 @@
+import logging
+import os
+import sys
+import threading
+from collections.abc import Callable, Iterable
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from psycopg2.extras import register_uuid
+
+from app.core.config import settings
+from app.core.db import get_db_connection
+from app.core.query_stats import StatementTimer
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# A handler gets the claimed events and returns the ids to mark processed (None means all of them).
+# Raising leaves the whole batch unprocessed so another consumer picks it up.
+EventHandler = Callable[[list[dict]], Iterable | None]
+
+
+class RawEventQueue:
+    """
+    Work-queue view of raw_data_events (processed = FALSE rows, oldest first).
+
+    Each batch is claimed with SELECT ... FOR UPDATE SKIP LOCKED, handed to the handler and marked
+    processed in the same transaction, so any number of consumer processes can drain the backlog
+    in parallel without double-processing. The claim is the row lock itself:
+    - if a worker crashes, its connection drops and Postgres releases the rows at once;
+    - if a worker hangs (or its handler runs longer than visibility_timeout), the session is
+      terminated by idle_in_transaction_session_timeout and the batch becomes visible again.
+    """
+
+    def __init__(self, event_types: list[str] | None = None, sources: list[str] | None = None,
+                 batch_size: int | None = None, visibility_timeout: float | None = None):
+        self.event_types = event_types
+        self.sources = sources
+        self.batch_size = batch_size or settings.RAW_EVENT_QUEUE_BATCH_SIZE
+        self.visibility_timeout = visibility_timeout or settings.RAW_EVENT_QUEUE_VISIBILITY_TIMEOUT
+
+    def _claim_query(self) -> tuple[str, list]:
+        conditions, params = ["processed = FALSE"], []
+        if self.event_types:
+            conditions.append("event_type = ANY(%s)")
+            params.append(list(self.event_types))
+        if self.sources:
+            conditions.append("source = ANY(%s)")
+            params.append(list(self.sources))
+        query = f"""
+        SELECT id, source, event_type, category, content, metadata, created_at FROM raw_data_events
+        WHERE {' AND '.join(conditions)}
+        ORDER BY created_at
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED;
+        """
+        return query, params + [self.batch_size]
+
+    def consume_batch(self, handler: EventHandler) -> int:
+        """Claims up to batch_size events, runs handler on them and acks them. Returns the number acked."""
+        query, params = self._claim_query()
+        timer = StatementTimer(query)
+        try:
+            with get_db_connection() as conn:
+                timer.acquired(conn)
+                with conn.cursor() as cur:
+                    # ids come back as uuid.UUID, which psycopg2 adapts back to uuid for the ack below.
+                    register_uuid(conn_or_curs=cur)
+                    cur.execute("SET LOCAL idle_in_transaction_session_timeout = %s",
+                                (int(self.visibility_timeout * 1000),))
+                    cur.execute(query, params)
+                    rows = cur.fetchall()
+                    timer.executed(len(rows))
+                    if not rows:
+                        conn.rollback()
+                        return 0
+
+                    events = [
+                        {"id": row[0], "source": row[1], "event_type": row[2], "category": row[3],
+                         "content": row[4], "metadata": row[5], "created_at": row[6]}
+                        for row in rows
+                    ]
+                    done = handler(events)
+                    done_ids = [event["id"] for event in events] if done is None else list(done)
+                    if done_ids:
+                        # The created_at bounds let Postgres prune to the partitions holding this batch.
+                        cur.execute(
+                            "UPDATE raw_data_events SET processed = TRUE "
+                            "WHERE id = ANY(%s) AND created_at BETWEEN %s AND %s;",
+                            (done_ids, events[0]["created_at"], events[-1]["created_at"])
+                        )
+                conn.commit()
+                timer.committed()
+                return len(done_ids)
+        except Exception:
+            timer.error = True
+            raise
+        finally:
+            timer.finish()
+
+    def run(self, handler: EventHandler, poll_interval: float = 5.0,
+            stop_event: threading.Event | None = None, max_batches: int | None = None) -> int:
+        """
+        Drains the queue until stop_event is set (or max_batches batches were handled),
+        sleeping poll_interval seconds whenever it is empty. Returns the total number of events acked.
+        """
+        stop_event = stop_event or threading.Event()
+        total, batches = 0, 0
+        while not stop_event.is_set() and (max_batches is None or batches < max_batches):
+            try:
+                acked = self.consume_batch(handler)
+            except Exception as e:
+                logger.error(f"Failed to consume a batch of raw events; it will be retried. Error: {e}",
+                             exc_info=True)
+                acked = 0
+                stop_event.wait(poll_interval)
+            else:
+                batches += 1
+                total += acked
+                if acked == 0:
+                    stop_event.wait(poll_interval)
+        return total
+
+
+if __name__ == "__main__":
+    def log_events(events: list[dict]):
+        for event in events:
+            logger.info(f"Consumed raw event {event['id']} "
+                        f"({event['source']}/{event['event_type']}, {event['category']})")
+
+    RawEventQueue().run(log_events)